@@ -0,0 +1,222 @@
+"""
+AssemblyAI transcription client for PrepTalk.
+
+Uses one process-wide pooled httpx client so uploads reuse keep-alive
+connections, polls the transcript with an adaptive interval that starts
+fast and backs off, and gives up after an overall deadline. When
+ASSEMBLYAI_WEBHOOK_URL is set, transcripts are submitted with a completion
+webhook and the request waits for the callback instead of polling.
+Without ASSEMBLYAI_API_KEY the client is not configured and the
+``assemblyai`` transcription provider is unavailable.
+Every API call goes through a circuit breaker, and the overall deadline is
+cut to what is left of the request's (see resilience.py).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from metrics import observe_dependency, stage
+from resilience import CircuitBreaker, timeout_for
+
+logger = logging.getLogger(__name__)
+
+ASSEMBLYAI_API_KEY = os.getenv("ASSEMBLYAI_API_KEY", "")  # without it the provider is disabled
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com")
+ASSEMBLYAI_TIMEOUT = float(os.getenv("ASSEMBLYAI_TIMEOUT", "120"))  # overall deadline per transcript, seconds
+ASSEMBLYAI_MAX_CONNECTIONS = int(os.getenv("ASSEMBLYAI_MAX_CONNECTIONS", "20"))
+ASSEMBLYAI_REQUEST_TIMEOUT = 60.0  # per API call
+
+# Public URL of our /assemblyai/webhook endpoint; enables callback mode when set
+ASSEMBLYAI_WEBHOOK_URL = os.getenv("ASSEMBLYAI_WEBHOOK_URL", "")
+ASSEMBLYAI_WEBHOOK_SECRET = os.getenv("ASSEMBLYAI_WEBHOOK_SECRET", "")
+WEBHOOK_AUTH_HEADER = "X-PrepTalk-Webhook-Secret"
+
+POLL_INITIAL_INTERVAL = 0.25
+POLL_MAX_INTERVAL = 3.0
+POLL_BACKOFF = 1.5
+# In webhook mode we still check once in a while in case the callback went to another worker
+WEBHOOK_SAFETY_CHECK_INTERVAL = 15.0
+
+
+class TranscriptionError(Exception):
+    pass
+
+
+class TranscriptionTimeout(TranscriptionError):
+    pass
+
+
+@dataclass
+class Transcript:
+    text: str
+    words: list = field(default_factory=list)   # [{"text", "start", "end", "confidence"}], times in ms
+    audio_duration: float = 0.0                 # seconds
+    audio: dict = field(default_factory=dict)   # preprocessing metadata (duration, speech_ratio, sizes)
+
+
+class AssemblyAIClient:
+    def __init__(self, api_key: str = ASSEMBLYAI_API_KEY, base_url: str = ASSEMBLYAI_BASE_URL,
+                 timeout: float = ASSEMBLYAI_TIMEOUT, webhook_url: str = ASSEMBLYAI_WEBHOOK_URL,
+                 webhook_secret: str = ASSEMBLYAI_WEBHOOK_SECRET,
+                 max_connections: int = ASSEMBLYAI_MAX_CONNECTIONS):
+        self.configured = bool(api_key)
+        if not self.configured:
+            logger.warning("ASSEMBLYAI_API_KEY is not set; AssemblyAI transcription is disabled")
+        self.timeout = timeout
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"authorization": api_key},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(ASSEMBLYAI_REQUEST_TIMEOUT, connect=10.0),
+        )
+        self._waiters = {}  # transcript_id -> Future resolved by the webhook
+        self.breaker = CircuitBreaker("assemblyai")
+
+        self.transcripts = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.polls = 0
+        self.webhook_deliveries = 0
+        self.total_latency = 0.0
+
+    async def _request(self, operation: str, method: str, url: str, **kwargs) -> dict:
+        seconds = timeout_for(ASSEMBLYAI_REQUEST_TIMEOUT, f"assemblyai.{operation}")
+        timeout = httpx.Timeout(seconds, connect=min(seconds, 10.0))
+        return await self.breaker.call(lambda: self._send(operation, method, url, timeout, **kwargs), seconds)
+
+    async def _send(self, operation: str, method: str, url: str, timeout, **kwargs) -> dict:
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await self._client.request(method, url, timeout=timeout, **kwargs)
+            response.raise_for_status()
+            ok = True
+        finally:
+            observe_dependency("assemblyai", operation, time.perf_counter() - start, ok)
+        return response.json()
+
+    async def upload(self, content) -> str:
+        """Upload raw audio (bytes or an async iterator of chunks) and return its upload_url"""
+        return (await self._request("upload", "POST", "/v2/upload", content=content))["upload_url"]
+
+    async def submit(self, audio_url: str) -> str:
+        payload = {"audio_url": audio_url}
+        if self.webhook_url:
+            payload["webhook_url"] = self.webhook_url
+            if self.webhook_secret:
+                payload["webhook_auth_header_name"] = WEBHOOK_AUTH_HEADER
+                payload["webhook_auth_header_value"] = self.webhook_secret
+        return (await self._request("submit", "POST", "/v2/transcript", json=payload))["id"]
+
+    async def fetch(self, transcript_id: str) -> dict:
+        return await self._request("fetch", "GET", f"/v2/transcript/{transcript_id}")
+
+    async def transcribe(self, content) -> Transcript:
+        """Upload, submit and wait for a transcript within the overall deadline"""
+        if not self.configured:
+            raise TranscriptionError("AssemblyAI is not configured (ASSEMBLYAI_API_KEY is not set)")
+        start = time.perf_counter()
+        try:
+            deadline = time.monotonic() + timeout_for(self.timeout, "assemblyai")
+            audio_url = await self.upload(content)
+            transcript_id = await self.submit(audio_url)
+            with stage("transcription_wait"):
+                if self.webhook_url:
+                    body = await self._wait_for_webhook(transcript_id, deadline)
+                else:
+                    body = await self._poll(transcript_id, deadline)
+        except TranscriptionTimeout:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        self.transcripts += 1
+        self.total_latency += time.perf_counter() - start
+        return Transcript(
+            text=body.get("text") or "",
+            words=body.get("words") or [],
+            audio_duration=body.get("audio_duration") or 0.0,
+        )
+
+    def _check(self, transcript_id: str, body: dict):
+        """Return the body once finished, raise on error, None while still running"""
+        status = body.get("status")
+        if status == "completed":
+            return body
+        if status in ("error", "failed"):
+            raise TranscriptionError(f"AssemblyAI transcription failed: {body.get('error', 'unknown error')}")
+        return None
+
+    async def _poll(self, transcript_id: str, deadline: float) -> dict:
+        interval = POLL_INITIAL_INTERVAL
+        while True:
+            self.polls += 1
+            body = self._check(transcript_id, await self.fetch(transcript_id))
+            if body:
+                return body
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TranscriptionTimeout(f"Transcript {transcript_id} not ready in time")
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+
+    async def _wait_for_webhook(self, transcript_id: str, deadline: float) -> dict:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[transcript_id] = waiter
+        interval = POLL_INITIAL_INTERVAL
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TranscriptionTimeout(f"No webhook for transcript {transcript_id} in time")
+                if waiter.done():
+                    # Woken, but the transcript still read as running: poll with backoff from here
+                    self.polls += 1
+                    await asyncio.sleep(min(interval, remaining))
+                    interval = min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+                else:
+                    try:
+                        await asyncio.wait_for(asyncio.shield(waiter), min(remaining, WEBHOOK_SAFETY_CHECK_INTERVAL))
+                    except asyncio.TimeoutError:
+                        pass
+                body = self._check(transcript_id, await self.fetch(transcript_id))
+                if body:
+                    return body
+        finally:
+            self._waiters.pop(transcript_id, None)
+
+    def notify(self, transcript_id: str) -> bool:
+        """Called by the webhook endpoint; wakes the request waiting on this transcript"""
+        waiter = self._waiters.get(transcript_id)
+        if waiter is None or waiter.done():
+            return False
+        self.webhook_deliveries += 1
+        waiter.set_result(True)
+        return True
+
+    def verify_webhook(self, headers) -> bool:
+        return not self.webhook_secret or headers.get(WEBHOOK_AUTH_HEADER) == self.webhook_secret
+
+    def stats(self) -> dict:
+        return {
+            "mode": "webhook" if self.webhook_url else "poll",
+            "transcripts": self.transcripts,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "polls": self.polls,
+            "avg_polls_per_transcript": round(self.polls / self.transcripts, 2) if self.transcripts else 0,
+            "webhook_deliveries": self.webhook_deliveries,
+            "waiting": len(self._waiters),
+            "avg_latency_ms": round(self.total_latency / self.transcripts * 1000, 2) if self.transcripts else 0,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,242 @@
+"""
+Audio preprocessing before transcription.
+
+Browser uploads are decoded with ffmpeg to 16 kHz mono PCM, which is read
+from the pipe a few seconds at a time so only per-frame levels are kept in
+memory; a frame-energy voice-activity detector on those levels finds the
+leading and trailing silence, and the source file is re-encoded between the
+speech bounds as low-bitrate Opus, which is usually several times smaller
+than the upload. The work runs on a small thread pool: ffmpeg does the
+decoding in its own process and NumPy releases the GIL, so threads keep the
+event loop free without the cost of worker processes. Without an ffmpeg
+binary the stage is disabled and uploads are sent as they are.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "auto")  # auto (when ffmpeg is found), 1 or 0
+AUDIO_PREPROCESS_WORKERS = int(os.getenv("AUDIO_PREPROCESS_WORKERS", "2"))
+AUDIO_PREPROCESS_BITRATE = os.getenv("AUDIO_PREPROCESS_BITRATE", "24k")
+AUDIO_PREPROCESS_TIMEOUT = float(os.getenv("AUDIO_PREPROCESS_TIMEOUT", "60"))
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+DECODE_CHUNK_FRAMES = 100  # frames read from ffmpeg per pipe read (3 s of audio)
+VAD_MARGIN_DB = 10.0       # speech is this far above the noise floor...
+VAD_MIN_THRESHOLD_DB = -50.0   # ...but never quieter than this
+VAD_MAX_THRESHOLD_DB = -35.0   # ...and a noisy floor never hides normal speech
+VAD_PAD_MS = 300           # silence kept around the speech so words are not clipped
+
+
+class PreprocessError(Exception):
+    pass
+
+
+@dataclass
+class PreprocessedAudio:
+    path: str                # re-encoded audio, deleted by the caller
+    duration: float          # seconds, as uploaded
+    speech_duration: float   # seconds of frames above the VAD threshold
+    trimmed_duration: float  # seconds actually sent on
+    input_bytes: int
+    output_bytes: int
+
+    @property
+    def speech_ratio(self) -> float:
+        return round(self.speech_duration / self.duration, 3) if self.duration else 0.0
+
+    def metadata(self) -> dict:
+        return {
+            "duration": round(self.duration, 2),
+            "speech_duration": round(self.speech_duration, 2),
+            "speech_ratio": self.speech_ratio,
+            "input_bytes": self.input_bytes,
+            "output_bytes": self.output_bytes,
+        }
+
+
+def frame_levels(samples: np.ndarray, frame: int) -> np.ndarray:
+    """RMS level in dBFS of each whole frame of int16 samples"""
+    count = len(samples) // frame
+    frames = samples[:count * frame].astype(np.float32).reshape(count, frame) / 32768.0
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def detect_speech(levels: np.ndarray) -> tuple:
+    """Energy VAD over frame levels; returns (first frame, end frame, speech frame count), or None without speech"""
+    if not len(levels):
+        return None
+    threshold = np.clip(np.percentile(levels, 10) + VAD_MARGIN_DB, VAD_MIN_THRESHOLD_DB, VAD_MAX_THRESHOLD_DB)
+    speech = levels > threshold
+    if not speech.any():
+        return None
+    first = int(np.argmax(speech))
+    last = len(speech) - 1 - int(np.argmax(speech[::-1]))
+    pad = VAD_PAD_MS // FRAME_MS
+    return max(first - pad, 0), min(last + 1 + pad, len(levels)), int(speech.sum())
+
+
+def _ffmpeg_command(args: list) -> list:
+    return [FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error", *args]
+
+
+def _ffmpeg(args: list):
+    try:
+        result = subprocess.run(_ffmpeg_command(args), capture_output=True, timeout=AUDIO_PREPROCESS_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise PreprocessError(f"ffmpeg failed: {e}")
+    if result.returncode != 0:
+        raise PreprocessError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()[:200]}")
+
+
+def decode_levels(path: str, frame: int) -> tuple:
+    """Stream 16 kHz mono PCM out of ffmpeg; returns (level of each whole frame, sample count)"""
+    chunk_bytes = frame * 2 * DECODE_CHUNK_FRAMES
+    levels = []
+    leftover = b""
+    total_bytes = 0
+    # stderr goes to a file so a chatty ffmpeg can't block on a full pipe
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(
+                _ffmpeg_command(["-i", path, "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"]),
+                stdout=subprocess.PIPE, stderr=stderr)
+        except OSError as e:
+            raise PreprocessError(f"ffmpeg failed: {e}")
+        timed_out = threading.Event()
+
+        def expire():
+            timed_out.set()
+            process.kill()
+
+        timer = threading.Timer(AUDIO_PREPROCESS_TIMEOUT, expire)
+        timer.start()
+        try:
+            while True:
+                data = process.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                total_bytes += len(data)
+                data = leftover + data
+                whole = len(data) // (frame * 2) * frame * 2
+                levels.append(frame_levels(np.frombuffer(data[:whole], dtype=np.int16), frame))
+                leftover = data[whole:]
+            process.wait()
+        finally:
+            timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        if timed_out.is_set():
+            raise PreprocessError(f"ffmpeg failed: timed out after {AUDIO_PREPROCESS_TIMEOUT:g}s")
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise PreprocessError(f"ffmpeg failed: {stderr.read().decode(errors='replace').strip()[:200]}")
+    return (np.concatenate(levels) if levels else np.empty(0, dtype=np.float32)), total_bytes // 2
+
+
+def preprocess_file(path: str) -> PreprocessedAudio:
+    """Decode, trim silence, downmix/resample and re-encode one file (blocking)"""
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    # ffmpeg does the decode, downmix and resample in one pass
+    levels, total = decode_levels(path, frame)
+    if not total:
+        raise PreprocessError("No audio samples decoded")
+    start, end, speech_frames = 0, total, 0
+    bounds = detect_speech(levels)
+    if bounds is not None:
+        first, last, speech_frames = bounds
+        start = first * frame
+        # The last partial frame has no level of its own; keep it with the final frame
+        end = total if last == len(levels) else last * frame
+
+    # Re-encode straight from the upload, cut at the speech bounds
+    trim = []
+    if start > 0 or end < total:
+        trim = ["-ss", f"{start / SAMPLE_RATE:.3f}", "-to", f"{end / SAMPLE_RATE:.3f}"]
+    out_path = f"{os.path.splitext(path)[0]}-{uuid.uuid4().hex[:8]}.ogg"
+    try:
+        _ffmpeg(["-i", path, *trim, "-ac", "1", "-ar", str(SAMPLE_RATE),
+                 "-c:a", "libopus", "-b:a", AUDIO_PREPROCESS_BITRATE, "-application", "voip", "-y", out_path])
+    except PreprocessError:
+        # A re-encode that failed partway can leave a truncated file behind
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+        raise
+    return PreprocessedAudio(
+        path=out_path,
+        duration=total / SAMPLE_RATE,
+        speech_duration=speech_frames * frame / SAMPLE_RATE,
+        trimmed_duration=(end - start) / SAMPLE_RATE,
+        input_bytes=os.path.getsize(path),
+        output_bytes=os.path.getsize(out_path),
+    )
+
+
+class AudioPreprocessor:
+    def __init__(self, workers: int = AUDIO_PREPROCESS_WORKERS, mode: str = AUDIO_PREPROCESS):
+        self.workers = workers
+        if mode == "auto":
+            self.enabled = shutil.which(FFMPEG_BINARY) is not None
+        else:
+            self.enabled = mode not in ("0", "false", "off", "")
+        self._executor = None
+
+        self.processed = 0
+        self.failures = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.seconds_trimmed = 0.0
+        self.total_latency = 0.0
+
+    async def run(self, path: str) -> PreprocessedAudio:
+        """Preprocess on the worker pool; raises PreprocessError if the audio cannot be handled"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="audio-preprocess")
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, preprocess_file, path)
+        except PreprocessError:
+            self.failures += 1
+            raise
+        self.processed += 1
+        self.input_bytes += result.input_bytes
+        self.output_bytes += result.output_bytes
+        self.seconds_trimmed += result.duration - result.trimmed_duration
+        self.total_latency += time.perf_counter() - start
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "processed": self.processed,
+            "failures": self.failures,
+            "compression_ratio": round(self.input_bytes / self.output_bytes, 2) if self.output_bytes else 0,
+            "bytes_saved": self.input_bytes - self.output_bytes,
+            "seconds_trimmed": round(self.seconds_trimmed, 1),
+            "avg_latency_ms": round(self.total_latency / self.processed * 1000, 2) if self.processed else 0,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
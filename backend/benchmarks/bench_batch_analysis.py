@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for deferred interview analysis at /complete_session.
+
+Seeds an interview's worth of deferred sessions and analyzes them twice:
+once with a separate LLM call per question and once as a single batched
+call. Reports tokens per question and wall-clock time per interview.
+
+Needs GROQ_API_KEY (the real API is called) and runs against the in-memory
+store unless --mongo-uri is given.
+
+Usage (from backend/):
+    python -m benchmarks.bench_batch_analysis --questions 5 --rounds 3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+
+SAMPLE_ANSWERS = [
+    ("Tell me about yourself.", "hr",
+     "So um I'm a backend developer with about three years of experience, mostly Python and FastAPI, and I like "
+     "building things that are like reliable and easy to maintain."),
+    ("Describe a time you resolved a conflict in your team.", "behavioral",
+     "In my last project two of us disagreed on the database schema. I suggested we write down the trade-offs "
+     "and we um picked the option that made the reporting queries simpler, and it worked out well."),
+    ("How would you design a URL shortener?", "technical",
+     "I would start with an API that takes a long URL, generates a short base62 key from a counter, stores it in a "
+     "key value store, and then I'd put a cache in front for the redirects because reads dominate."),
+    ("What is your biggest weakness?", "hr",
+     "I sometimes spend too long polishing things before I share them, so now I try to um share early drafts "
+     "and ask for feedback sooner."),
+    ("Explain the difference between a process and a thread.", "technical",
+     "A process has its own memory space while threads share the memory of their process, so threads are "
+     "cheaper to create but you need to be careful with shared state and locking."),
+    ("Tell me about a project you are proud of.", "behavioral",
+     "I built an internal dashboard that cut our incident response time. Basically I um pulled metrics from "
+     "three systems into one page and added alerts, and the team still uses it."),
+]
+
+
+async def run(args):
+    import main
+
+    async def seed() -> list:
+        session_ids = []
+        for index in range(args.questions):
+            question, category, transcript = SAMPLE_ANSWERS[index % len(SAMPLE_ANSWERS)]
+            session_ids.append(await main.save_session("bench-user", category, question, transcript, None))
+        return session_ids
+
+    results = {"per_question": [], "batch": []}
+    for _ in range(args.rounds):
+        for mode in results:
+            pending = await main.store.sessions.find_pending_analysis(await seed())
+            report = await main.analyze_pending_sessions(pending, allow_batch=(mode == "batch"))
+            results[mode].append(report)
+
+    print(f"{args.questions} questions per interview, {args.rounds} rounds")
+    print(f"{'mode':<14} {'tokens/question':>16} {'wall ms (median)':>17} {'fallbacks':>10}")
+    for mode, reports in results.items():
+        print(f"{mode:<14} {statistics.mean(r['tokens_per_question'] for r in reports):>16.1f} "
+              f"{statistics.median(r['wall_ms'] for r in reports):>17.1f} "
+              f"{sum(r['per_question_fallbacks'] for r in reports):>10}")
+    await main.groq_pool.aclose()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongomock://")
+    parser.add_argument("--questions", type=int, default=5, help="Answers per interview")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    os.environ["MONGO_URI"] = args.mongo_uri
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark for decoding LLM replies.
+
+Runs every reply in benchmarks/data/malformed_responses.json through the old
+ad-hoc parsers (regex for questions, hand-rolled fence stripping for
+feedback, bare json.loads for /feedback) and through response_decoding.decode,
+and reports parse success rate and per-reply decode cost for each.
+
+Usage (from backend/):
+    python -m benchmarks.bench_decoding
+    python -m benchmarks.bench_decoding --repeat 2000 --verbose
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+from response_decoding import CoachingFeedback, DecodeError, InterviewFeedback, QuestionList, decode
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "malformed_responses.json")
+SCHEMAS = {"feedback": InterviewFeedback, "questions": QuestionList, "coaching": CoachingFeedback}
+
+
+def legacy_questions(response: str):
+    """The old generate_questions parsing"""
+    response = response.strip()
+    if response.startswith("```json"):
+        response = response[7:]
+    if response.startswith("```"):
+        response = response[3:]
+    if response.endswith("```"):
+        response = response[:-3]
+    json_match = re.search(r'\[.*\]', response, re.DOTALL)
+    if json_match:
+        response = json_match.group(0)
+    parsed = json.loads(response)
+    if isinstance(parsed, list):
+        if all(isinstance(item, str) for item in parsed):
+            return parsed
+        elif all(isinstance(item, dict) and 'question' in item for item in parsed):
+            return [item['question'] for item in parsed]
+    raise ValueError("LLM did not return a list of questions")
+
+
+def legacy_feedback(result: str):
+    """The old parse_feedback; missing keys were filled with zeros, which counted as success"""
+    json_str = result
+    if "```json" in result:
+        start = result.find("```json") + 7
+        end = result.find("```", start)
+        if end != -1:
+            json_str = result[start:end].strip()
+    elif "```" in result:
+        start = result.find("```") + 3
+        end = result.find("```", start)
+        if end != -1:
+            json_str = result[start:end].strip()
+    feedback_json = json.loads(json_str)
+    if not isinstance(feedback_json, dict):
+        raise ValueError("LLM did not return a JSON object")
+    return feedback_json
+
+
+LEGACY = {"feedback": legacy_feedback, "questions": legacy_questions, "coaching": json.loads}
+
+
+def usable(schema: str, value) -> bool:
+    """Whether a legacy result would actually have been usable rather than stored as zeros or an error"""
+    if schema == "questions":
+        return bool(value)
+    if not isinstance(value, dict) or "error" in value:
+        return False
+    if schema == "feedback":
+        return isinstance(value.get("scores"), dict)
+    return "overall_feedback" in value
+
+
+def run_legacy(schema: str, response: str) -> bool:
+    try:
+        return usable(schema, LEGACY[schema](response))
+    except Exception:
+        return False
+
+
+def run_decoder(schema: str, response: str) -> bool:
+    try:
+        decode(response, SCHEMAS[schema])
+    except DecodeError:
+        return False
+    return True
+
+
+def measure(runner, entries: list, repeat: int) -> dict:
+    results = {}
+    for schema in SCHEMAS:
+        subset = [entry for entry in entries if entry["schema"] == schema]
+        ok = sum(runner(schema, entry["response"]) for entry in subset)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for entry in subset:
+                runner(schema, entry["response"])
+        elapsed = time.perf_counter() - start
+        results[schema] = {
+            "replies": len(subset),
+            "parsed": ok,
+            "success_rate": round(ok / len(subset), 3) if subset else 0,
+            "avg_decode_us": round(elapsed / (repeat * len(subset)) * 1e6, 2) if subset else 0,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--repeat", type=int, default=500, help="Timing iterations over the corpus")
+    parser.add_argument("--verbose", action="store_true", help="Show the outcome for every reply")
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        entries = json.load(f)
+
+    if args.verbose:
+        print(f"{'schema':<10} {'kind':<28} {'legacy':>7} {'decoder':>8}")
+        for entry in entries:
+            legacy_ok = run_legacy(entry["schema"], entry["response"])
+            decoder_ok = run_decoder(entry["schema"], entry["response"])
+            print(f"{entry['schema']:<10} {entry['kind']:<28} {'ok' if legacy_ok else '-':>7} {'ok' if decoder_ok else '-':>8}")
+        print()
+
+    legacy = measure(run_legacy, entries, args.repeat)
+    decoder = measure(run_decoder, entries, args.repeat)
+    print(f"{'schema':<10} {'replies':>7} {'legacy ok':>10} {'decoder ok':>11} {'legacy us':>10} {'decoder us':>11}")
+    for schema in SCHEMAS:
+        print(f"{schema:<10} {legacy[schema]['replies']:>7} {legacy[schema]['success_rate']:>10.1%} "
+              f"{decoder[schema]['success_rate']:>11.1%} {legacy[schema]['avg_decode_us']:>10} "
+              f"{decoder[schema]['avg_decode_us']:>11}")
+
+
+if __name__ == "__main__":
+    main()
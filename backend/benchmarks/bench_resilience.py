@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Fault-injection run for the circuit breakers, deadlines and hedging.
+
+Starts the fake Groq and AssemblyAI servers and the backend (with short
+breaker and deadline settings so the run takes a minute or two), then
+drives /analyze_interview through phases, changing the fakes' faults with
+their POST /faults endpoints between phases:
+
+- healthy:            no faults
+- groq_slow_tail:     5% of Groq calls take 5 s (hedged after the p95)
+- groq_hang:          Groq never answers (deadline, then the breaker opens)
+- groq_recovered:     faults cleared once the breaker is due for a probe
+- assemblyai_outage:  every AssemblyAI call fails with a 500 (503 after the breaker opens)
+
+For each phase it reports errors, answers that got fallback feedback,
+latency percentiles and the backend's breaker and hedging stats.
+
+Usage (from backend/):
+    python -m benchmarks.bench_resilience --requests 40 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+
+import httpx
+
+from benchmarks.loadtest import percentile, spawn, wait_ready
+
+BREAKER_RESET_SECONDS = 5
+PHASES = (
+    ("healthy", {}, {}),
+    ("groq_slow_tail", {"slow_rate": 0.05, "slow_latency": 5}, {}),
+    ("groq_hang", {"slow_rate": 0, "hang_rate": 1}, {}),
+    ("groq_recovered", {"hang_rate": 0}, {}),
+    ("assemblyai_outage", {}, {"http_error_rate": 1}),
+)
+
+
+async def run_phase(client: httpx.AsyncClient, name: str, requests: int, concurrency: int, audio_kb: int):
+    latencies = []
+    statuses = {}
+    fallbacks = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal fallbacks
+        for _ in remaining:
+            start = asyncio.get_running_loop().time()
+            try:
+                response = await client.post("/analyze_interview", data={
+                    "user_id": "resilience-user", "question": "Tell me about yourself.", "category": "hr",
+                }, files={"audio": ("answer.webm", os.urandom(audio_kb * 1024), "audio/webm")})
+                status = response.status_code
+                if status == 200 and response.json()["feedback"].get("error"):
+                    fallbacks += 1
+            except httpx.HTTPError:
+                status = "client_error"
+            latencies.append(asyncio.get_running_loop().time() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    resilience = (await client.get("/stats")).json()["resilience"]
+    breakers = ", ".join(f"{dep} {stats['state']} (opened {stats['opened']}, rejected {stats['rejected']})"
+                         for dep, stats in resilience["breakers"].items())
+    hedging = resilience["hedging"]["groq"]
+    print(f"{name:<18} {str(statuses):<24} {fallbacks:>9} {percentile(latencies, 0.5) * 1000:>8.0f} "
+          f"{percentile(latencies, 0.95) * 1000:>8.0f}  | {breakers} | hedged {hedging['hedged']}, "
+          f"won {hedging['hedge_wins']}")
+
+
+async def main_async(args):
+    groq_url = f"http://127.0.0.1:{args.groq_port}"
+    assemblyai_url = f"http://127.0.0.1:{args.assemblyai_port}"
+    base_url = f"http://127.0.0.1:{args.port}"
+    processes = [
+        spawn("benchmarks.fake_groq:app", args.groq_port, {"FAKE_GROQ_MALFORMED_RATE": "0"}, args.verbose),
+        spawn("benchmarks.fake_assemblyai:app", args.assemblyai_port, {"FAKE_ASSEMBLYAI_LATENCY": "0.5"},
+              args.verbose),
+        spawn("main:app", args.port, {
+            "GROQ_API_KEY": "fake",
+            "GROQ_BASE_URL": groq_url,
+            "ASSEMBLYAI_API_KEY": "fake",
+            "ASSEMBLYAI_BASE_URL": assemblyai_url,
+            "MONGO_URI": "mongomock://",
+            "REQUEST_DEADLINE_SECONDS": str(args.deadline),
+            "BREAKER_RESET_SECONDS": str(BREAKER_RESET_SECONDS),
+            "GROQ_HEDGE": "1",
+            "HEDGE_MIN_SAMPLES": "10",
+            "HEDGE_MAX_RATIO": "0.2",
+        }, args.verbose),
+    ]
+    try:
+        for url in (f"{groq_url}/stats", f"{assemblyai_url}/stats", f"{base_url}/"):
+            await wait_ready(url)
+        print(f"{'phase':<18} {'statuses':<24} {'fallbacks':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.deadline + 30) as client:
+            for name, groq_faults, assemblyai_faults in PHASES:
+                if name == "groq_recovered":
+                    await asyncio.sleep(BREAKER_RESET_SECONDS)
+                await client.post(f"{groq_url}/faults", json=groq_faults)
+                await client.post(f"{assemblyai_url}/faults", json=assemblyai_faults)
+                await run_phase(client, name, args.requests, args.concurrency, args.audio_kb)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                # The fake Groq server waits for the calls left hanging by groq_hang
+                process.kill()
+                process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40, help="Requests per phase")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--audio-kb", type=int, default=16)
+    parser.add_argument("--deadline", type=float, default=10.0, help="Backend REQUEST_DEADLINE_SECONDS")
+    parser.add_argument("--verbose", action="store_true", help="Show the spawned servers' logs")
+    parser.add_argument("--port", type=int, default=8110)
+    parser.add_argument("--assemblyai-port", type=int, default=8111)
+    parser.add_argument("--groq-port", type=int, default=8112)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GET /session_groups score averaging.
+
+Compares the old per-session N+1 lookup against the single aggregation in
+SessionRepository.average_scores_by_group as a user's history grows, and
+reports round trips and latency for each.
+
+Usage (from backend/):
+    python -m benchmarks.bench_session_groups --rtt-ms 20
+    python -m benchmarks.bench_session_groups --mongo-uri mongodb://localhost:27017/
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import datetime
+
+from database import IN_MEMORY_URI, SCORE_METRICS, connect_store
+from benchmarks.common import RoundTripCounter, instrument_store, timed
+
+BENCH_DATABASE = "preptalk_bench"
+
+
+async def seed_history(store, user_id: str, groups: int, questions: int):
+    for g in range(groups):
+        session_ids = []
+        for q in range(questions):
+            session_ids.append(await store.sessions.insert({
+                "user_id": user_id,
+                "date": datetime.utcnow(),
+                "feedback": {"scores": {metric: random.randint(1, 10) for metric in SCORE_METRICS}},
+            }))
+        group_id = await store.session_groups.insert({
+            "user_id": user_id,
+            "session_ids": session_ids,
+            "created_at": datetime.utcnow(),
+        })
+        await store.sessions.set_group_many(session_ids, group_id)
+
+
+async def legacy_averages(store, user_id: str) -> dict:
+    """The pre-aggregation implementation: one find_one per session"""
+    averages = {}
+    for group in await store.session_groups.list_for_user(user_id):
+        totals = {metric: 0 for metric in SCORE_METRICS}
+        valid = 0
+        for session_id in group.get("session_ids", []):
+            session = await store.sessions.find_by_id(session_id)
+            if session and session.get("feedback") and session["feedback"].get("scores"):
+                for metric in SCORE_METRICS:
+                    totals[metric] += session["feedback"]["scores"].get(metric, 0)
+                valid += 1
+        if valid:
+            averages[str(group["_id"])] = {metric: round(totals[metric] / valid, 2) for metric in SCORE_METRICS}
+    return averages
+
+
+async def aggregated_averages(store, user_id: str) -> dict:
+    groups = await store.session_groups.list_for_user(user_id)
+    return await store.sessions.average_scores_by_group(
+        {str(group["_id"]): group.get("session_ids") for group in groups}
+    )
+
+
+async def run(mongo_uri: str, rtt_ms: float, history: list, questions: int):
+    print(f"{'groups':>6} {'sessions':>8} | {'legacy trips':>12} {'legacy ms':>10} | {'agg trips':>9} {'agg ms':>8}")
+    for groups in history:
+        store = connect_store(mongo_uri, database_name=BENCH_DATABASE)
+        await store.client.drop_database(BENCH_DATABASE)
+        user_id = f"bench_user_{groups}"
+        await seed_history(store, user_id, groups, questions)
+
+        counter = RoundTripCounter(rtt_ms)
+        instrument_store(store, counter)
+
+        legacy, legacy_ms = await timed(legacy_averages(store, user_id))
+        legacy_trips, counter.calls = counter.calls, 0
+        aggregated, agg_ms = await timed(aggregated_averages(store, user_id))
+        agg_trips = counter.calls
+        assert legacy == aggregated, "aggregation disagrees with the legacy averages"
+
+        print(f"{groups:>6} {groups * questions:>8} | {legacy_trips:>12} {legacy_ms:>10.1f} | {agg_trips:>9} {agg_ms:>8.1f}")
+        await store.client.drop_database(BENCH_DATABASE)
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=IN_MEMORY_URI)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated network round trip per call")
+    parser.add_argument("--history", type=int, nargs="+", default=[1, 10, 25, 50])
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.mongo_uri, args.rtt_ms, args.history, args.questions))
+
+
+if __name__ == "__main__":
+    main()
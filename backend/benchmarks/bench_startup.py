@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark for backend cold start.
+
+Launches uvicorn with main:app several times and measures how long it takes
+until /healthz answers (the process accepts traffic) and until /readyz
+reports ready (Mongo connected, indexes, demo user and workers set up).
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --rounds 5
+    python -m benchmarks.bench_startup --mongo-uri mongodb://10.255.255.1:27017/   # unreachable Mongo
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for(client: httpx.Client, url: str, deadline: float, ok_status: int = 200):
+    """Seconds until ``url`` returns ``ok_status``, or None if the deadline passes"""
+    while time.monotonic() < deadline:
+        try:
+            if client.get(url).status_code == ok_status:
+                return time.monotonic()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure(args) -> dict:
+    env = {**os.environ, "MONGO_URI": args.mongo_uri, "GROQ_API_KEY": os.getenv("GROQ_API_KEY", "fake")}
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            deadline = start + args.timeout
+            live = wait_for(client, f"{base}/healthz", deadline)
+            ready = wait_for(client, f"{base}/readyz", deadline) if live else None
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "live_ms": round((live - start) * 1000, 1) if live else None,
+        "ready_ms": round((ready - start) * 1000, 1) if ready else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default="mongomock://")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8110)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Give up on a round after this many seconds")
+    args = parser.parse_args()
+
+    rounds = [measure(args) for _ in range(args.rounds)]
+    print(f"{'round':<6} {'live ms':>10} {'ready ms':>10}")
+    for index, result in enumerate(rounds, 1):
+        print(f"{index:<6} {str(result['live_ms']):>10} {str(result['ready_ms']):>10}")
+    for key in ("live_ms", "ready_ms"):
+        values = [r[key] for r in rounds if r[key] is not None]
+        if values:
+            print(f"median {key}: {statistics.median(values)}")
+        else:
+            print(f"median {key}: never within {args.timeout}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Shared helpers for the PrepTalk benchmarks.
+
+CountingCollection wraps a Motor (or in-memory) collection and counts every
+database round trip, optionally sleeping a simulated network RTT per call so
+the in-memory stand-in behaves like a remote Atlas cluster.
+"""
+
+import asyncio
+import time
+
+
+class RoundTripCounter:
+    def __init__(self, rtt_ms: float = 0.0):
+        self.rtt = rtt_ms / 1000
+        self.calls = 0
+
+    async def tick(self):
+        self.calls += 1
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+
+
+class CountingCursor:
+    def __init__(self, cursor, counter: RoundTripCounter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, *args, **kwargs):
+        self._cursor = self._cursor.limit(*args, **kwargs)
+        return self
+
+    async def to_list(self, length=None):
+        await self._counter.tick()
+        return await self._cursor.to_list(length=length)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await self._counter.tick()
+        async for doc in self._cursor:
+            yield doc
+
+
+class CountingCollection:
+    """Proxy that counts find/aggregate cursors and awaited collection calls"""
+
+    def __init__(self, collection, counter: RoundTripCounter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in ("find", "aggregate"):
+            return lambda *args, **kwargs: CountingCursor(attr(*args, **kwargs), self._counter)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            await self._counter.tick()
+            return await attr(*args, **kwargs)
+        return call
+
+
+def instrument_store(store, counter: RoundTripCounter):
+    """Swap every repository's collection for a counting proxy"""
+    for repo in vars(store).values():
+        if hasattr(repo, "collection"):
+            repo.collection = CountingCollection(repo.collection, counter)
+    return store
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return result, (time.perf_counter() - start) * 1000
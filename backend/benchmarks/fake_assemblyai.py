@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Local fake of the AssemblyAI upload/transcript API.
+
+Jobs finish after FAKE_ASSEMBLYAI_LATENCY seconds (plus FAKE_ASSEMBLYAI_PER_MB
+per uploaded megabyte) and, when a webhook_url was submitted, the fake calls
+it just like the real service. FAKE_ASSEMBLYAI_ERROR_RATE of transcripts
+finish with status "error". For resilience tests FAKE_ASSEMBLYAI_HTTP_ERROR_RATE
+of API calls fail with a 500, FAKE_ASSEMBLYAI_SLOW_RATE take
+FAKE_ASSEMBLYAI_SLOW_LATENCY extra seconds and FAKE_ASSEMBLYAI_HANG_RATE never
+answer; all of these can be changed while the server runs with POST /faults.
+Point the backend at it with ASSEMBLYAI_BASE_URL=http://127.0.0.1:8101 (and any
+ASSEMBLYAI_API_KEY; the fake does not check it).
+
+Usage (from backend/):
+    uvicorn benchmarks.fake_assemblyai:app --port 8101
+    curl -X POST localhost:8101/faults -H 'content-type: application/json' -d '{"http_error_rate": 1}'
+"""
+
+import asyncio
+import os
+import random
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FAKE_ASSEMBLYAI_LATENCY = float(os.getenv("FAKE_ASSEMBLYAI_LATENCY", "1.0"))
+FAKE_ASSEMBLYAI_PER_MB = float(os.getenv("FAKE_ASSEMBLYAI_PER_MB", "0.5"))
+FAKE_ASSEMBLYAI_ERROR_RATE = float(os.getenv("FAKE_ASSEMBLYAI_ERROR_RATE", "0"))
+FAKE_ASSEMBLYAI_HTTP_ERROR_RATE = float(os.getenv("FAKE_ASSEMBLYAI_HTTP_ERROR_RATE", "0"))
+FAKE_ASSEMBLYAI_SLOW_RATE = float(os.getenv("FAKE_ASSEMBLYAI_SLOW_RATE", "0"))
+FAKE_ASSEMBLYAI_SLOW_LATENCY = float(os.getenv("FAKE_ASSEMBLYAI_SLOW_LATENCY", "10"))
+FAKE_ASSEMBLYAI_HANG_RATE = float(os.getenv("FAKE_ASSEMBLYAI_HANG_RATE", "0"))
+FAKE_TRANSCRIPT = "I think my biggest strength is um problem solving and I like working with teams"
+HANG_SECONDS = 3600
+
+app = FastAPI()
+uploads = {}       # upload id -> size in bytes
+transcripts = {}   # transcript id -> job dict
+counters = {"uploads": 0, "submits": 0, "polls": 0, "webhooks": 0, "http_errors": 0, "slow": 0, "hangs": 0}
+# Adjustable at runtime through POST /faults
+faults = {
+    "latency": FAKE_ASSEMBLYAI_LATENCY,
+    "error_rate": FAKE_ASSEMBLYAI_ERROR_RATE,
+    "http_error_rate": FAKE_ASSEMBLYAI_HTTP_ERROR_RATE,
+    "slow_rate": FAKE_ASSEMBLYAI_SLOW_RATE,
+    "slow_latency": FAKE_ASSEMBLYAI_SLOW_LATENCY,
+    "hang_rate": FAKE_ASSEMBLYAI_HANG_RATE,
+}
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    """500s, slow answers and hangs on the API routes, as configured in ``faults``"""
+    if request.url.path.startswith("/v2/"):
+        if random.random() < faults["http_error_rate"]:
+            counters["http_errors"] += 1
+            return JSONResponse(status_code=500, content={"error": "fake upstream failure"})
+        if random.random() < faults["hang_rate"]:
+            counters["hangs"] += 1
+            await asyncio.sleep(HANG_SECONDS)
+        if random.random() < faults["slow_rate"]:
+            counters["slow"] += 1
+            await asyncio.sleep(faults["slow_latency"])
+    return await call_next(request)
+
+
+def fake_words(text: str) -> list:
+    words, start = [], 0
+    for word in text.split():
+        words.append({"text": word, "start": start, "end": start + 300, "confidence": 0.95})
+        start += 400
+    return words
+
+
+@app.post("/v2/upload")
+async def upload(request: Request):
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    upload_id = uuid.uuid4().hex
+    uploads[upload_id] = size
+    counters["uploads"] += 1
+    return {"upload_url": f"fake://upload/{upload_id}"}
+
+
+@app.post("/v2/transcript")
+async def submit(request: Request):
+    body = await request.json()
+    upload_id = body["audio_url"].rsplit("/", 1)[-1]
+    size = uploads.get(upload_id, 0)
+    transcript_id = uuid.uuid4().hex
+    failed = random.random() < faults["error_rate"]
+    job = {
+        "id": transcript_id,
+        "ready_at": time.monotonic() + faults["latency"] + FAKE_ASSEMBLYAI_PER_MB * size / 1_000_000,
+        "status": "error" if failed else "completed",
+        "size": size,
+    }
+    transcripts[transcript_id] = job
+    counters["submits"] += 1
+    if body.get("webhook_url"):
+        headers = {}
+        if body.get("webhook_auth_header_name"):
+            headers[body["webhook_auth_header_name"]] = body.get("webhook_auth_header_value", "")
+        asyncio.create_task(deliver_webhook(body["webhook_url"], headers, job))
+    return {"id": transcript_id, "status": "queued"}
+
+
+async def deliver_webhook(url: str, headers: dict, job: dict):
+    await asyncio.sleep(max(0.0, job["ready_at"] - time.monotonic()))
+    async with httpx.AsyncClient() as client:
+        await client.post(url, headers=headers, json={"transcript_id": job["id"], "status": job["status"]})
+    counters["webhooks"] += 1
+
+
+@app.get("/v2/transcript/{transcript_id}")
+async def poll(transcript_id: str):
+    counters["polls"] += 1
+    job = transcripts.get(transcript_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "not found"})
+    if time.monotonic() < job["ready_at"]:
+        return {"id": transcript_id, "status": "processing"}
+    if job["status"] == "error":
+        return {"id": transcript_id, "status": "error", "error": "fake transcription failure"}
+    return {
+        "id": transcript_id,
+        "status": "completed",
+        "text": FAKE_TRANSCRIPT,
+        "words": fake_words(FAKE_TRANSCRIPT),
+        "audio_duration": round(len(FAKE_TRANSCRIPT.split()) * 0.4, 2),
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+@app.get("/faults")
+async def get_faults():
+    return faults
+
+
+@app.post("/faults")
+async def set_faults(request: Request):
+    """Change fault settings while running, e.g. {"http_error_rate": 1.0} to simulate an outage"""
+    changes = await request.json()
+    unknown = set(changes) - set(faults)
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"Unknown faults: {', '.join(sorted(unknown))}"})
+    faults.update({name: float(value) for name, value in changes.items()})
+    return faults
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Local fake of the Groq chat-completions API.
+
+Replies look like what the backend asks for (question lists, interview
+feedback, batch feedback, coaching feedback) and take FAKE_GROQ_LATENCY
+seconds plus FAKE_GROQ_PER_TOKEN per completion token. FAKE_GROQ_MALFORMED_RATE
+of replies come back fenced, wrapped in prose, with trailing commas or
+truncated, and FAKE_GROQ_ERROR_RATE of calls fail with a 500. For
+resilience tests FAKE_GROQ_SLOW_RATE of calls take FAKE_GROQ_SLOW_LATENCY
+seconds instead (a latency tail) and FAKE_GROQ_HANG_RATE never answer; all
+of these can be changed while the server runs with POST /faults. Point the
+backend at it with GROQ_BASE_URL=http://127.0.0.1:8102.
+
+Usage (from backend/):
+    uvicorn benchmarks.fake_groq:app --port 8102
+    curl -X POST localhost:8102/faults -H 'content-type: application/json' -d '{"error_rate": 1}'
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_GROQ_LATENCY = float(os.getenv("FAKE_GROQ_LATENCY", "0.5"))
+FAKE_GROQ_PER_TOKEN = float(os.getenv("FAKE_GROQ_PER_TOKEN", "0.002"))
+FAKE_GROQ_MALFORMED_RATE = float(os.getenv("FAKE_GROQ_MALFORMED_RATE", "0.1"))
+FAKE_GROQ_ERROR_RATE = float(os.getenv("FAKE_GROQ_ERROR_RATE", "0"))
+FAKE_GROQ_SLOW_RATE = float(os.getenv("FAKE_GROQ_SLOW_RATE", "0"))
+FAKE_GROQ_SLOW_LATENCY = float(os.getenv("FAKE_GROQ_SLOW_LATENCY", "10"))
+FAKE_GROQ_HANG_RATE = float(os.getenv("FAKE_GROQ_HANG_RATE", "0"))
+HANG_SECONDS = 3600
+
+app = FastAPI()
+counters = {"completions": 0, "streams": 0, "malformed": 0, "errors": 0, "slow": 0, "hangs": 0,
+            "completion_tokens": 0}
+# Adjustable at runtime through POST /faults
+faults = {
+    "latency": FAKE_GROQ_LATENCY,
+    "malformed_rate": FAKE_GROQ_MALFORMED_RATE,
+    "error_rate": FAKE_GROQ_ERROR_RATE,
+    "slow_rate": FAKE_GROQ_SLOW_RATE,
+    "slow_latency": FAKE_GROQ_SLOW_LATENCY,
+    "hang_rate": FAKE_GROQ_HANG_RATE,
+}
+
+
+def fake_feedback() -> dict:
+    return {
+        "scores": {metric: random.randint(4, 9) for metric in ("fluency", "grammar", "confidence", "overall")},
+        "analysis": {
+            "strengths": ["Clear structure", "Relevant example"],
+            "improvements": ["Reduce filler words"],
+            "fillerWords": {"count": 2, "words": ["um", "like"]},
+            "sentiment": "positive",
+            "tone": "professional",
+        },
+        "tips": ["Pause instead of saying um", "Quantify the impact"],
+    }
+
+
+def fake_reply(prompt: str, json_mode: bool) -> str:
+    if '"answers"' in prompt:
+        count = len(re.findall(r"^Answer \d+$", prompt, re.MULTILINE))
+        # Real models often quote the ids
+        return json.dumps({"answers": [{"id": str(i), **fake_feedback()} for i in range(1, count + 1)]})
+    if "interview questions" in prompt:
+        match = re.search(r"Generate exactly (\d+)", prompt)
+        count = int(match.group(1)) if match else 1
+        questions = [f"Fake question {uuid.uuid4().hex[:8]}: describe a time you handled situation {i}?"
+                     for i in range(count)]
+        return json.dumps({"questions": questions} if json_mode else questions)
+    if "overall_feedback" in prompt:
+        return json.dumps({
+            "questions": [{"id": 1, "conceptual_correctness": "Mostly correct", "confidence": "medium", "details": "Good"}],
+            "overall_feedback": "Clear answers overall.",
+            "strong_points": ["Structure"],
+            "weak_points": ["Filler words"],
+            "suggestions": ["Practice with a timer"],
+        })
+    return json.dumps(fake_feedback())
+
+
+def malform(content: str) -> str:
+    kind = random.choice(("fence", "prose", "trailing_comma", "truncate"))
+    if kind == "fence":
+        return f"```json\n{content}\n```"
+    if kind == "prose":
+        return f"Here is the analysis you asked for:\n\n{content}\n\nLet me know if you need anything else."
+    if kind == "trailing_comma":
+        return content[:-1] + ",}" if content.endswith("}") else content
+    return content[:max(1, int(len(content) * 0.8))]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if random.random() < faults["error_rate"]:
+        counters["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": {"message": "fake upstream failure"}})
+    if random.random() < faults["hang_rate"]:
+        counters["hangs"] += 1
+        await asyncio.sleep(HANG_SECONDS)
+
+    latency = faults["latency"]
+    if random.random() < faults["slow_rate"]:
+        counters["slow"] += 1
+        latency = faults["slow_latency"]
+    prompt = body["messages"][-1]["content"]
+    json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+    content = fake_reply(prompt, json_mode)
+    if random.random() < faults["malformed_rate"]:
+        counters["malformed"] += 1
+        content = malform(content)
+    completion_tokens = estimate_tokens(content)
+    counters["completion_tokens"] += completion_tokens
+    usage = {
+        "prompt_tokens": estimate_tokens(prompt),
+        "completion_tokens": completion_tokens,
+        "total_tokens": estimate_tokens(prompt) + completion_tokens,
+    }
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    delay = latency + FAKE_GROQ_PER_TOKEN * completion_tokens
+
+    if body.get("stream"):
+        counters["streams"] += 1
+
+        async def chunks():
+            pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+            await asyncio.sleep(latency)
+            for piece in pieces:
+                await asyncio.sleep(FAKE_GROQ_PER_TOKEN * estimate_tokens(piece))
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    counters["completions"] += 1
+    await asyncio.sleep(delay)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+@app.get("/faults")
+async def get_faults():
+    return faults
+
+
+@app.post("/faults")
+async def set_faults(request: Request):
+    """Change fault settings while running, e.g. {"error_rate": 1.0} to simulate an outage"""
+    changes = await request.json()
+    unknown = set(changes) - set(faults)
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"Unknown faults: {', '.join(sorted(unknown))}"})
+    faults.update({name: float(value) for name, value in changes.items()})
+    return faults
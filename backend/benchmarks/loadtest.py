@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the PrepTalk backend.
+
+Starts the fake Groq and AssemblyAI servers and the backend against the
+in-memory Mongo stand-in, then drives /analyze_interview, /question,
+/user-progress, /complete_session and /session_groups at the configured
+concurrency. Reports p50/p95/p99 latency and requests per second per
+endpoint and saves the results as JSON; pass an earlier results file with
+--baseline to flag regressions.
+
+The stand-in is mongomock-motor, which is not a runtime dependency; install
+the dev requirements first:
+    pip install -r requirements-dev.txt
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --concurrency 20 --requests 200
+    python -m benchmarks.loadtest --no-spawn --base-url http://127.0.0.1:8000
+    python -m benchmarks.loadtest --baseline benchmarks/results/loadtest-20260101-120000.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERS = 10
+QUESTIONS_PER_INTERVIEW = 3
+REGRESSION_THRESHOLD = 0.2  # p95 or RPS worse by more than this fraction
+
+
+def percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": round((len(latencies) + errors) / elapsed, 2) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+    }
+
+
+async def drive(name: str, make_request, total: int, concurrency: int) -> dict:
+    """Issue ``total`` requests with at most ``concurrency`` in flight"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in remaining:
+            start = time.perf_counter()
+            try:
+                response = await make_request(index)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, errors, time.perf_counter() - start)
+    print(f"{name:<20} {result['requests']:>6} {result['errors']:>6} {result['rps']:>8} "
+          f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}")
+    return result
+
+
+async def run_scenarios(base_url: str, args) -> dict:
+    sessions = {f"load-user-{u}": [] for u in range(USERS)}
+    users = list(sessions)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+
+        async def analyze(index):
+            user_id = users[index % USERS]
+            # Fresh random audio each time, so the transcript cache does not hide AssemblyAI
+            response = await client.post("/analyze_interview", data={
+                "user_id": user_id, "question": "Tell me about yourself.", "category": "hr",
+            }, files={"audio": ("answer.webm", os.urandom(args.audio_kb * 1024), "audio/webm")})
+            if response.status_code == 200:
+                sessions[user_id].append(response.json()["session_id"])
+            return response
+
+        async def question(index):
+            return await client.get("/question", params={"category": random.choice(("hr", "technical", "behavioral"))})
+
+        async def user_progress(index):
+            return await client.get(f"/user-progress/{users[index % USERS]}", params={"limit": 20})
+
+        async def complete_session(index):
+            user_id = users[index % USERS]
+            batch = sessions[user_id][:QUESTIONS_PER_INTERVIEW] or ["000000000000000000000000"]
+            del sessions[user_id][:QUESTIONS_PER_INTERVIEW]
+            return await client.post("/complete_session", data={"user_id": user_id, "session_ids": ",".join(batch)})
+
+        async def session_groups(index):
+            return await client.get("/session_groups", params={"user_id": users[index % USERS]})
+
+        print(f"{'endpoint':<20} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        results = {}
+        # Order matters: analysis creates the sessions the later endpoints read and group
+        results["analyze_interview"] = await drive("analyze_interview", analyze, args.requests, args.concurrency)
+        results["question"] = await drive("question", question, args.requests, args.concurrency)
+        results["user_progress"] = await drive("user_progress", user_progress, args.requests, args.concurrency)
+        interviews = max(1, args.requests // QUESTIONS_PER_INTERVIEW)
+        results["complete_session"] = await drive("complete_session", complete_session, interviews, args.concurrency)
+        results["session_groups"] = await drive("session_groups", session_groups, args.requests, args.concurrency)
+    return results
+
+
+def spawn(module: str, port: int, env: dict, verbose: bool) -> subprocess.Popen:
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env}, stdout=output, stderr=output,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\nCompared with {baseline_path}:")
+    regressions = 0
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        p95_change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0
+        rps_change = (current["rps"] - previous["rps"]) / previous["rps"] if previous["rps"] else 0
+        flag = p95_change > REGRESSION_THRESHOLD or rps_change < -REGRESSION_THRESHOLD
+        regressions += flag
+        print(f"{name:<20} p95 {p95_change:+.0%}  rps {rps_change:+.0%}{'  REGRESSION' if flag else ''}")
+    return regressions
+
+
+async def main_async(args) -> dict:
+    processes = []
+    base_url = args.base_url
+    try:
+        if args.spawn:
+            processes.append(spawn("benchmarks.fake_groq:app", args.groq_port, {}, args.verbose))
+            processes.append(spawn("benchmarks.fake_assemblyai:app", args.assemblyai_port, {}, args.verbose))
+            processes.append(spawn("main:app", args.port, {
+                "GROQ_API_KEY": "fake",
+                "GROQ_BASE_URL": f"http://127.0.0.1:{args.groq_port}",
+                "ASSEMBLYAI_API_KEY": "fake",
+                "ASSEMBLYAI_BASE_URL": f"http://127.0.0.1:{args.assemblyai_port}",
+                "MONGO_URI": "mongomock://",
+            }, args.verbose))
+            base_url = f"http://127.0.0.1:{args.port}"
+            for url in (f"http://127.0.0.1:{args.groq_port}/stats", f"http://127.0.0.1:{args.assemblyai_port}/stats",
+                        f"{base_url}/"):
+                await wait_ready(url)
+        return await run_scenarios(base_url, args)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint")
+    parser.add_argument("--audio-kb", type=int, default=64, help="Size of each uploaded answer")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--no-spawn", dest="spawn", action="store_false",
+                        help="Use an already running backend at --base-url")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--verbose", action="store_true", help="Show the spawned servers' logs")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--assemblyai-port", type=int, default=8101)
+    parser.add_argument("--groq-port", type=int, default=8102)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/loadtest-<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    output = args.output or os.path.join(RESULTS_DIR, f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "config": {"concurrency": args.concurrency, "requests": args.requests, "audio_kb": args.audio_kb,
+                       "spawned_fakes": args.spawn},
+            "fakes": {name: os.getenv(name) for name in (
+                "FAKE_GROQ_LATENCY", "FAKE_GROQ_PER_TOKEN", "FAKE_GROQ_MALFORMED_RATE", "FAKE_GROQ_ERROR_RATE",
+                "FAKE_GROQ_SLOW_RATE", "FAKE_GROQ_SLOW_LATENCY", "FAKE_GROQ_HANG_RATE",
+                "FAKE_ASSEMBLYAI_LATENCY", "FAKE_ASSEMBLYAI_PER_MB", "FAKE_ASSEMBLYAI_ERROR_RATE",
+                "FAKE_ASSEMBLYAI_HTTP_ERROR_RATE", "FAKE_ASSEMBLYAI_SLOW_RATE", "FAKE_ASSEMBLYAI_SLOW_LATENCY",
+                "FAKE_ASSEMBLYAI_HANG_RATE",
+            ) if os.getenv(name)},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved {output}")
+    if args.baseline and compare(results, args.baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Two-tier result caches for PrepTalk.
+
+TTLCache is an in-process LRU with per-entry expiry. MongoCacheTier keeps
+entries in a MongoDB collection with a TTL index (declared in indexes.py) so they survive restarts
+and are shared between workers. TieredCache checks memory first, then
+Mongo, and promotes persistent hits back into memory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Persistent tier lifetimes; also used by the TTL indexes declared in indexes.py
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+
+
+def prompt_cache_key(prompt: str, model: str, temperature: float, prompt_version: str = "") -> str:
+    """Key for an LLM result: whitespace-normalized prompt plus everything that changes the output"""
+    normalized = " ".join(prompt.split())
+    payload = json.dumps([normalized, model, temperature, prompt_version])
+    return "llm:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TTLCache:
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MongoCacheTier:
+    """Cache entries stored as {_id: key, value, created_at}; expired by a TTL index"""
+
+    def __init__(self, get_collection, ttl: float):
+        # A callable so the tier follows the store if it is swapped at startup
+        self._get_collection = get_collection
+        self.ttl = ttl
+
+    async def get(self, key):
+        doc = await self._get_collection().find_one({"_id": key})
+        if not doc:
+            return None
+        # The TTL monitor only runs once a minute, so check age ourselves too
+        if doc.get("created_at") and doc["created_at"] < datetime.utcnow() - timedelta(seconds=self.ttl):
+            return None
+        return doc.get("value")
+
+    async def set(self, key, value):
+        await self._get_collection().replace_one(
+            {"_id": key},
+            {"_id": key, "value": value, "created_at": datetime.utcnow()},
+            upsert=True
+        )
+
+
+class TieredCache:
+    def __init__(self, name: str, memory: TTLCache, persistent: MongoCacheTier = None):
+        self.name = name
+        self.memory = memory
+        self.persistent = persistent
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.counters = {}
+        self.timings = {}  # name -> [calls, total seconds]
+
+    async def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if self.persistent:
+            try:
+                value = await self.persistent.get(key)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"{self.name} cache read failed: {e}")
+                value = None
+            if value is not None:
+                self.persistent_hits += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key, value):
+        self.memory.set(key, value)
+        if self.persistent:
+            try:
+                await self.persistent.set(key, value)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"{self.name} cache write failed: {e}")
+
+    def count(self, counter: str, amount: float = 1):
+        """Accumulate a caller-defined counter reported alongside the hit stats"""
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        """Record a latency sample, e.g. for cached vs uncached lookups"""
+        timing = self.timings.setdefault(name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0,
+            "evictions": self.memory.evictions,
+            "errors": self.errors,
+            **self.counters,
+            **{f"{name}_avg_latency_ms": round(total / calls * 1000, 2) for name, (calls, total) in self.timings.items()},
+        }
@@ -0,0 +1,439 @@
+"""
+Async MongoDB data-access layer for PrepTalk.
+
+Endpoints talk to the repositories below instead of calling pymongo
+directly, so every database round trip is awaited on Motor and never
+blocks the event loop. Set MONGO_URI=mongomock:// to run against an
+in-memory stand-in (mongomock-motor, from requirements-dev.txt).
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from indexes import reconcile_indexes
+from metrics import MongoCommandTimer, timed_methods
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = "preptalk"
+IN_MEMORY_URI = "mongomock://"
+
+# Connection pool tuning; defaults suit a single uvicorn worker on Render
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
+SCORE_METRICS = ("fluency", "grammar", "confidence", "overall")
+# Deferred analyses that failed this many times are no longer picked up for retries
+ANALYSIS_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3"))
+
+
+def to_object_ids(ids) -> list:
+    """Convert string IDs to ObjectIds, skipping any that are malformed"""
+    object_ids = []
+    for value in ids:
+        try:
+            object_ids.append(ObjectId(value))
+        except Exception:
+            continue
+    return object_ids
+
+
+def average_from_sums(sums: dict, count: int) -> dict:
+    """Turn per-metric score sums into two-decimal averages"""
+    if not count:
+        return {metric: 0 for metric in SCORE_METRICS}
+    return {metric: round(sums.get(metric, 0) / count, 2) for metric in SCORE_METRICS}
+
+
+def create_client(uri: str, server_selection_timeout_ms: int = 5000):
+    """Build a Motor client with the tuned pool, or the in-memory stand-in"""
+    if uri.startswith(IN_MEMORY_URI):
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()
+    return AsyncIOMotorClient(
+        uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=server_selection_timeout_ms,
+        socketTimeoutMS=20000,
+        connectTimeoutMS=20000,
+        retryWrites=True,
+        event_listeners=[MongoCommandTimer()],
+    )
+
+
+@timed_methods("mongo")
+class UserRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_by_email(self, email: str):
+        return await self.collection.find_one({"email": email})
+
+    async def insert(self, user: dict) -> str:
+        result = await self.collection.insert_one(user)
+        return str(result.inserted_id)
+
+
+@timed_methods("mongo")
+class SessionRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, session: dict) -> str:
+        result = await self.collection.insert_one(session)
+        return str(result.inserted_id)
+
+    async def find_by_id(self, session_id: str):
+        return await self.collection.find_one({"_id": ObjectId(session_id)})
+
+    async def list_for_user(self, user_id: str, fields: list = None, limit: int = None, after: tuple = None) -> list:
+        """Sessions for a user, newest first.
+
+        ``after`` is a ``(date, ObjectId)`` cursor from the previous page and
+        ``fields`` an optional projection; both use the (user_id, date, _id) index.
+        """
+        query = {"user_id": user_id}
+        if after:
+            after_date, after_id = after
+            query["$or"] = [
+                {"date": {"$lt": after_date}},
+                {"date": after_date, "_id": {"$lt": after_id}},
+            ]
+        projection = {field: 1 for field in fields} if fields else None
+        cursor = self.collection.find(query, projection).sort([("date", -1), ("_id", -1)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def progress_rows(self, user_id: str) -> list:
+        """Just the fields the progress summary needs, oldest first, via the (user_id, date) index"""
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$sort": {"date": 1}},
+            {"$project": {
+                "_id": 0,
+                "date": 1,
+                "category": 1,
+                "scores": "$feedback.scores",
+                "filler_count": "$feedback.analysis.fillerWords.count",
+                "filler_words": "$feedback.analysis.fillerWords.words",
+                "filler_by_word": "$speech_metrics.fillerWords.by_word",
+            }},
+        ]
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+    async def average_scores_by_group(self, groups: dict) -> dict:
+        """Average feedback scores per session group in a single aggregation.
+
+        ``groups`` maps a session group id to its ``session_ids``; membership comes
+        from that list, not from the sessions' own ``session_group_id`` tag, and a
+        session counts towards every group that lists it. Only sessions that have
+        a non-empty ``feedback.scores`` object count towards the average; a
+        missing metric counts as 0. Returns ``{session_group_id: {metric: average}}``
+        rounded to two places.
+        """
+        membership = []
+        object_ids = set()
+        for group_id, session_ids in groups.items():
+            ids = to_object_ids(session_ids or [])
+            if ids:
+                membership.append({"group": group_id, "sessions": ids})
+                object_ids.update(ids)
+        if not object_ids:
+            return {}
+        pipeline = [
+            {"$match": {"_id": {"$in": list(object_ids)}, "feedback.scores": {"$type": "object", "$ne": {}}}},
+            # Tag each session with the groups listing it, then average once per group
+            {"$project": {
+                "feedback.scores": 1,
+                "group": {"$map": {
+                    "input": {"$filter": {
+                        "input": {"$literal": membership},
+                        "as": "member",
+                        "cond": {"$in": ["$_id", "$$member.sessions"]},
+                    }},
+                    "as": "member",
+                    "in": "$$member.group",
+                }},
+            }},
+            {"$unwind": "$group"},
+            {"$group": {
+                "_id": "$group",
+                **{metric: {"$avg": {"$ifNull": [f"$feedback.scores.{metric}", 0]}} for metric in SCORE_METRICS},
+            }},
+        ]
+        averages = {}
+        async for row in self.collection.aggregate(pipeline):
+            averages[row["_id"]] = {metric: round(row[metric] or 0, 2) for metric in SCORE_METRICS}
+        return averages
+
+    async def score_sums(self, session_ids: list):
+        """Sum feedback scores over the given sessions; returns (sums, scored_count)"""
+        object_ids = to_object_ids(session_ids)
+        sums = {metric: 0 for metric in SCORE_METRICS}
+        if not object_ids:
+            return sums, 0
+        pipeline = [
+            {"$match": {"_id": {"$in": object_ids}, "feedback.scores": {"$type": "object", "$ne": {}}}},
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                **{metric: {"$sum": {"$ifNull": [f"$feedback.scores.{metric}", 0]}} for metric in SCORE_METRICS},
+            }},
+        ]
+        async for row in self.collection.aggregate(pipeline):
+            return {metric: row[metric] for metric in SCORE_METRICS}, row["count"]
+        return sums, 0
+
+    async def find_pending_analysis(self, session_ids: list) -> list:
+        """Deferred sessions whose feedback has not been generated yet, or failed and may be retried"""
+        return await self.collection.find(
+            {
+                "_id": {"$in": to_object_ids(session_ids)},
+                "analysis_status": {"$in": ["pending", "failed"]},
+                "analysis_attempts": {"$not": {"$gte": ANALYSIS_MAX_ATTEMPTS}},
+            },
+            {"question": 1, "category": 1, "transcript": 1, "speech_metrics": 1},
+        ).to_list(length=None)
+
+    async def set_feedback(self, session_id, feedback: dict):
+        await self.collection.update_one(
+            {"_id": ObjectId(session_id)},
+            {"$set": {"feedback": feedback, "analysis_status": "done"}, "$unset": {"analysis_error": ""}}
+        )
+
+    async def set_analysis_failed(self, session_id, error: str):
+        """Leave the feedback empty so the session is retried, not scored as zeros"""
+        await self.collection.update_one(
+            {"_id": ObjectId(session_id)},
+            {"$set": {"analysis_status": "failed", "analysis_error": error}, "$inc": {"analysis_attempts": 1}}
+        )
+
+    async def set_group_many(self, session_ids: list, session_group_id: str) -> int:
+        """Tag sessions with their group in a single update_many"""
+        object_ids = to_object_ids(session_ids)
+        if not object_ids:
+            return 0
+        result = await self.collection.update_many(
+            {"_id": {"$in": object_ids}},
+            {"$set": {"session_group_id": session_group_id}}
+        )
+        return result.modified_count
+
+
+@timed_methods("mongo")
+class CounterRepository:
+    """Named sequences stored as {_id: name, seq}, advanced with an atomic $inc"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def next(self, name: str, seed) -> int:
+        """Next value of a sequence; ``seed()`` gives its starting point the first time it is used"""
+        counter = await self.collection.find_one_and_update(
+            {"_id": name}, {"$inc": {"seq": 1}}, return_document=ReturnDocument.AFTER
+        )
+        if counter is None:
+            try:
+                await self.collection.insert_one({"_id": name, "seq": await seed()})
+            except DuplicateKeyError:
+                pass  # a concurrent request seeded it first
+            counter = await self.collection.find_one_and_update(
+                {"_id": name}, {"$inc": {"seq": 1}}, return_document=ReturnDocument.AFTER
+            )
+        return counter["seq"]
+
+
+@timed_methods("mongo")
+class SessionGroupRepository:
+    def __init__(self, collection, counters: CounterRepository):
+        self.collection = collection
+        self.counters = counters
+
+    async def count_for_user(self, user_id: str) -> int:
+        return await self.collection.count_documents({"user_id": user_id})
+
+    async def next_number(self, user_id: str) -> int:
+        """The user's next session number, unique even under concurrent completions.
+
+        Counters for users who had groups before numbering moved here are
+        seeded from their existing group count.
+        """
+        return await self.counters.next(f"session_groups:{user_id}", lambda: self.count_for_user(user_id))
+
+    async def insert(self, group: dict) -> str:
+        result = await self.collection.insert_one(group)
+        return str(result.inserted_id)
+
+    async def find_by_id(self, session_group_id: str):
+        return await self.collection.find_one({"_id": ObjectId(session_group_id)})
+
+    async def list_for_user(self, user_id: str) -> list:
+        """All session groups for a user, newest first"""
+        return await self.collection.find({"user_id": user_id}).sort("created_at", -1).to_list(length=None)
+
+    async def set_scores(self, session_group_id: str, sums: dict, scored_count: int):
+        await self.collection.update_one(
+            {"_id": ObjectId(session_group_id)},
+            {"$set": {"score_sums": sums, "score_count": scored_count,
+                      "average_scores": average_from_sums(sums, scored_count)}}
+        )
+
+    async def rename(self, session_group_id: str, session_name: str) -> int:
+        result = await self.collection.update_one(
+            {"_id": ObjectId(session_group_id)},
+            {"$set": {"session_name": session_name}}
+        )
+        return result.modified_count
+
+
+@timed_methods("mongo")
+class UserStatsRepository:
+    """Per-user running score totals, maintained with atomic $inc updates"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def add_group(self, user_id: str, sums: dict, scored_count: int, question_count: int):
+        increments = {
+            "group_count": 1,
+            "question_count": question_count,
+            "score_count": scored_count,
+            **{f"score_sums.{metric}": sums.get(metric, 0) for metric in SCORE_METRICS},
+        }
+        await self.collection.update_one({"user_id": user_id}, {"$inc": increments}, upsert=True)
+
+    async def add_scores(self, user_id: str, sums: dict, scored_count: int):
+        """Add scores that arrived after their group was completed (a retried analysis)"""
+        increments = {
+            "score_count": scored_count,
+            **{f"score_sums.{metric}": sums.get(metric, 0) for metric in SCORE_METRICS},
+        }
+        await self.collection.update_one({"user_id": user_id}, {"$inc": increments}, upsert=True)
+
+    async def find(self, user_id: str):
+        return await self.collection.find_one({"user_id": user_id})
+
+
+@timed_methods("mongo")
+class ProfileRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find(self, user_id: str):
+        return await self.collection.find_one({"userId": user_id})
+
+    async def upsert(self, user_id: str, data: dict):
+        await self.collection.update_one({"userId": user_id}, {"$set": data}, upsert=True)
+
+
+@timed_methods("mongo")
+class InterviewRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, record: dict) -> str:
+        result = await self.collection.insert_one(record)
+        return str(result.inserted_id)
+
+    async def recent(self, user_id: str, limit: int = 5) -> list:
+        return await self.collection.find({"user_id": user_id}).sort("_id", -1).limit(limit).to_list(length=limit)
+
+
+@timed_methods("mongo")
+class JobRepository:
+    """Persistent records for background analysis jobs, keyed by a string job_id"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, job: dict) -> str:
+        await self.collection.insert_one(job)
+        return job["_id"]
+
+    async def find_by_id(self, job_id: str):
+        return await self.collection.find_one({"_id": job_id})
+
+    async def update(self, job_id: str, fields: dict, owner: str = None) -> bool:
+        """Set fields on a job; with ``owner``, only while that worker still holds it"""
+        query = {"_id": job_id}
+        if owner is not None:
+            query["owner"] = owner
+        result = await self.collection.update_one(query, {"$set": fields})
+        return result.matched_count > 0
+
+    @staticmethod
+    def _claimable(now: datetime) -> dict:
+        # Queued jobs, and running jobs whose worker stopped renewing its lease
+        # (records from before leases existed have none and count as expired)
+        return {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$not": {"$gte": now}}},
+        ]}
+
+    async def claim(self, job_id: str, owner: str, lease_seconds: float):
+        """Atomically mark a claimable job running for ``owner``; None if another worker has it"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, **self._claimable(now)},
+            {"$set": {"status": "running", "owner": owner, "started_at": now,
+                      "lease_until": now + timedelta(seconds=lease_seconds)}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def renew(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease on a running job; False once ``owner`` has lost it"""
+        result = await self.collection.update_one(
+            {"_id": job_id, "status": "running", "owner": owner},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=lease_seconds)}},
+        )
+        return result.matched_count > 0
+
+    async def list_recoverable(self) -> list:
+        """Queued jobs and running jobs with an expired lease, in the order they should be resumed"""
+        return await self.collection.find(
+            self._claimable(datetime.utcnow())
+        ).sort([("priority", 1), ("created_at", 1)]).to_list(length=None)
+
+
+class MongoStore:
+    """One Motor client plus a repository per collection"""
+
+    def __init__(self, client, database_name: str = DATABASE_NAME):
+        self.client = client
+        self.db = client[database_name]
+        self.users = UserRepository(self.db["users"])
+        self.sessions = SessionRepository(self.db["sessions"])
+        self.counters = CounterRepository(self.db["counters"])
+        self.session_groups = SessionGroupRepository(self.db["session_groups"], self.counters)
+        self.user_stats = UserStatsRepository(self.db["user_stats"])
+        self.profiles = ProfileRepository(self.db["profiles"])
+        self.interviews = InterviewRepository(self.db["interviews"])
+        self.jobs = JobRepository(self.db["analysis_jobs"])
+
+    async def ping(self):
+        await self.client.admin.command("ping")
+
+    async def ensure_indexes(self) -> dict:
+        """Bring the database's indexes in line with indexes.INDEXES"""
+        return await reconcile_indexes(self.db)
+
+    def close(self):
+        self.client.close()
+
+
+def connect_store(uri: str, server_selection_timeout_ms: int = 5000,
+                  database_name: str = DATABASE_NAME) -> MongoStore:
+    """Create a store; the client connects lazily on first use"""
+    return MongoStore(create_client(uri, server_selection_timeout_ms), database_name)
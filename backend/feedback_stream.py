@@ -0,0 +1,143 @@
+"""
+Helpers for streaming interview feedback over Server-Sent Events.
+
+IncrementalJSONParser is fed LLM tokens as they arrive and reports each
+object member the moment its value is complete, so validated fields such
+as the scores can be sent to the browser long before the whole JSON
+document has been generated.
+"""
+
+import json
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "value_start")
+
+    def __init__(self, kind: str):
+        self.kind = kind          # "{" or "["
+        self.key = None           # current member key (objects only)
+        self.value_start = None   # buffer index where the current member's value starts
+
+
+class IncrementalJSONParser:
+    """Single-pass scanner that emits (path, value) for completed object members.
+
+    Any text before the first ``{`` (prose, markdown fences) is skipped.
+    Members are reported for objects nested up to ``max_depth`` deep, as long
+    as no array sits between them and the root, e.g. ``("scores",)`` and
+    ``("analysis", "strengths")``.
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.buffer = ""
+        self.pos = 0
+        self.stack = []
+        self.started = False
+        self.finished = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+        while self.pos < len(buffer) and not self.finished:
+            ch = buffer[self.pos]
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.stack.append(_Frame("{"))
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    top = self.stack[-1]
+                    if top.kind == "{" and top.value_start is None:
+                        try:
+                            top.key = json.loads(buffer[self._string_start:self.pos + 1])
+                        except ValueError:
+                            top.key = None
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self.pos
+            elif ch == ":":
+                top = self.stack[-1]
+                if top.kind == "{":
+                    top.value_start = self.pos + 1
+            elif ch in "{[":
+                self.stack.append(_Frame(ch))
+            elif ch == ",":
+                self._complete_member(completed)
+            elif ch in "}]":
+                if ch == "}":
+                    self._complete_member(completed)
+                self.stack.pop()
+                if not self.stack:
+                    self.finished = True
+            self.pos += 1
+        return completed
+
+    def _complete_member(self, completed: list):
+        top = self.stack[-1]
+        if top.kind != "{" or top.value_start is None:
+            return
+        if len(self.stack) <= self.max_depth and all(frame.kind == "{" for frame in self.stack):
+            raw = self.buffer[top.value_start:self.pos].strip()
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = None
+            else:
+                path = tuple(frame.key for frame in self.stack)
+                completed.append((path, value))
+        top.key = None
+        top.value_start = None
+
+
+def _is_score_map(value) -> bool:
+    return isinstance(value, dict) and all(
+        isinstance(value.get(metric), (int, float)) for metric in ("fluency", "grammar", "confidence", "overall")
+    )
+
+
+def _is_string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# Fields worth sending early from the analyze_interview feedback JSON, with their checks.
+# analysis.fillerWords is counted locally and sent by the endpoint, never taken from the model.
+FEEDBACK_FIELDS = {
+    ("scores",): _is_score_map,
+    ("analysis", "strengths"): _is_string_list,
+    ("analysis", "improvements"): _is_string_list,
+    ("analysis", "sentiment"): lambda value: isinstance(value, str),
+    ("analysis", "tone"): lambda value: isinstance(value, str),
+    ("tips",): _is_string_list,
+}
+
+# Top-level fields of the /feedback coaching JSON
+COACHING_FIELDS = {
+    ("overall_feedback",): lambda value: isinstance(value, str),
+    ("strong_points",): _is_string_list,
+    ("weak_points",): _is_string_list,
+    ("suggestions",): _is_string_list,
+    ("questions",): lambda value: isinstance(value, list),
+}
+
+
+def validated_fields(completed: list, validators: dict) -> list:
+    """Keep only the completed members that are known fields with valid values"""
+    return [
+        (path, value) for path, value in completed
+        if path in validators and validators[path](value)
+    ]
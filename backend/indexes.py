@@ -0,0 +1,220 @@
+"""
+Declared MongoDB indexes and query-plan checks for PrepTalk.
+
+INDEXES lists every index the app relies on. ``plan_index_changes`` compares
+it with what a database actually has and the appliers below create missing
+indexes and rebuild ones whose options changed; the async version runs at
+startup on Motor, the sync one from manage_mongodb.py. Indexes that are not
+declared are reported but never dropped automatically.
+
+HOT_QUERIES are the queries behind the dashboard and auth endpoints, used
+by ``manage_mongodb.py explain`` to flag collection scans.
+"""
+
+import logging
+from dataclasses import dataclass, field
+
+from cache import LLM_CACHE_TTL, TRANSCRIPT_CACHE_TTL
+from jobs import ANALYSIS_JOB_RETENTION
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: tuple                  # ((field, direction), ...)
+    name: str
+    unique: bool = False
+    expire_after: int = None     # seconds, for TTL indexes
+
+    @property
+    def label(self) -> str:
+        return f"{self.collection}.{self.name}"
+
+    def options(self) -> dict:
+        options = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after is not None:
+            options["expireAfterSeconds"] = int(self.expire_after)
+        return options
+
+
+INDEXES = (
+    # /user-progress: filter by user, newest first, cursor pagination on (date, _id)
+    IndexSpec("sessions", (("user_id", 1), ("date", -1), ("_id", -1)), "user_id_date"),
+    # /session_groups: a user's groups, newest first
+    IndexSpec("session_groups", (("user_id", 1), ("created_at", -1)), "user_id_created_at"),
+    IndexSpec("profiles", (("userId", 1),), "userId"),
+    # /login and /register look users up by email
+    IndexSpec("users", (("email", 1),), "email", unique=True),
+    IndexSpec("users", (("username", 1),), "username_1", unique=True),
+    # /recent_interviews: a user's latest records
+    IndexSpec("interviews", (("user_id", 1), ("_id", -1)), "user_id_recent"),
+    IndexSpec("user_stats", (("user_id", 1),), "user_id", unique=True),
+    # Job recovery at startup, and expiry of finished jobs
+    IndexSpec("analysis_jobs", (("status", 1), ("priority", 1), ("created_at", 1)), "status_priority"),
+    IndexSpec("analysis_jobs", (("finished_at", 1),), "finished_at_ttl", expire_after=ANALYSIS_JOB_RETENTION),
+    IndexSpec("transcript_cache", (("created_at", 1),), "created_at_ttl", expire_after=TRANSCRIPT_CACHE_TTL),
+    IndexSpec("llm_cache", (("created_at", 1),), "created_at_ttl", expire_after=LLM_CACHE_TTL),
+)
+
+
+@dataclass
+class HotQuery:
+    name: str
+    collection: str
+    filter: dict
+    sort: list = field(default_factory=list)
+
+
+PROBE_USER = "explain-probe-user"
+
+HOT_QUERIES = (
+    HotQuery("user progress", "sessions", {"user_id": PROBE_USER}, [("date", -1), ("_id", -1)]),
+    HotQuery("session groups", "session_groups", {"user_id": PROBE_USER}, [("created_at", -1)]),
+    HotQuery("profile", "profiles", {"userId": PROBE_USER}),
+    HotQuery("login", "users", {"email": "probe@example.com"}),
+    HotQuery("recent interviews", "interviews", {"user_id": PROBE_USER}, [("_id", -1)]),
+    HotQuery("user stats", "user_stats", {"user_id": PROBE_USER}),
+    HotQuery("unfinished jobs", "analysis_jobs", {"status": {"$in": ["queued", "running"]}},
+             [("priority", 1), ("created_at", 1)]),
+)
+
+
+def _normalize_keys(keys) -> tuple:
+    return tuple((name, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for name, direction in keys)
+
+
+def plan_index_changes(existing: dict, specs=INDEXES) -> dict:
+    """Compare declared specs with ``{collection: index_information()}``.
+
+    Returns ``{"create": [spec], "rebuild": [spec], "ok": [spec], "extra": [(collection, name)]}``.
+    An existing index with the same keys but another name satisfies a spec,
+    as long as its unique/TTL options match.
+    """
+    plan = {"create": [], "rebuild": [], "ok": [], "extra": []}
+    claimed = set()
+    for spec in specs:
+        info = existing.get(spec.collection, {})
+        keys = _normalize_keys(spec.keys)
+        match_name = spec.name if spec.name in info else None
+        if match_name is None:
+            match_name = next((name for name, index in info.items()
+                               if _normalize_keys(index.get("key", ())) == keys), None)
+        if match_name is None:
+            plan["create"].append(spec)
+            continue
+        claimed.add((spec.collection, match_name))
+        index = info[match_name]
+        same = (
+            _normalize_keys(index.get("key", ())) == keys
+            and bool(index.get("unique")) == spec.unique
+            and index.get("expireAfterSeconds") == (int(spec.expire_after) if spec.expire_after is not None else None)
+        )
+        plan["ok" if same else "rebuild"].append(spec)
+        if not same:
+            claimed.discard((spec.collection, match_name))
+            claimed.add((spec.collection, spec.name))
+    for collection, info in existing.items():
+        for name in info:
+            if name != "_id_" and (collection, name) not in claimed:
+                plan["extra"].append((collection, name))
+    return plan
+
+
+def _existing_name(existing: dict, spec: IndexSpec):
+    info = existing.get(spec.collection, {})
+    if spec.name in info:
+        return spec.name
+    keys = _normalize_keys(spec.keys)
+    return next((name for name, index in info.items() if _normalize_keys(index.get("key", ())) == keys), None)
+
+
+def _summary(plan: dict, failed: list) -> dict:
+    return {
+        "created": [spec.label for spec in plan["create"] if spec.label not in failed],
+        "rebuilt": [spec.label for spec in plan["rebuild"] if spec.label not in failed],
+        "unchanged": len(plan["ok"]),
+        "failed": failed,
+        "extra": [f"{collection}.{name}" for collection, name in plan["extra"]],
+    }
+
+
+async def reconcile_indexes(db, specs=INDEXES) -> dict:
+    """Create missing and rebuild changed indexes on a Motor database"""
+    existing = {}
+    for collection in {spec.collection for spec in specs}:
+        existing[collection] = await db[collection].index_information()
+    plan = plan_index_changes(existing, specs)
+    failed = []
+    for spec in plan["create"] + plan["rebuild"]:
+        try:
+            if spec in plan["rebuild"]:
+                await db[spec.collection].drop_index(_existing_name(existing, spec))
+            await db[spec.collection].create_index(list(spec.keys), **spec.options())
+        except Exception as e:
+            # e.g. duplicate emails block a unique index; the app still works without it
+            failed.append(spec.label)
+            logger.warning(f"Could not build index {spec.label}: {e}")
+    summary = _summary(plan, failed)
+    if summary["created"] or summary["rebuilt"] or failed:
+        logger.info(f"Index reconcile: {summary}")
+    return summary
+
+
+def reconcile_indexes_sync(db, specs=INDEXES) -> dict:
+    """Same as reconcile_indexes, for a synchronous pymongo database"""
+    existing = {collection: db[collection].index_information() for collection in {spec.collection for spec in specs}}
+    plan = plan_index_changes(existing, specs)
+    failed = []
+    for spec in plan["create"] + plan["rebuild"]:
+        try:
+            if spec in plan["rebuild"]:
+                db[spec.collection].drop_index(_existing_name(existing, spec))
+            db[spec.collection].create_index(list(spec.keys), **spec.options())
+        except Exception as e:
+            failed.append(spec.label)
+            logger.warning(f"Could not build index {spec.label}: {e}")
+    return _summary(plan, failed)
+
+
+def plan_stages(plan: dict) -> list:
+    """All stage names in an explain() winning plan, outermost first"""
+    stages = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.append(node["stage"])
+        for key in ("inputStage", "queryPlan"):
+            if key in node:
+                stack.append(node[key])
+        stack.extend(node.get("inputStages", []))
+    return stages
+
+
+def explain_hot_queries(db) -> list:
+    """Run explain() for each hot query on a sync pymongo database.
+
+    Returns ``[{"name", "collection", "stages", "collscan", "in_memory_sort"}]``.
+    """
+    results = []
+    for query in HOT_QUERIES:
+        cursor = db[query.collection].find(query.filter)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        explained = cursor.limit(20).explain()
+        stages = plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+        results.append({
+            "name": query.name,
+            "collection": query.collection,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            "in_memory_sort": "SORT" in stages,
+        })
+    return results
@@ -0,0 +1,220 @@
+"""
+Background job queue for long-running interview analysis.
+
+Requests submit a job and get its id back immediately; a fixed number of
+worker tasks pull jobs off a priority queue and run the handler. Every
+state change is written to the job's record in MongoDB, so clients can
+poll it from any worker process, and is also pushed to in-process
+subscribers for the Server-Sent Events channel.
+
+Several processes can share one collection, so a worker claims a job with
+an atomic queued -> running update that stamps its owner id and a lease,
+and renews the lease while the handler runs. At startup a process resumes
+queued jobs and running jobs whose lease has expired; a job another live
+process is working on is left alone.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+ANALYSIS_QUEUE_MAX = int(os.getenv("ANALYSIS_QUEUE_MAX", "500"))
+# Finished jobs are removed by a TTL index after this many seconds
+ANALYSIS_JOB_RETENTION = int(os.getenv("ANALYSIS_JOB_RETENTION", str(7 * 24 * 3600)))
+# A running job whose lease is not renewed for this long is taken to be orphaned
+ANALYSIS_JOB_LEASE_SECONDS = float(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "60"))
+
+JOB_PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+FINISHED_STATUSES = ("done", "failed")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def public_job(job: dict) -> dict:
+    """The job record as returned to clients, without internal fields"""
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "priority": job.get("priority_name"),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+    }
+
+
+class JobQueue:
+    def __init__(self, handler, get_repository, workers: int = ANALYSIS_WORKERS,
+                 max_queued: int = ANALYSIS_QUEUE_MAX, lease_seconds: float = ANALYSIS_JOB_LEASE_SECONDS):
+        """``handler(job)`` does the work and returns the result dict; ``get_repository()`` returns a JobRepository"""
+        self._handler = handler
+        # A callable so the queue follows the store if it is swapped at startup
+        self._get_repository = get_repository
+        self.workers = workers
+        self.max_queued = max_queued
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        self._tasks = []
+        self._queued_ids = set()  # jobs enqueued in this process and not yet picked up
+        self._subscribers = {}  # job_id -> set of asyncio.Queue
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.recovered = 0
+        self.skipped = 0  # claimed by another worker first
+        self.lost = 0  # lease lost while running
+        self.running = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    # --- Submitting ---
+    async def submit(self, params: dict, priority: str = "normal") -> str:
+        """Persist a queued job and enqueue it; raises QueueFull when the backlog is at its limit"""
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull(f"Analysis queue is full ({self.max_queued} jobs waiting)")
+        job = {
+            "_id": uuid.uuid4().hex,
+            "status": "queued",
+            "priority": JOB_PRIORITIES.get(priority, JOB_PRIORITIES["normal"]),
+            "priority_name": priority if priority in JOB_PRIORITIES else "normal",
+            "params": params,
+            "created_at": datetime.utcnow(),
+        }
+        await self._get_repository().insert(job)
+        self._enqueue(job)
+        self.submitted += 1
+        return job["_id"]
+
+    def _enqueue(self, job: dict):
+        self._queued_ids.add(job["_id"])
+        self._queue.put_nowait((job["priority"], next(self._order), job["_id"], time.monotonic()))
+
+    async def get(self, job_id: str):
+        return await self._get_repository().find_by_id(job_id)
+
+    # --- Push channel ---
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        events = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(events)
+        return events
+
+    def unsubscribe(self, job_id: str, events: asyncio.Queue):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers:
+            subscribers.discard(events)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def _publish(self, job_id: str, fields: dict):
+        for events in self._subscribers.get(job_id, ()):
+            events.put_nowait(fields)
+
+    async def _finish(self, job_id: str, fields: dict):
+        # Only the owner may finish a job; if the lease was lost, whoever
+        # reclaimed it writes the outcome instead
+        if await self._get_repository().update(job_id, fields, owner=self.owner):
+            self._publish(job_id, fields)
+        else:
+            self.lost += 1
+            logger.warning(f"Analysis job {job_id} was reclaimed by another worker; dropping this result")
+
+    # --- Workers ---
+    async def _work(self):
+        while True:
+            _, _, job_id, enqueued_at = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            try:
+                await self._run(job_id, enqueued_at)
+            except Exception as e:
+                logger.error(f"Job {job_id} bookkeeping failed: {e}")
+
+    async def _renew(self, job_id: str):
+        repository = self._get_repository()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await repository.renew(job_id, self.owner, self.lease_seconds):
+                    logger.warning(f"Lost the lease on analysis job {job_id}")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew the lease on analysis job {job_id}: {e}")
+
+    async def _run(self, job_id: str, enqueued_at: float):
+        job = await self._get_repository().claim(job_id, self.owner, self.lease_seconds)
+        if job is None:
+            # Finished, missing, or being run by another worker
+            self.skipped += 1
+            return
+        self._publish(job_id, {"status": "running", "started_at": job["started_at"]})
+        self.total_wait += time.monotonic() - enqueued_at
+        self.running += 1
+        start = time.perf_counter()
+        renewer = asyncio.create_task(self._renew(job_id))
+        try:
+            result = await self._handler(job)
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Analysis job {job_id} failed: {e}")
+            outcome = {"status": "failed", "error": str(e), "finished_at": datetime.utcnow()}
+        else:
+            self.completed += 1
+            outcome = {"status": "done", "result": result, "finished_at": datetime.utcnow()}
+        finally:
+            renewer.cancel()
+            self.running -= 1
+            self.total_run += time.perf_counter() - start
+        await self._finish(job_id, outcome)
+
+    # --- Lifecycle ---
+    async def start(self):
+        """Start the workers and re-enqueue queued jobs and running jobs whose lease expired"""
+        if self._tasks:
+            return
+        try:
+            for job in await self._get_repository().list_recoverable():
+                # Submissions accepted before start() are already in the queue
+                if job["_id"] in self._queued_ids:
+                    continue
+                self._enqueue(job)
+                self.recovered += 1
+        except Exception as e:
+            logger.warning(f"Could not recover unfinished analysis jobs: {e}")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "recovered": self.recovered,
+            "skipped": self.skipped,
+            "lost_leases": self.lost,
+            "avg_queue_wait_ms": round(self.total_wait / finished * 1000, 2) if finished else 0,
+            "avg_run_ms": round(self.total_run / finished * 1000, 2) if finished else 0,
+        }
@@ -0,0 +1,270 @@
+"""
+Async Groq client layer for PrepTalk.
+
+All LLM calls share one pooled HTTP client and go through a per-model
+concurrency limiter, so a slow completion waits on the network instead of
+blocking the event loop, and bursts queue up per model instead of piling
+onto Groq all at once. Calls also pass through a circuit breaker, take
+their timeout from the request deadline and, with GROQ_HEDGE=1, are hedged
+once they run past the model's p95 (see resilience.py).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from metrics import observe_dependency
+from resilience import (BREAKER_MIN_TIMEOUT, DEADLINE_EXCEEDED, CircuitBreaker, DeadlineExceeded, Hedger,
+                        remaining, timeout_for)
+
+logger = logging.getLogger(__name__)
+
+GROQ_MODEL_FAST = "llama-3.1-8b-instant"      # For quick tasks
+GROQ_MODEL_SMART = "llama-3.3-70b-versatile"   # For complex analysis
+GROQ_TIMEOUT = 60  # Increased timeout for larger model
+
+# Max concurrent requests per model; extra calls wait in that model's queue
+GROQ_CONCURRENCY_FAST = int(os.getenv("GROQ_CONCURRENCY_FAST", "16"))
+GROQ_CONCURRENCY_SMART = int(os.getenv("GROQ_CONCURRENCY_SMART", "4"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "32"))
+# Override to point at a local fake (benchmarks/fake_groq.py); empty means the Groq API
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")
+GROQ_HEDGE = os.getenv("GROQ_HEDGE", "0") == "1"
+
+# Models that accept response_format={"type": "json_object"}
+JSON_MODE_MODELS = {GROQ_MODEL_FAST, GROQ_MODEL_SMART}
+
+
+@dataclass
+class LLMResult:
+    """A single chat completion plus the timings around it"""
+    content: str
+    model: str
+    usage: dict = field(default_factory=dict)
+    latency: float = 0.0
+    queue_wait: float = 0.0
+
+
+class ModelLimiter:
+    """Semaphore for one model that also records queueing metrics"""
+
+    def __init__(self, model: str, limit: int):
+        self.model = model
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_latency = 0.0
+
+    async def acquire(self, timeout: float = None) -> float:
+        """Wait for a free slot and return how long we queued.
+
+        Raises DeadlineExceeded if no slot frees up within ``timeout`` seconds.
+        """
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            DEADLINE_EXCEEDED.inc(operation="groq_queue")
+            raise DeadlineExceeded(f"Request deadline passed while queued for {self.model}")
+        finally:
+            self.waiting -= 1
+        wait = time.perf_counter() - start
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.in_flight += 1
+        return wait
+
+    def release(self, latency: float, ok: bool):
+        self.in_flight -= 1
+        self.total_latency += latency
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        calls = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_queue_wait_ms": round(self.total_wait / calls * 1000, 2) if calls else 0,
+            "max_queue_wait_ms": round(self.max_wait * 1000, 2),
+            "avg_latency_ms": round(self.total_latency / calls * 1000, 2) if calls else 0,
+        }
+
+
+class GroqPool:
+    """Shared AsyncGroq client with per-model concurrency caps.
+
+    The SDK client and its connection pool are built on first use, so
+    creating the pool at import time costs nothing.
+    """
+
+    def __init__(self, api_key: str, limits: dict = None, default_limit: int = GROQ_CONCURRENCY_FAST,
+                 max_connections: int = GROQ_MAX_CONNECTIONS, base_url: str = GROQ_BASE_URL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self._http_client = None
+        self._client = None
+        self.default_limit = default_limit
+        self.limiters = {model: ModelLimiter(model, limit) for model, limit in (limits or {}).items()}
+        self.breaker = CircuitBreaker("groq")
+        self.hedger = Hedger("groq", enabled=GROQ_HEDGE)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from groq import AsyncGroq  # deferred: the SDK import is a noticeable share of cold start
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(GROQ_TIMEOUT, connect=10.0),
+            )
+            self._client = AsyncGroq(api_key=self.api_key, http_client=self._http_client, timeout=GROQ_TIMEOUT,
+                                     base_url=self.base_url or None)
+        return self._client
+
+    def limiter(self, model: str) -> ModelLimiter:
+        if model not in self.limiters:
+            self.limiters[model] = ModelLimiter(model, self.default_limit)
+        return self.limiters[model]
+
+    async def complete(self, prompt: str, model: str, temperature: float = 0.7,
+                       max_tokens: int = 2048, json_mode: bool = False) -> LLMResult:
+        """Run one chat completion, queueing behind the model's concurrency cap.
+
+        With ``json_mode`` the model is asked for a JSON object when it supports
+        it; the prompt must then request a JSON object rather than an array.
+        Raises CircuitOpen while Groq is failing and DeadlineExceeded when the
+        request has no time left.
+        """
+        extra = {}
+        if json_mode and model in JSON_MODE_MODELS:
+            extra["response_format"] = {"type": "json_object"}
+        timeout_for(GROQ_TIMEOUT, "groq")
+        limiter = self.limiter(model)
+        return await self.breaker.call(
+            lambda: self.hedger.run(
+                model,
+                lambda: self._complete(prompt, model, temperature, max_tokens, extra),
+                spare=lambda: limiter.in_flight < limiter.limit,
+            ),
+        )
+
+    async def _complete(self, prompt: str, model: str, temperature: float, max_tokens: int,
+                        extra: dict) -> LLMResult:
+        """One attempt; the queue wait and the call share what is left of the deadline"""
+        limiter = self.limiter(model)
+        queue_wait = await limiter.acquire(remaining())
+        start = time.perf_counter()
+        latency = 0.0
+        ok = False
+        try:
+            # Taken after queueing, so neither a long queue nor a late hedge overruns the deadline
+            timeout = timeout_for(GROQ_TIMEOUT, "groq")
+            # wait_for bounds the SDK's own retries too
+            chat_completion = await asyncio.wait_for(self.client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                **extra,
+            ), timeout)
+            ok = True
+        except asyncio.TimeoutError:
+            if timeout < BREAKER_MIN_TIMEOUT:
+                # Cut short by the deadline; says nothing about Groq's health
+                DEADLINE_EXCEEDED.inc(operation="groq")
+                raise DeadlineExceeded(f"Request deadline passed waiting for Groq {model}")
+            raise TimeoutError(f"Groq {model} did not answer within {timeout:.1f}s")
+        finally:
+            latency = time.perf_counter() - start
+            limiter.release(latency, ok)
+            observe_dependency("groq", model, latency, ok)
+
+        usage = {}
+        if chat_completion.usage:
+            usage = {
+                "prompt_tokens": chat_completion.usage.prompt_tokens,
+                "completion_tokens": chat_completion.usage.completion_tokens,
+            }
+        return LLMResult(
+            content=chat_completion.choices[0].message.content,
+            model=model,
+            usage=usage,
+            latency=latency,
+            queue_wait=queue_wait,
+        )
+
+    async def stream(self, prompt: str, model: str, temperature: float = 0.7, max_tokens: int = 2048):
+        """Yield completion text deltas as Groq produces them, holding a slot for the whole stream"""
+        timeout_for(GROQ_TIMEOUT, "groq")
+        self.breaker.before_call()
+        limiter = self.limiter(model)
+        try:
+            await limiter.acquire(remaining())
+        except BaseException as e:
+            self.breaker.record_error(e)  # frees a half-open probe slot
+            raise
+        start = time.perf_counter()
+        ok = False
+        timeout = None
+        try:
+            timeout = timeout_for(GROQ_TIMEOUT, "groq")
+            response = await self.client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                stream=True,
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            ok = True
+            self.breaker.record_success()
+        except BaseException as e:
+            self.breaker.record_error(e, timeout)
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            limiter.release(latency, ok)
+            observe_dependency("groq", f"{model}:stream", latency, ok)
+
+    def stats(self) -> dict:
+        return {model: limiter.stats() for model, limiter in self.limiters.items()}
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+
+
+def create_groq_pool(api_key: str) -> GroqPool:
+    """Build the process-wide pool with the configured per-model limits"""
+    return GroqPool(
+        api_key,
+        limits={
+            GROQ_MODEL_FAST: GROQ_CONCURRENCY_FAST,
+            GROQ_MODEL_SMART: GROQ_CONCURRENCY_SMART,
+        },
+    )
@@ -1,128 +1,441 @@
-ASSEMBLYAI_API_KEY = "d0f46f6ac32f4caf8a318ae748b15992"
-
-async def transcribe_with_assemblyai(audio_bytes: bytes) -> str:
-    """Send audio to AssemblyAI and return transcript text."""
-    import httpx
-    upload_url = "https://api.assemblyai.com/v2/upload"
-    transcript_url = "https://api.assemblyai.com/v2/transcript"
-    headers = {"authorization": ASSEMBLYAI_API_KEY}
-
-    # 1. Upload audio file
-    async with httpx.AsyncClient() as client:
-        upload_response = await client.post(upload_url, headers=headers, content=audio_bytes)
-        upload_response.raise_for_status()
-        audio_url = upload_response.json()["upload_url"]
-
-        # 2. Request transcription
-        transcript_response = await client.post(transcript_url, headers=headers, json={"audio_url": audio_url})
-        transcript_response.raise_for_status()
-        transcript_id = transcript_response.json()["id"]
-
-        # 3. Poll for completion
-        while True:
-            poll_response = await client.get(f"{transcript_url}/{transcript_id}", headers=headers)
-            poll_response.raise_for_status()
-            status = poll_response.json()["status"]
-            if status == "completed":
-                return poll_response.json()["text"]
-            elif status == "failed":
-                raise Exception("AssemblyAI transcription failed")
-            import asyncio
-            await asyncio.sleep(2)
 from fastapi import FastAPI, UploadFile, File, Form, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-import requests, json, uuid, os
-from pymongo import MongoClient
-from bson.objectid import ObjectId
+import json, uuid, os, re, base64, hashlib, time, asyncio, tempfile
+from contextlib import asynccontextmanager
 from datetime import datetime
+from bson.objectid import ObjectId
 import logging
-from groq import Groq
 from dotenv import load_dotenv
-import httpx
+import pymongo
+from pymongo.errors import PyMongoError
+
+# Load environment variables (before our modules read their config)
+load_dotenv()
+
+from llm_client import create_groq_pool, GROQ_MODEL_FAST, GROQ_MODEL_SMART
+from model_router import ModelRouter, estimate_tokens
+from database import connect_store, average_from_sums
+from question_pool import QuestionPool
+from assemblyai_client import AssemblyAIClient, Transcript
+from audio_preprocess import AudioPreprocessor, PreprocessError
+from transcription import (TranscriptionService, AssemblyAIProvider, LocalWhisperProvider, FakeProvider,
+                           UnknownProvider, ProviderUnavailable, TRANSCRIPTION_ENABLE_FAKE)
+from cache import TTLCache, MongoCacheTier, TieredCache, prompt_cache_key, TRANSCRIPT_CACHE_TTL, LLM_CACHE_TTL
+from speech_metrics import speech_metrics, prompt_summary
+from progress_summary import summarize_progress, DEFAULT_WINDOW, MAX_WINDOW
+from jobs import JobQueue, QueueFull, public_job, FINISHED_STATUSES
+from feedback_stream import IncrementalJSONParser, sse_event, validated_fields, FEEDBACK_FIELDS, COACHING_FIELDS
+from metrics import HTTP_SECONDS, render_metrics, server_timing_header, stage, start_request_timings
+from resilience import CircuitOpen, DeadlineExceeded, deadline, remaining, REQUEST_DEADLINE_SECONDS
+from response_decoding import (
+    DecodeError, InterviewFeedback, CoachingFeedback, QuestionList, BatchFeedback,
+    decode, decode_with_retry, decoding_stats, validate_items, LLM_DECODE_RETRIES,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Accept traffic right away and finish the heavyweight setup in the background"""
+    init_task = asyncio.create_task(initialize())
+    yield
+    init_task.cancel()
+    await close_clients()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-# Load environment variables
-load_dotenv()
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Request latency histogram plus a Server-Timing header with the per-stage breakdown.
+
+    Also starts the request's deadline, which external calls take their timeouts from.
+    """
+    timings = start_request_timings()
+    start = time.perf_counter()
+    with deadline(REQUEST_DEADLINE_SECONDS):
+        response = await call_next(request)
+    total = time.perf_counter() - start
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(total, method=request.method, route=route.path if route else "unmatched",
+                         status=str(response.status_code))
+    response.headers["Server-Timing"] = server_timing_header(timings, total)
+    return response
 
 # Initialize Groq client with faster model
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is required")
 
-groq_client = Groq(api_key=GROQ_API_KEY)
-GROQ_MODEL_FAST = "llama-3.1-8b-instant"      # For quick tasks
-GROQ_MODEL_SMART = "llama-3.3-70b-versatile"   # For complex analysis
-GROQ_TIMEOUT = 60  # Increased timeout for larger model
+# Shared async client; per-model concurrency via GROQ_CONCURRENCY_FAST / GROQ_CONCURRENCY_SMART
+groq_pool = create_groq_pool(GROQ_API_KEY)
+model_router = ModelRouter()
+
+# Process-wide AssemblyAI client (pooled connections, adaptive polling or webhook mode)
+assemblyai = AssemblyAIClient()
+
+# TRANSCRIPTION_PROVIDER picks the default; requests can ask for another with the ``provider`` field
+transcription_providers = [AssemblyAIProvider(assemblyai), LocalWhisperProvider()]
+if TRANSCRIPTION_ENABLE_FAKE:
+    transcription_providers.append(FakeProvider())
+transcription = TranscriptionService(transcription_providers)
+
+# Silence trimming and 16 kHz mono re-encoding before transcription; on when ffmpeg is installed
+audio_preprocessor = AudioPreprocessor()
+
+# Uploads are streamed to the transcription provider in chunks, never read whole
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(25 * 1024 * 1024)))
+AUDIO_CHUNK_SIZE = 64 * 1024
+
+class AudioTooLarge(Exception):
+    pass
+
+def check_audio_size(audio: UploadFile, max_bytes: int = MAX_AUDIO_BYTES):
+    """Reject oversized uploads up front when the client sent a size"""
+    if audio.size is not None and audio.size > max_bytes:
+        raise AudioTooLarge(f"Audio exceeds the {max_bytes} byte limit")
+
+async def iter_audio_chunks(audio: UploadFile, max_bytes: int = MAX_AUDIO_BYTES, chunk_size: int = AUDIO_CHUNK_SIZE):
+    """Yield the upload chunk by chunk, aborting once it exceeds max_bytes.
+
+    The consumer pulls each chunk only after the previous one was sent, so a
+    slow upstream applies backpressure and at most one chunk is held in memory.
+    """
+    total = 0
+    while True:
+        chunk = await audio.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise AudioTooLarge(f"Audio exceeds the {max_bytes} byte limit")
+        yield chunk
+    logger.info(f"Audio file size: {total} bytes")
+
+# Transcripts cached by SHA-256 of the audio, so client retries skip re-transcription
+TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", "1000"))
+transcript_cache = TieredCache(
+    "transcript",
+    TTLCache(TRANSCRIPT_CACHE_SIZE, TRANSCRIPT_CACHE_TTL),
+    MongoCacheTier(lambda: store.db["transcript_cache"], TRANSCRIPT_CACHE_TTL),
+)
+
+async def hash_audio(audio: UploadFile, max_bytes: int = MAX_AUDIO_BYTES) -> tuple:
+    """SHA-256 the upload in chunks, then rewind it; returns (hex digest, size)"""
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in iter_audio_chunks(audio, max_bytes):
+        digest.update(chunk)
+        size += len(chunk)
+    await audio.seek(0)
+    return digest.hexdigest(), size
+
+async def transcribe_upload(audio: UploadFile, provider_name: str = "") -> Transcript:
+    """Transcribe an upload, serving duplicates of earlier audio from the transcript cache"""
+    check_audio_size(audio)
+    if not audio_preprocessor.enabled:
+        with stage("upload_read"):
+            audio_hash, size = await hash_audio(audio)
+        provider = transcription.select(provider_name, size)
+        return await transcribe_cached(audio_hash, size, provider, chunks=iter_audio_chunks(audio))
+    # Preprocessing needs the whole file, so the upload is spooled to disk first
+    with stage("upload_read"):
+        path, audio_hash, size = await spool_upload(audio)
+    try:
+        provider = transcription.select(provider_name, size)
+        return await transcribe_cached(audio_hash, size, provider, path=path)
+    finally:
+        remove_spool(path)
+
+async def transcribe_cached(audio_hash: str, size: int, provider, chunks=None, path: str = None) -> Transcript:
+    """Look the audio up by provider and hash; only on a miss is it sent to the provider.
+
+    Pass either the upload's ``chunks`` or a spooled ``path``; spooled audio
+    is preprocessed first when that is enabled.
+    """
+    cache_key = f"{provider.name}:sha256:{audio_hash}"
+    cached = await transcript_cache.get(cache_key)
+    if cached is not None:
+        transcript_cache.count("bytes_saved", size)
+        logger.info(f"Transcript cache hit for {size} byte upload")
+        return Transcript(**cached)
+
+    processed = None
+    if path is not None:
+        if audio_preprocessor.enabled:
+            try:
+                with stage("preprocess"):
+                    processed = await audio_preprocessor.run(path)
+            except PreprocessError as e:
+                logger.warning(f"Audio preprocessing failed, sending the upload as is: {e}")
+        chunks = iter_file_chunks(processed.path if processed else path)
+    try:
+        with stage("transcription"):
+            transcript = await provider.transcribe(chunks)
+    finally:
+        if processed:
+            remove_spool(processed.path)
+    if processed:
+        transcript.audio = processed.metadata()
+    await transcript_cache.set(cache_key, {
+        "text": transcript.text,
+        "words": transcript.words,
+        "audio_duration": transcript.audio_duration,
+        "audio": transcript.audio,
+    })
+    return transcript
+
+def session_fields(transcript: Transcript) -> dict:
+    """Recording metadata and local speech metrics stored on the session"""
+    duration = transcript.audio.get("duration") or transcript.audio_duration or None
+    return {
+        "audio_duration": duration,
+        "speech_ratio": transcript.audio.get("speech_ratio"),
+        "speech_metrics": speech_metrics(transcript.text, transcript.words, duration or 0.0),
+    }
+
+# Audio for queued analysis jobs (and uploads being preprocessed) is spooled here
+ANALYSIS_SPOOL_DIR = os.getenv("ANALYSIS_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "preptalk-jobs"))
+
+async def spool_upload(audio: UploadFile) -> tuple:
+    """Write the upload to a spool file while hashing it; returns (path, hex digest, size).
+
+    The disk writes run off the event loop, like the local transcription spool.
+    """
+    await asyncio.to_thread(os.makedirs, ANALYSIS_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(ANALYSIS_SPOOL_DIR, f"{uuid.uuid4().hex}.audio")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        f = await asyncio.to_thread(open, path, "wb")
+        try:
+            async for chunk in iter_audio_chunks(audio):
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+    except Exception:
+        remove_spool(path)
+        raise
+    return path, digest.hexdigest(), size
+
+async def iter_file_chunks(path: str, chunk_size: int = AUDIO_CHUNK_SIZE):
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+def remove_spool(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 # --- MongoDB Setup ---
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, socketTimeoutMS=20000, connectTimeoutMS=20000)
-    # Test the connection
-    client.admin.command('ping')
-    print("✅ Successfully connected to MongoDB Atlas!")
-    db = client["preptalk"]
-    users_collection = db["users"]
-    interviews_collection = db["interviews"]
-    
-    # Create demo user if it doesn't exist
-    demo_user = {
-        "email": "demo@preptalk.com",
-        "username": "demo_user_123456",  # Add username for compatibility
-        "password": "demo123",
-        "full_name": "Demo User",
-        "experience": "junior",
-        "job_domain": "software-engineering",
-        "created_at": datetime.utcnow(),
-        "user_id": "demo_user_123456"
-    }
-    
-    if not users_collection.find_one({"email": "demo@preptalk.com"}):
-        users_collection.insert_one(demo_user)
+store = connect_store(MONGO_URI)
+
+DEMO_USER = {
+    "email": "demo@preptalk.com",
+    "username": "demo_user_123456",  # Add username for compatibility
+    "password": "demo123",
+    "full_name": "Demo User",
+    "experience": "junior",
+    "job_domain": "software-engineering",
+    "user_id": "demo_user_123456"
+}
+
+async def connect_mongodb():
+    global store
+    try:
+        # Test the connection
+        await store.ping()
+        print("✅ Successfully connected to MongoDB Atlas!")
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+        print("🔄 Falling back to local MongoDB...")
+        store.close()
+        store = connect_store("mongodb://localhost:27017/")
+        await store.ping()
+
+async def reconcile_store_indexes():
+    """Create or rebuild the indexes declared in indexes.py"""
+    startup_state["indexes"] = await store.ensure_indexes()
+
+async def create_demo_user():
+    if not await store.users.find_by_email(DEMO_USER["email"]):
+        await store.users.insert({**DEMO_USER, "created_at": datetime.utcnow()})
         print("✅ Demo user created: demo@preptalk.com / demo123")
-    
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    print("🔄 Falling back to local MongoDB...")
-    client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
-    db = client["preptalk"]
-    users_collection = db["users"]
-    interviews_collection = db["interviews"]
+
+async def prepare_mongodb():
+    """Connect, then create indexes and the demo user concurrently"""
+    await startup_step("mongo_connect", connect_mongodb)
+    await asyncio.gather(
+        startup_step("indexes", reconcile_store_indexes),
+        startup_step("demo_user", create_demo_user),
+    )
+    # Job recovery reads the analysis_jobs collection, so it waits for Mongo
+    await startup_step("analysis_jobs", analysis_jobs.start)
+
+# --- Startup State ---
+startup_state = {"ready": False, "started": time.monotonic(), "steps": {}}
+
+async def startup_step(name: str, step):
+    """Run one initialization step, recording its outcome and duration for /readyz"""
+    start = time.perf_counter()
+    try:
+        await step()
+    except Exception as e:
+        startup_state["steps"][name] = {"status": "failed", "error": str(e), "ms": round((time.perf_counter() - start) * 1000, 1)}
+        raise
+    startup_state["steps"][name] = {"status": "ok", "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+async def initialize():
+    """Independent startup steps run concurrently; the app is ready once all succeed"""
+    async def start_question_pool():
+        question_pool.start(warm_keys=POOL_WARM_KEYS)
+
+    results = await asyncio.gather(
+        prepare_mongodb(),
+        startup_step("question_pool", start_question_pool),
+        startup_step("transcription", transcription.start),
+        return_exceptions=True,
+    )
+    failures = [result for result in results if isinstance(result, Exception)]
+    for failure in failures:
+        logger.error(f"Startup step failed: {failure}")
+    startup_state["ready"] = not failures
+    startup_state["ready_after_ms"] = round((time.monotonic() - startup_state["started"]) * 1000, 1)
 
 # --- LLM Helper Functions ---
-async def call_groq_llm(prompt: str, model_name: str = None, use_smart_model: bool = False) -> str:
-    """Helper function to call Groq API with optimizations"""
+# Memoized LLM results keyed by (normalized prompt, model, temperature, prompt version)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "500"))
+llm_cache = TieredCache(
+    "llm",
+    TTLCache(LLM_CACHE_SIZE, LLM_CACHE_TTL),
+    MongoCacheTier(lambda: store.db["llm_cache"], LLM_CACHE_TTL),
+)
+
+# What call_groq_llm returns when no reply came back at all
+LLM_UNAVAILABLE_REPLY = '{"error": "API unavailable", "fallback": true}'
+LLM_FAILED_REPLY = '{"error": "API timeout or failure", "fallback": true}'
+
+async def call_groq_llm(prompt: str, model_name: str = None, use_smart_model: bool = False,
+                        use_cache: bool = False, prompt_version: str = "", json_mode: bool = False,
+                        cache_if=None, max_tokens: int = 2048, usage: dict = None) -> str:
+    """Helper function to call Groq API with optimizations.
+
+    ``cache_if(content)`` can veto caching a reply, e.g. one that failed validation.
+    Token counts of uncached calls are added to ``usage`` when it is given.
+    """
     if model_name is None:
         model_name = GROQ_MODEL_SMART if use_smart_model else GROQ_MODEL_FAST
+    temperature = 0.7
+    if json_mode:
+        prompt_version += ":json"
+
+    start = time.perf_counter()
+    cache_key = prompt_cache_key(prompt, model_name, temperature, prompt_version) if use_cache else None
+    if cache_key:
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            llm_cache.observe("cached", time.perf_counter() - start)
+            llm_cache.count("tokens_saved", sum(cached.get("usage", {}).values()))
+            return cached["content"]
     
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model=model_name,
-            temperature=0.7,
-            max_tokens=2048,  # Increased for better responses from 70B model
-            timeout=GROQ_TIMEOUT,  # Add timeout
-        )
-        return chat_completion.choices[0].message.content
+        # Awaiting the pooled client keeps the event loop free while Groq works
+        llm_result = await groq_pool.complete(prompt, model_name, temperature=temperature, max_tokens=max_tokens,
+                                              json_mode=json_mode)
+    except (CircuitOpen, DeadlineExceeded) as e:
+        logging.warning(f"Skipping Groq call: {e}")
+        return LLM_UNAVAILABLE_REPLY
     except Exception as e:
         logging.error(f"Groq API error: {e}")
         # Fallback to predefined response if API fails
-        return '{"error": "API timeout or failure", "fallback": true}'
+        return LLM_FAILED_REPLY
+
+    model_router.observe(model_name, llm_result.queue_wait + llm_result.latency)
+    if usage is not None:
+        for name, count in llm_result.usage.items():
+            usage[name] = usage.get(name, 0) + count
+    if cache_key:
+        llm_cache.observe("uncached", time.perf_counter() - start)
+        if cache_if is None or cache_if(llm_result.content):
+            await llm_cache.set(cache_key, {"content": llm_result.content, "usage": llm_result.usage})
+    return llm_result.content
+
+async def call_groq_json(prompt: str, schema, task: str, use_cache: bool = False, prompt_version: str = "",
+                         max_tokens: int = 2048, usage: dict = None, check=None):
+    """Call Groq in JSON mode and decode the reply into ``schema``, re-asking on bad output.
+
+    ``model_router`` picks the model for ``task`` and escalates to the smart model
+    when the fast reply fails to decode or ``check(result)`` returns False, but not
+    when the call itself failed.
+    Returns ``(validated model or None, raw reply)``; only accepted replies are cached.
+    """
+    def accepted(content: str) -> bool:
+        try:
+            result = decode(content, schema)
+        except DecodeError:
+            return False
+        return check is None or check(result)
+
+    async def attempt(model_name: str, reask: bool):
+        async def call(current_prompt: str) -> str:
+            return await call_groq_llm(current_prompt, model_name=model_name, use_cache=use_cache,
+                                       prompt_version=prompt_version, json_mode=True, max_tokens=max_tokens,
+                                       usage=usage, cache_if=accepted)
+        result, raw, attempts = await decode_with_retry(call, prompt, schema,
+                                                        retries=LLM_DECODE_RETRIES if reask else 0)
+        return result, raw
+
+    return await model_router.run(task, prompt, attempt, check,
+                                  failed=lambda raw: raw in (LLM_UNAVAILABLE_REPLY, LLM_FAILED_REPLY))
+
+async def stream_groq_llm(prompt: str, model_name: str = None, use_smart_model: bool = False):
+    """Yield Groq completion tokens as they arrive"""
+    if model_name is None:
+        model_name = GROQ_MODEL_SMART if use_smart_model else GROQ_MODEL_FAST
+    async for token in groq_pool.stream(prompt, model_name, temperature=0.7, max_tokens=2048):
+        yield token
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+class LLMStreamError(Exception):
+    pass
+
+async def stream_llm_fields(prompt: str, validators: dict, use_smart_model: bool, tokens: list):
+    """Stream token and validated field events; the full text is collected into tokens.
+
+    Raises LLMStreamError if the completion fails, so callers stop instead of using a partial reply.
+    """
+    parser = IncrementalJSONParser()
+    try:
+        async for token in stream_groq_llm(prompt, use_smart_model=use_smart_model):
+            tokens.append(token)
+            yield sse_event("token", {"text": token})
+            for path, value in validated_fields(parser.feed(token), validators):
+                yield sse_event("field", {"path": list(path), "value": value})
+    except Exception as e:
+        logging.error(f"Groq streaming error: {e}")
+        raise LLMStreamError("LLM API error") from e
 
 # --- Dynamic Question Generation ---
-async def generate_questions(category: str, count: int = 1, job_domain: str = "") -> list:
-    """Generate dynamic interview questions using Groq"""
+QUESTION_PROMPT_VERSION = "questions-v2"
+
+async def generate_questions(category: str, count: int = 1, job_domain: str = "", difficulty: str = "",
+                             fallback: bool = True, use_cache: bool = False) -> list:
+    """Generate dynamic interview questions using Groq; raises on failure when fallback is False"""
     
     # Create diverse technical subcategories
     if category == "technical":
@@ -163,55 +476,62 @@ async def generate_questions(category: str, count: int = 1, job_domain: str = ""
     else:
         category_desc = f"{category} questions"
     
-    prompt = f"""Generate exactly {count} diverse interview questions covering {category_desc}. 
+    difficulty_desc = f" at {difficulty.lower()} difficulty" if difficulty else ""
+    prompt = f"""Generate exactly {count} diverse interview questions{difficulty_desc} covering {category_desc}. 
 
 IMPORTANT: Each question should be distinctly different and cover different aspects/topics. Avoid repetitive or similar questions.
 
 Only ask questions that can be answered orally. Do not ask for code to be written. If you want to ask a coding round question, ask the candidate to describe their approach or thought process, not to write code.
 
-Return ONLY a JSON array of question strings: ["question1", "question2", ...]
+Return ONLY a JSON object with the question strings: {{"questions": ["question1", "question2", ...]}}
 
 Example for technical: Instead of asking multiple data preprocessing questions, ask one about preprocessing, one about algorithms, one about system design, etc."""
     
     try:
-        response = await call_groq_llm(prompt, use_smart_model=False)  # Fast model for questions
-        logger.info(f"Raw Groq response: {response}")
-        
-        # Clean the response more thoroughly
-        response = response.strip()
-        
-        # Remove common markdown formatting
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.startswith("```"):
-            response = response[3:]
-        if response.endswith("```"):
-            response = response[:-3]
-        
-        # Remove any leading/trailing text and find JSON array
-        import re
-        json_match = re.search(r'\[.*\]', response, re.DOTALL)
-        if json_match:
-            response = json_match.group(0)
-        
-        logger.info(f"Cleaned response: {response}")
-        parsed = json.loads(response)
-        
-        # Handle different response formats
-        if isinstance(parsed, list):
-            # If it's a list of strings, return as is
-            if all(isinstance(item, str) for item in parsed):
-                return parsed
-            # If it's a list of objects with question field, extract questions
-            elif all(isinstance(item, dict) and 'question' in item for item in parsed):
-                return [item['question'] for item in parsed[:count]]
-        
-        return [str(parsed)] if count == 1 else [str(parsed)]
+        parsed, response = await call_groq_json(prompt, QuestionList, "questions", use_cache=use_cache,
+                                                prompt_version=QUESTION_PROMPT_VERSION,
+                                                check=lambda reply: len(reply.questions) >= count)
+        if parsed is None:
+            # Includes the {"error": ...} fallback from call_groq_llm
+            raise ValueError(f"LLM did not return a list of questions: {response[:200]}")
+        return parsed.questions[:count]
     except Exception as e:
         logging.error(f"Question generation error: {e}")
+        if not fallback:
+            raise
         # Fallback to predefined questions
         return get_fallback_questions(category, count)
 
+_pool_keys_seeded = set()
+
+async def generate_pool_questions(category: str, count: int, job_domain: str, difficulty: str) -> list:
+    # The first batch per key may come from the LLM cache, so restarts warm the pool without
+    # calling Groq; later batches need fresh questions or the pool would only see duplicates
+    key = (category, job_domain, difficulty)
+    use_cache = key not in _pool_keys_seeded
+    _pool_keys_seeded.add(key)
+    return await generate_questions(category, count, job_domain, difficulty, fallback=False, use_cache=use_cache)
+
+# Pre-generated questions per (category, job_domain, difficulty); refilled in the background
+question_pool = QuestionPool(generate_pool_questions)
+QUESTION_CATEGORIES = ("hr", "technical", "behavioral")
+QUESTION_DIFFICULTIES = ("Easy", "Medium", "Hard")
+DEFAULT_QUESTION_DIFFICULTY = "Easy"
+
+def pool_key(category: str, job_domain: str = "", difficulty: str = ""):
+    """Pool key used by the warm-up and both question endpoints; no difficulty means the default one.
+
+    None for a category or difficulty the app doesn't offer, so arbitrary query
+    strings are served fallback questions instead of scheduling LLM refills.
+    """
+    category = category.strip().lower()
+    difficulty = difficulty.strip().capitalize() or DEFAULT_QUESTION_DIFFICULTY
+    if category not in QUESTION_CATEGORIES or difficulty not in QUESTION_DIFFICULTIES:
+        return None
+    return (category, job_domain.strip(), difficulty)
+
+POOL_WARM_KEYS = [pool_key(category) for category in QUESTION_CATEGORIES]
+
 def get_fallback_questions(category: str, count: int = 1) -> list:
     """Fallback to predefined questions if generation fails"""
     fallback_questions = {
@@ -273,6 +593,58 @@ async def root():
         }
     }
 
+# --- Health Checks ---
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: Mongo is reachable and background setup has finished"""
+    if startup_state["ready"]:
+        return {"status": "ready", **{k: v for k, v in startup_state.items() if k != "started"}}
+    failed = any(step["status"] == "failed" for step in startup_state["steps"].values())
+    return JSONResponse(status_code=503, content={
+        "status": "failed" if failed else "starting",
+        "steps": startup_state["steps"],
+    })
+
+# --- Runtime Stats ---
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text-format latency histograms per stage and dependency"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def stats():
+    """Queueing and latency stats for the shared clients"""
+    return {
+        "llm": groq_pool.stats(),
+        "model_router": model_router.stats(),
+        "question_pool": question_pool.stats(),
+        "assemblyai": assemblyai.stats(),
+        "transcription": transcription.stats(),
+        "audio_preprocess": audio_preprocessor.stats(),
+        "transcript_cache": transcript_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "decoding": decoding_stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "resilience": {
+            "request_deadline_s": REQUEST_DEADLINE_SECONDS,
+            "breakers": {"groq": groq_pool.breaker.stats(), "assemblyai": assemblyai.breaker.stats()},
+            "hedging": {"groq": groq_pool.hedger.stats()},
+        },
+    }
+
+async def close_clients():
+    await question_pool.stop()
+    await analysis_jobs.stop()
+    await groq_pool.aclose()
+    await transcription.aclose()
+    audio_preprocessor.close()
+    store.close()
+
 # --- User Authentication ---
 @app.post("/register")
 async def register(
@@ -284,7 +656,7 @@ async def register(
 ):
     try:
         # Check if user already exists
-        existing_user = users_collection.find_one({"email": email})
+        existing_user = await store.users.find_by_email(email)
         if existing_user:
             return JSONResponse(
                 status_code=400, 
@@ -305,7 +677,7 @@ async def register(
         }
         
         # Insert user
-        result = users_collection.insert_one(user_profile)
+        await store.users.insert(user_profile)
         
         return JSONResponse(content={
             "success": True,
@@ -327,7 +699,7 @@ async def login(
 ):
     try:
         # Find user by email
-        user = users_collection.find_one({"email": email})
+        user = await store.users.find_by_email(email)
         
         if not user:
             return JSONResponse(
@@ -359,6 +731,8 @@ async def login(
         )
 
 # --- AI Prompt Builder ---
+FEEDBACK_PROMPT_VERSION = "feedback-v1"
+
 def build_prompt(conversation: str) -> str:
         return f"""
 You are an expert AI interview coach. Analyze the following mock interview transcript.
@@ -385,162 +759,517 @@ Transcript:
 {conversation}
 """
 
+def unavailable_response(e: Exception) -> JSONResponse:
+    """503 while a dependency's circuit is open or not configured, 504 when the request ran out of time"""
+    if isinstance(e, CircuitOpen):
+        return JSONResponse(status_code=503, content={"error": str(e)},
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    if isinstance(e, ProviderUnavailable):
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    return JSONResponse(status_code=504, content={"error": str(e)})
+
 # --- Transcription Endpoint ---
 @app.post("/transcribe")
-async def transcribe(audio: UploadFile = File(...)):
-    audio_bytes = await audio.read()
-    transcript = await transcribe_with_assemblyai(audio_bytes)
-    return {"transcript": transcript}
+async def transcribe(audio: UploadFile = File(...), provider: str = Form("")):
+    try:
+        transcript = await transcribe_upload(audio, provider)
+    except AudioTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except UnknownProvider as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except (CircuitOpen, DeadlineExceeded, ProviderUnavailable) as e:
+        return unavailable_response(e)
+    return {"transcript": transcript.text}
+
+# --- AssemblyAI Completion Webhook ---
+@app.post("/assemblyai/webhook")
+async def assemblyai_webhook(request: Request):
+    """Wake the request waiting on a transcript (used when ASSEMBLYAI_WEBHOOK_URL is set)"""
+    if not assemblyai.verify_webhook(request.headers):
+        return JSONResponse(status_code=401, content={"error": "Invalid webhook secret"})
+    data = await request.json()
+    delivered = assemblyai.notify(data.get("transcript_id", ""))
+    return {"status": "ok", "delivered": delivered}
 
 # --- Transcription + Feedback Endpoint ---
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@app.post("/analyze_interview")
-async def analyze_interview(
-    audio: UploadFile = File(...),
-    user_id: str = Form("demo-user"),
-    question: str = Form(""),
-    category: str = Form("")
-):
-    import tempfile, os
-    try:
-        logger.info(f"Received analyze_interview request: user_id={user_id}, question={question}, category={category}")
-        # Save uploaded audio to a temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-            contents = await audio.read()
-            logger.info(f"Audio file size: {len(contents)} bytes")
-            tmp.write(contents)
-            tmp.flush()
-            tmp_path = tmp.name
-        try:
-            transcript = await transcribe_with_assemblyai(contents)
-        finally:
-            os.remove(tmp_path)
-        # 2. Analyze with LLM (prompt as in backend_2.py)
-        # Simplified prompt for faster analysis
-        prompt = f"""You are an interview analysis expert. Analyze the following interview response and return ONLY a valid JSON object with no additional text, markdown, or formatting.
+# --- Interview Analysis Helpers ---
+def build_analysis_prompt(question: str, category: str, transcript: str, metrics: dict = None) -> str:
+    """Simplified prompt for faster analysis; filler counts and pacing come from speech_metrics, not the model"""
+    return f"""You are an interview analysis expert. Analyze the following interview response and return ONLY a valid JSON object with no additional text, markdown, or formatting.
 
 Required JSON structure:
 {{
   "scores": {{"fluency": <number 1-10>, "grammar": <number 1-10>, "confidence": <number 1-10>, "overall": <number 1-10>}},
-  "analysis": {{"strengths": ["list", "of", "strengths"], "improvements": ["areas", "for", "improvement"], "fillerWords": {{"count": <number>, "words": ["filler", "words"]}}, "sentiment": "positive/neutral/negative", "tone": "professional/casual/nervous"}},
-  "tips": ["specific", "actionable", "tips"],
-  "question": "{question}",
-  "category": "{category}"
+  "analysis": {{"strengths": ["list", "of", "strengths"], "improvements": ["areas", "for", "improvement"], "sentiment": "positive/neutral/negative", "tone": "professional/casual/nervous"}},
+  "tips": ["specific", "actionable", "tips"]
 }}
 
 Interview Question: {question}
 Category: {category}
+Measured speech metrics (exact; use them for fluency, do not recount): {prompt_summary(metrics)}
 Transcript: {transcript}
 
 Return ONLY the JSON object with no markdown formatting or additional text:"""
-        
-        logger.info(f"Simplified prompt sent to LLM")
-        
-        # Call Groq API instead of Ollama
-        try:
-            result = await call_groq_llm(prompt, use_smart_model=True)  # Smart model for feedback
-            logger.info(f"Groq response received: {result[:200]}...")
-        except Exception as e:
-            logger.error(f"Groq API call failed: {e}")
-            raise
-        logger.info(f"Raw LLM result: {result[:200]}...")
-        try:
-            # Extract JSON from markdown code blocks if present
-            json_str = result
-            if "```json" in result:
-                # Extract JSON from markdown code block
-                start = result.find("```json") + 7
-                end = result.find("```", start)
-                if end != -1:
-                    json_str = result[start:end].strip()
-                    logger.info(f"Extracted JSON from markdown: {json_str[:100]}...")
-            elif "```" in result:
-                # Handle generic code blocks
-                start = result.find("```") + 3
-                end = result.find("```", start)
-                if end != -1:
-                    json_str = result[start:end].strip()
-                    logger.info(f"Extracted JSON from generic code block: {json_str[:100]}...")
-            
-            feedback_json = json.loads(json_str)
-            # Ensure all required keys are present, fill with defaults if missing
-            if not isinstance(feedback_json, dict):
-                raise ValueError("LLM did not return a JSON object")
-            feedback_json.setdefault("scores", {"fluency": 0, "grammar": 0, "confidence": 0, "overall": 0})
-            feedback_json.setdefault("analysis", {"strengths": [], "improvements": [], "fillerWords": {"count": 0, "words": []}, "sentiment": "", "tone": ""})
-            feedback_json.setdefault("tips", [])
-            feedback_json["question"] = question
-            feedback_json["category"] = category
-            logger.info(f"Successfully parsed JSON feedback with scores: {feedback_json.get('scores', {})}")
-        except Exception as e:
-            logger.error(f"Failed to parse LLM JSON: {e}")
-            logger.error(f"LLM raw result: {result}")
-            feedback_json = {
-                "scores": {"fluency": 0, "grammar": 0, "confidence": 0, "overall": 0},
-                "analysis": {"strengths": [], "improvements": [], "fillerWords": {"count": 0, "words": []}, "sentiment": "", "tone": ""},
-                "tips": [],
-                "question": question,
-                "category": category,
-                "error": "Model did not return valid JSON",
-                "raw": result
-            }
 
-        # 3. Save session in MongoDB after analysis
-        session = {
-            "user_id": user_id,
-            "date": datetime.utcnow(),
-            "category": category,
-            "question": question,
-            "transcript": transcript,
-            "feedback": feedback_json,
-            "session_group_id": None,  # Will be set when session is completed
-        }
-        result = db["sessions"].insert_one(session)
-        session_id = str(result.inserted_id)
-        logger.info(f"Session saved to MongoDB for user {user_id}")
+def feedback_dict(feedback, raw: str, question: str, category: str, metrics: dict = None) -> dict:
+    """Session feedback from a validated InterviewFeedback, or zeros plus the raw reply if there is none.
 
-        return JSONResponse(content={
-            "transcript": transcript,
-            "feedback": feedback_json,
-            "session_id": session_id
-        })
+    With ``metrics`` the filler words are the locally counted ones.
+    """
+    if feedback is not None:
+        feedback_json = feedback.model_dump()
+        feedback_json["question"] = question
+        feedback_json["category"] = category
+        if metrics:
+            feedback_json["analysis"]["fillerWords"] = filler_summary(metrics)
+        logger.info(f"Successfully parsed JSON feedback with scores: {feedback_json['scores']}")
+        return feedback_json
+    logger.error(f"Model did not return valid feedback JSON ({len(raw)} chars)")
+    logger.debug(f"LLM raw result: {raw}")
+    return {
+        "scores": {"fluency": 0, "grammar": 0, "confidence": 0, "overall": 0},
+        "analysis": {"strengths": [], "improvements": [], "fillerWords": filler_summary(metrics), "sentiment": "", "tone": ""},
+        "tips": [],
+        "question": question,
+        "category": category,
+        "error": "Model did not return valid JSON",
+        "raw": raw
+    }
+
+def feedback_confident(feedback: InterviewFeedback) -> bool:
+    """Reject replies that validate but look like the model gave up: zero scores or no substance"""
+    scores = feedback.scores
+    if min(scores.fluency, scores.grammar, scores.confidence, scores.overall) <= 0:
+        return False
+    analysis = feedback.analysis
+    return bool(analysis.strengths or analysis.improvements) and bool(feedback.tips)
+
+def filler_summary(metrics: dict = None) -> dict:
+    """analysis.fillerWords from the local speech metrics"""
+    fillers = (metrics or {}).get("fillerWords") or {}
+    return {"count": fillers.get("count", 0), "words": fillers.get("words", [])}
+
+def parse_feedback(result: str, question: str, category: str, metrics: dict = None) -> dict:
+    """Parse the LLM's feedback JSON, falling back to zeros if it is malformed"""
+    try:
+        feedback = decode(result, InterviewFeedback)
+    except DecodeError as e:
+        logger.error(f"Failed to parse LLM JSON: {e}")
+        feedback = None
+    return feedback_dict(feedback, result, question, category, metrics)
+
+async def save_session(user_id: str, category: str, question: str, transcript: str, feedback_json: dict,
+                       fields: dict = None) -> str:
+    """Insert a session; ``feedback_json=None`` marks it for batch analysis at /complete_session"""
+    session = {
+        "user_id": user_id,
+        "date": datetime.utcnow(),
+        "category": category,
+        "question": question,
+        "transcript": transcript,
+        "feedback": feedback_json,
+        "session_group_id": None,  # Will be set when session is completed
+        **(fields or {}),
+    }
+    if feedback_json is None:
+        session["analysis_status"] = "pending"
+    with stage("db_insert"), pymongo.timeout(persist_timeout()):
+        session_id = await store.sessions.insert(session)
+    progress_summaries.delete(user_id)
+    logger.info(f"Session saved to MongoDB for user {user_id}")
+    return session_id
+
+# Writes get at least this long even when the request deadline is (nearly) spent,
+# so an analysis that was already paid for is not thrown away
+PERSIST_MIN_SECONDS = float(os.getenv("PERSIST_MIN_SECONDS", "5"))
+
+def persist_timeout():
+    """Mongo timeout for saving results: what is left of the deadline, but at least PERSIST_MIN_SECONDS"""
+    left = remaining()
+    return None if left is None else max(left, PERSIST_MIN_SECONDS)
+
+async def analyze_answer(question: str, category: str, transcript: str, usage: dict = None, metrics: dict = None) -> dict:
+    """Feedback for one answer from its own LLM call"""
+    prompt = build_analysis_prompt(question, category, transcript, metrics)
+    logger.info(f"Simplified prompt sent to LLM")
+
+    # JSON mode plus a bounded re-ask, so one malformed completion does not store zeros
+    with stage("llm"):
+        feedback, result = await call_groq_json(prompt, InterviewFeedback, "feedback", usage=usage,
+                                                check=feedback_confident)
+    logger.debug(f"Raw LLM result: {result[:200]}...")
+    return feedback_dict(feedback, result, question, category, metrics)
+
+async def analyze_transcript(user_id: str, question: str, category: str, transcript: str, fields: dict = None) -> dict:
+    """LLM analysis of one answer, saved as a session; shared by the sync and job paths"""
+    metrics = (fields or {}).get("speech_metrics")
+    feedback_json = await analyze_answer(question, category, transcript, metrics=metrics)
+
+    # Save session in MongoDB after analysis
+    session_id = await save_session(user_id, category, question, transcript, feedback_json, fields)
+    return {
+        "transcript": transcript,
+        "feedback": feedback_json,
+        "speech_metrics": metrics,
+        "session_id": session_id
+    }
+
+# Time budget for one queued analysis, from when a worker picks it up
+ANALYSIS_JOB_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_JOB_DEADLINE_SECONDS", "300"))
+
+async def run_analysis_job(job: dict) -> dict:
+    """Worker side of /analyze_interview in job mode"""
+    params = job["params"]
+    path = params["audio_path"]
+    try:
+        if not os.path.exists(path):
+            raise RuntimeError("Spooled audio is no longer available")
+        with deadline(ANALYSIS_JOB_DEADLINE_SECONDS):
+            provider = transcription.select(params.get("transcription_provider"), params["audio_size"])
+            transcript = await transcribe_cached(params["audio_hash"], params["audio_size"], provider, path=path)
+            return await analyze_transcript(params["user_id"], params["question"], params["category"],
+                                            transcript.text, session_fields(transcript))
+    finally:
+        remove_spool(path)
+
+# Bounded worker pool for job mode; ANALYSIS_WORKERS / ANALYSIS_QUEUE_MAX
+analysis_jobs = JobQueue(run_analysis_job, lambda: store.jobs)
+JOB_EVENTS_CHECK_INTERVAL = 5.0  # re-read the record in case the job runs in another process
+
+@app.post("/analyze_interview")
+async def analyze_interview(
+    audio: UploadFile = File(...),
+    user_id: str = Form("demo-user"),
+    question: str = Form(""),
+    category: str = Form(""),
+    mode: str = Form("sync"),
+    priority: str = Form("normal"),
+    provider: str = Form("")
+):
+    """Transcribe and analyze an answer.
+
+    With ``mode=job`` the audio is spooled and queued, and the response is a
+    202 with a ``job_id``; poll ``/jobs/{job_id}`` or follow
+    ``/jobs/{job_id}/events`` for the result. With ``mode=deferred`` only the
+    transcript is saved now and the feedback is generated for the whole
+    interview in one batch at ``/complete_session``. ``provider`` overrides
+    the deployment's transcription provider (``assemblyai``, ``local`` or
+    ``auto``, plus ``fake`` when TRANSCRIPTION_ENABLE_FAKE is set).
+    """
+    try:
+        logger.info(f"Received analyze_interview request: user_id={user_id}, question={question}, category={category}, mode={mode}")
+        if mode == "job":
+            return await submit_analysis_job(audio, user_id, question, category, priority, provider)
+        # 1. Stream the upload straight to the transcription provider (or hit the cache)
+        result = await transcribe_upload(audio, provider)
+        transcript = result.text
+        if mode == "deferred":
+            fields = session_fields(result)
+            session_id = await save_session(user_id, category, question, transcript, None, fields)
+            return JSONResponse(content={
+                "transcript": transcript,
+                "feedback": None,
+                "speech_metrics": fields["speech_metrics"],
+                "session_id": session_id,
+                "analysis_status": "pending"
+            })
+        # 2. Analyze with LLM and save the session
+        return JSONResponse(content=await analyze_transcript(user_id, question, category, transcript, session_fields(result)))
+    except AudioTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except UnknownProvider as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except (CircuitOpen, DeadlineExceeded, ProviderUnavailable) as e:
+        return unavailable_response(e)
     except Exception as e:
         import traceback
         logger.error(f"Exception in analyze_interview: {e}")
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+async def submit_analysis_job(audio: UploadFile, user_id: str, question: str, category: str, priority: str,
+                              provider_name: str = ""):
+    check_audio_size(audio)
+    path, audio_hash, size = await spool_upload(audio)
+    try:
+        provider = transcription.select(provider_name, size)
+    except (UnknownProvider, ProviderUnavailable):
+        remove_spool(path)
+        raise
+    params = {
+        "user_id": user_id,
+        "question": question,
+        "category": category,
+        "audio_path": path,
+        "audio_hash": audio_hash,
+        "audio_size": size,
+        "transcription_provider": provider.name,
+    }
+    try:
+        job_id = await analysis_jobs.submit(params, priority)
+    except QueueFull as e:
+        remove_spool(path)
+        return JSONResponse(status_code=503, content={"error": str(e)}, headers={"Retry-After": "10"})
+    except Exception:
+        remove_spool(path)
+        raise
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+    })
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of an analysis job; ``result`` matches the sync /analyze_interview response"""
+    job = await analysis_jobs.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return public_job(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events push channel: a ``status`` event per change, closing once the job finishes"""
+    job = await analysis_jobs.get(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+
+    async def events():
+        updates = analysis_jobs.subscribe(job_id)
+        try:
+            current = await analysis_jobs.get(job_id)
+            last_status = None
+            while current:
+                if current["status"] != last_status:
+                    last_status = current["status"]
+                    yield sse_event("status", public_job(current))
+                if last_status in FINISHED_STATUSES:
+                    return
+                try:
+                    await asyncio.wait_for(updates.get(), JOB_EVENTS_CHECK_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                current = await analysis_jobs.get(job_id)
+        finally:
+            analysis_jobs.unsubscribe(job_id, updates)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# --- Batch Analysis ---
+# Deferred sessions are analyzed together at /complete_session while the batch fits these budgets
+BATCH_ANALYSIS_MAX_PROMPT_TOKENS = int(os.getenv("BATCH_ANALYSIS_MAX_PROMPT_TOKENS", "12000"))
+BATCH_ANALYSIS_MAX_OUTPUT_TOKENS = int(os.getenv("BATCH_ANALYSIS_MAX_OUTPUT_TOKENS", "8000"))
+BATCH_ANALYSIS_TOKENS_PER_ANSWER = 450  # typical completion size of one feedback object
+
+def build_batch_analysis_prompt(sessions: list) -> str:
+    """One prompt for several answers; the instructions and schema are sent once"""
+    answers = "\n\n".join(
+        f"Answer {index}\nInterview Question: {s.get('question', '')}\nCategory: {s.get('category', '')}\n"
+        f"Measured speech metrics: {prompt_summary(s.get('speech_metrics'))}\nTranscript: {s.get('transcript', '')}"
+        for index, s in enumerate(sessions, 1)
+    )
+    return f"""You are an interview analysis expert. Analyze each of the following {len(sessions)} interview responses separately and return ONLY a valid JSON object with no additional text, markdown, or formatting.
+
+Required JSON structure, with one entry per answer in the same order:
+{{
+  "answers": [
+    {{
+      "id": <answer number>,
+      "scores": {{"fluency": <number 1-10>, "grammar": <number 1-10>, "confidence": <number 1-10>, "overall": <number 1-10>}},
+      "analysis": {{"strengths": ["list", "of", "strengths"], "improvements": ["areas", "for", "improvement"], "sentiment": "positive/neutral/negative", "tone": "professional/casual/nervous"}},
+      "tips": ["specific", "actionable", "tips"]
+    }}
+  ]
+}}
+
+The speech metrics under each answer are exact measurements; use them for fluency and do not recount filler words.
+
+{answers}
+
+Return ONLY the JSON object with no markdown formatting or additional text:"""
+
+def batch_fits(sessions: list, prompt: str) -> bool:
+    return (
+        estimate_tokens(prompt) <= BATCH_ANALYSIS_MAX_PROMPT_TOKENS
+        and len(sessions) * BATCH_ANALYSIS_TOKENS_PER_ANSWER <= BATCH_ANALYSIS_MAX_OUTPUT_TOKENS
+    )
+
+async def analyze_pending_sessions(sessions: list, allow_batch: bool = True) -> dict:
+    """Analyze deferred sessions and write each one's feedback back to its document.
+
+    Uses one batched LLM call when the sessions fit the context budget and
+    per-question calls otherwise, or for any answer missing from the batch
+    reply. Answers that still get no valid feedback are marked failed, not
+    saved with zero scores, so a later run retries them. Returns a report
+    with token use per question and wall-clock time.
+    """
+    start = time.perf_counter()
+    usage = {}
+    results = {}
+    prompt = build_batch_analysis_prompt(sessions)
+    mode = "per_question"
+    if allow_batch and len(sessions) > 1 and batch_fits(sessions, prompt):
+        mode = "batch"
+        max_tokens = min(BATCH_ANALYSIS_MAX_OUTPUT_TOKENS, len(sessions) * BATCH_ANALYSIS_TOKENS_PER_ANSWER + 256)
+        with stage("llm_batch"):
+            batch, raw = await call_groq_json(prompt, BatchFeedback, "batch_feedback", max_tokens=max_tokens, usage=usage,
+                                              check=lambda batch: len(validate_items(batch.answers, InterviewFeedback)) == len(sessions))
+        if batch is not None:
+            results = validate_items(batch.answers, InterviewFeedback)
+
+    fallbacks = [index for index in range(1, len(sessions) + 1) if index not in results]
+    if mode == "batch" and fallbacks:
+        logger.warning(f"Batch analysis missing {len(fallbacks)} of {len(sessions)} answers; analyzing them one by one")
+
+    async def analyze_single(index: int):
+        s = sessions[index - 1]
+        return index, await analyze_answer(s.get("question", ""), s.get("category", ""), s.get("transcript", ""), usage=usage,
+                                           metrics=s.get("speech_metrics"))
+
+    single = dict(await asyncio.gather(*(analyze_single(index) for index in fallbacks)))
+    feedback_by_id = {}
+    failed = {}
+    for index, s in enumerate(sessions, 1):
+        if index in results:
+            feedback_json = feedback_dict(results[index], "", s.get("question", ""), s.get("category", ""), s.get("speech_metrics"))
+            feedback_json.pop("id", None)
+        else:
+            feedback_json = single[index]
+        if "error" in feedback_json:
+            failed[s["_id"]] = feedback_json["error"]
+        else:
+            feedback_by_id[s["_id"]] = feedback_json
+    if failed:
+        logger.warning(f"Analysis failed for {len(failed)} of {len(sessions)} deferred answers; they can be retried")
+    with stage("db_update"), pymongo.timeout(persist_timeout()):
+        await asyncio.gather(
+            *(store.sessions.set_feedback(session_id, feedback) for session_id, feedback in feedback_by_id.items()),
+            *(store.sessions.set_analysis_failed(session_id, error) for session_id, error in failed.items()),
+        )
+
+    tokens = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    return {
+        "mode": mode,
+        "questions": len(sessions),
+        "per_question_fallbacks": len(fallbacks) if mode == "batch" else 0,
+        "failed": len(failed),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "tokens_per_question": round(tokens / len(sessions), 1) if sessions else 0,
+        "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+@app.post("/analyze_interview/stream")
+async def analyze_interview_stream(
+    audio: UploadFile = File(...),
+    user_id: str = Form("demo-user"),
+    question: str = Form(""),
+    category: str = Form(""),
+    provider: str = Form("")
+):
+    """Server-Sent Events variant of /analyze_interview.
+
+    Emits ``transcript`` once transcription finishes, ``token`` for each LLM
+    delta, ``field`` for each validated feedback field as soon as it is
+    complete (scores first, then strengths and tips), and finally ``done``
+    with the persisted session, or ``error``.
+    """
+    try:
+        check_audio_size(audio)
+    except AudioTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    if provider and provider not in transcription.names():
+        return JSONResponse(status_code=400, content={"error": f"Unknown transcription provider '{provider}'"})
+
+    async def events():
+        try:
+            result = await transcribe_upload(audio, provider)
+            transcript = result.text
+            yield sse_event("transcript", {"transcript": transcript})
+            # Filler words are counted locally, so that field is ready before the LLM starts
+            fields = session_fields(result)
+            metrics = fields["speech_metrics"]
+            yield sse_event("field", {"path": ["analysis", "fillerWords"], "value": filler_summary(metrics)})
+
+            tokens = []
+            prompt = build_analysis_prompt(question, category, transcript, metrics)
+            async for event in stream_llm_fields(prompt, FEEDBACK_FIELDS, True, tokens):
+                yield event
+
+            # Persist once, after the full completion has been validated
+            feedback_json = parse_feedback("".join(tokens), question, category, metrics)
+            session_id = await save_session(user_id, category, question, transcript, feedback_json, fields)
+            yield sse_event("done", {"transcript": transcript, "feedback": feedback_json, "session_id": session_id})
+        except (AudioTooLarge, LLMStreamError) as e:
+            # Nothing is saved: the session is only persisted after a complete reply
+            yield sse_event("error", {"error": str(e)})
+        except Exception as e:
+            logger.error(f"Exception in analyze_interview_stream: {e}")
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # --- Feedback Endpoint ---
 @app.post("/feedback")
-async def feedback(conversation: str = Form(...)):
+async def feedback(conversation: str = Form(...), use_cache: bool = Form(True)):
     prompt = build_prompt(conversation)
     try:
-        result = await call_groq_llm(prompt)
-        feedback_json = json.loads(result)
-    except json.JSONDecodeError:
-        feedback_json = {"error": "Model did not return valid JSON", "raw": result}
+        # Re-opening a report resubmits the same conversation; serve it from the LLM cache
+        feedback, result = await call_groq_json(prompt, CoachingFeedback, "coaching", use_cache=use_cache,
+                                                prompt_version=FEEDBACK_PROMPT_VERSION,
+                                                check=lambda feedback: bool(feedback.overall_feedback.strip()))
+        if feedback is not None:
+            feedback_json = feedback.model_dump()
+        else:
+            feedback_json = {"error": "Model did not return valid JSON", "raw": result}
     except Exception as e:
         feedback_json = {"error": f"LLM API error: {str(e)}"}
     return JSONResponse(content=feedback_json)
 
+@app.post("/feedback/stream")
+async def feedback_stream(conversation: str = Form(...)):
+    """Server-Sent Events variant of /feedback: token and field events, then done or error"""
+    async def events():
+        tokens = []
+        try:
+            async for event in stream_llm_fields(build_prompt(conversation), COACHING_FIELDS, False, tokens):
+                yield event
+        except LLMStreamError as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+        result = "".join(tokens)
+        try:
+            feedback_json = decode(result, CoachingFeedback).model_dump()
+        except DecodeError:
+            feedback_json = {"error": "Model did not return valid JSON", "raw": result}
+        yield sse_event("done", feedback_json)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 # --- Dynamic Question Generation Endpoint ---
 @app.get("/question/generate")
 async def generate_question_endpoint(category: str = "hr", count: int = 1):
-    """Generate dynamic questions using AI"""
-    try:
-        questions = await generate_questions(category, count)
+    """Generate dynamic questions using AI, served from the pre-generated pool"""
+    key = pool_key(category)
+    questions = question_pool.take(key, count) if key else []
+    if questions:
+        # Top up a partially drained pool with fallback questions we haven't already picked
+        if len(questions) < count:
+            extra = [q for q in get_fallback_questions(category, count) if q not in questions]
+            questions += extra[:count - len(questions)]
         return {
             "questions": questions,
             "category": category,
             "generated": True,
             "count": len(questions)
         }
-    except Exception as e:
-        logger.error(f"Question generation failed: {e}")
-        # Return fallback questions
+    else:
+        # Pool is empty for this key; a refill has been scheduled
         fallback_questions = get_fallback_questions(category, count)
         return {
             "questions": fallback_questions,
@@ -553,18 +1282,18 @@ async def generate_question_endpoint(category: str = "hr", count: int = 1):
 # --- Legacy Question Endpoint (Updated) ---
 @app.get("/question")
 async def get_question(category: str = "hr", jobDomain: str = "", difficulty: str = "Easy"):
-    """Get a single question - now uses dynamic generation with fallback"""
-    try:
-        questions = await generate_questions(category, 1, jobDomain)
+    """Get a single question from the pre-generated pool, with fallback when it is empty"""
+    key = pool_key(category, jobDomain, difficulty)
+    questions = question_pool.take(key, 1) if key else []
+    if questions:
         return {
-            "question": questions[0] if questions else "Tell me about yourself.",
+            "question": questions[0],
             "category": category,
             "jobDomain": jobDomain,
             "difficulty": difficulty,
             "generated": True
         }
-    except Exception as e:
-        logger.error(f"Question generation failed: {e}")
+    else:
         fallback_questions = get_fallback_questions(category, 1)
         return {
             "question": fallback_questions[0],
@@ -586,13 +1315,13 @@ async def save_interview(
         "conversation": conversation,
         "feedback": json.loads(feedback)
     }
-    result = interviews_collection.insert_one(record)
-    return {"status": "saved", "interview_id": str(result.inserted_id)}
+    interview_id = await store.interviews.insert(record)
+    return {"status": "saved", "interview_id": interview_id}
 
 # --- Recent Interviews ---
 @app.get("/recent_interviews")
 async def recent_interviews(user_id: str):
-    interviews = list(interviews_collection.find({"user_id": user_id}).sort("_id", -1).limit(5))
+    interviews = await store.interviews.recent(user_id, limit=5)
     for i in interviews:
         i["interview_id"] = str(i["_id"])
         del i["_id"]
@@ -600,34 +1329,102 @@ async def recent_interviews(user_id: str):
 
 # --- Progress Endpoint ---
 @app.get("/progress")
-async def progress(user_id: str):
+async def progress(user_id: str, limit: int = None, cursor: str = None, fields: str = None):
     """Alias endpoint for user-progress with query param"""
-    return await user_progress(user_id)
+    return await user_progress(user_id, limit=limit, cursor=cursor, fields=fields)
 
 # --- User Progress ---
+MAX_PROGRESS_PAGE = 200
+PROGRESS_FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_.]*$")
+
+def collapse_fields(fields: list) -> list:
+    """Drop duplicates and paths already covered by a requested parent; Mongo rejects overlapping projections"""
+    unique = set(fields)
+    return sorted(f for f in unique if not any(f.startswith(parent + ".") for parent in unique))
+
+def encode_progress_cursor(session: dict) -> str:
+    data = json.dumps({"date": session["date"].isoformat(), "id": str(session["_id"])})
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+def decode_progress_cursor(cursor: str) -> tuple:
+    data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(data["date"]), ObjectId(data["id"])
+
 @app.get("/user-progress/{user_id}")
-async def user_progress(user_id: str):
+async def user_progress(user_id: str, limit: int = None, cursor: str = None, fields: str = None):
+    """Sessions for a user, newest first.
+
+    Without ``limit`` the full history is returned as a list, as before. With
+    ``limit`` the response is ``{"sessions": [...], "next_cursor": ...}``; pass
+    ``next_cursor`` back as ``cursor`` for the following page. ``fields`` is a
+    comma-separated projection, e.g. ``fields=feedback.scores,category``.
+    """
     try:
-        # Get all sessions for the user, sorted by date (newest first)
-        sessions = list(db["sessions"].find({"user_id": user_id}).sort("date", -1))
+        projection = None
+        if fields:
+            projection = [f.strip() for f in fields.split(",") if f.strip()]
+            if not all(PROGRESS_FIELD_PATTERN.match(f) for f in projection):
+                return JSONResponse(status_code=400, content={"error": "Invalid fields parameter"})
+            projection = collapse_fields(projection + ["date"])  # date is needed for the cursor
+        try:
+            after = decode_progress_cursor(cursor) if cursor else None
+        except Exception:
+            return JSONResponse(status_code=400, content={"error": "Invalid cursor"})
+        paginated = limit is not None or cursor is not None
+        page_size = min(max(limit or MAX_PROGRESS_PAGE, 1), MAX_PROGRESS_PAGE) if paginated else None
+
+        # Get sessions for the user, sorted by date (newest first)
+        sessions = await store.sessions.list_for_user(user_id, fields=projection, limit=page_size, after=after)
+        next_cursor = encode_progress_cursor(sessions[-1]) if paginated and len(sessions) == page_size else None
         
         # Process sessions
         for s in sessions:
             s["session_id"] = str(s["_id"])
             del s["_id"]
         
+        if paginated:
+            return {"sessions": sessions, "next_cursor": next_cursor}
         return sessions
-    except Exception as e:
+    except PyMongoError as e:
         logging.error(f"Error fetching user progress: {e}")
         # Return empty progress if database fails
         return []
 
+# Summaries per user ({window: summary}), dropped whenever one of the user's sessions changes.
+# The TTL bounds staleness when several worker processes serve the same user.
+PROGRESS_SUMMARY_CACHE_SIZE = int(os.getenv("PROGRESS_SUMMARY_CACHE_SIZE", "1000"))
+PROGRESS_SUMMARY_TTL = int(os.getenv("PROGRESS_SUMMARY_TTL", "300"))
+progress_summaries = TTLCache(PROGRESS_SUMMARY_CACHE_SIZE, PROGRESS_SUMMARY_TTL)
+
+@app.get("/user-progress/{user_id}/summary")
+async def user_progress_summary(user_id: str, window: int = DEFAULT_WINDOW):
+    """Averages, moving averages, slopes, filler totals and daily/weekly buckets for a user.
+
+    A few KB in place of the full session history the progress pages used
+    to download and aggregate in the browser. ``window`` is the number of
+    sessions in the moving average and the "recent" slope.
+    """
+    window = min(max(window, 2), MAX_WINDOW)
+    try:
+        cached = progress_summaries.get(user_id) or {}
+        if window in cached:
+            return cached[window]
+        with stage("db_aggregate"):
+            rows = await store.sessions.progress_rows(user_id)
+        with stage("summary"):
+            summary = {"user_id": user_id, **summarize_progress(rows, window)}
+        progress_summaries.set(user_id, {**cached, window: summary})
+        return summary
+    except Exception as e:
+        logger.error(f"Error building progress summary: {e}")
+        return JSONResponse(status_code=500, content={"error": "Failed to build progress summary"})
+
 # --- Profile Management ---
 @app.get("/profile/{user_id}")
 async def get_profile(user_id: str):
     """Get user profile"""
     try:
-        profile = db["profiles"].find_one({"userId": user_id})
+        profile = await store.profiles.find(user_id)
         if profile:
             profile["_id"] = str(profile["_id"])
             return profile
@@ -660,11 +1457,7 @@ async def save_profile(request: Request):
         user_id = data.get("userId", "demo-user")
         
         # Upsert profile (update if exists, insert if not)
-        result = db["profiles"].update_one(
-            {"userId": user_id},
-            {"$set": data},
-            upsert=True
-        )
+        await store.profiles.upsert(user_id, data)
         
         return {"status": "success", "message": "Profile saved successfully"}
     except Exception as e:
@@ -686,12 +1479,21 @@ async def complete_session(
             return JSONResponse(status_code=400, content={"error": "No session IDs provided"})
         
         # Generate session group ID and name
-        existing_groups = list(db["session_groups"].find({}).sort("created_at", -1))
-        session_number = len(existing_groups) + 1
-        
         if not session_name:
+            session_number = await store.session_groups.next_number(user_id)
             session_name = f"Session {session_number}"
         
+        # Answers recorded in deferred mode are analyzed now, in one batch where possible
+        analysis_report = None
+        pending = await store.sessions.find_pending_analysis(session_id_list)
+        if pending:
+            analysis_report = await analyze_pending_sessions(pending)
+            progress_summaries.delete(user_id)
+            logger.info(f"Analyzed {len(pending)} deferred answers: {analysis_report}")
+
+        # Sessions don't change after completion, so store their score aggregates up front
+        score_sums, scored_count = await store.sessions.score_sums(session_id_list)
+
         # Create session group
         session_group = {
             "user_id": user_id,
@@ -699,22 +1501,21 @@ async def complete_session(
             "session_ids": session_id_list,
             "created_at": datetime.utcnow(),
             "question_count": len(session_id_list),
-            "is_completed": True
+            "is_completed": True,
+            "score_sums": score_sums,
+            "score_count": scored_count,
+            "average_scores": average_from_sums(score_sums, scored_count)
         }
+        if analysis_report:
+            session_group["analysis"] = analysis_report
         
-        group_result = db["session_groups"].insert_one(session_group)
-        session_group_id = str(group_result.inserted_id)
+        session_group_id = await store.session_groups.insert(session_group)
+        await store.user_stats.add_group(user_id, score_sums, scored_count, len(session_id_list))
         
-        # Update individual sessions with group ID
-        from bson.objectid import ObjectId
-        for session_id in session_id_list:
-            try:
-                db["sessions"].update_one(
-                    {"_id": ObjectId(session_id)},
-                    {"$set": {"session_group_id": session_group_id}}
-                )
-            except Exception as e:
-                logger.warning(f"Failed to update session {session_id}: {e}")
+        # Tag the individual sessions with the group ID in one round trip
+        tagged = await store.sessions.set_group_many(session_id_list, session_group_id)
+        if tagged < len(session_id_list):
+            logger.warning(f"Tagged {tagged} of {len(session_id_list)} sessions with group {session_group_id}")
         
         logger.info(f"Session group created: {session_group_id} with {len(session_id_list)} questions")
         
@@ -722,7 +1523,8 @@ async def complete_session(
             "status": "success",
             "session_group_id": session_group_id,
             "session_name": session_name,
-            "question_count": len(session_id_list)
+            "question_count": len(session_id_list),
+            "analysis": analysis_report
         })
         
     except Exception as e:
@@ -733,62 +1535,54 @@ async def complete_session(
 async def get_session_groups(user_id: str):
     """Get all session groups for a user"""
     try:
-        groups = list(db["session_groups"].find({"user_id": user_id}).sort("created_at", -1))
-        
+        groups = await store.session_groups.list_for_user(user_id)
+
+        # Groups completed before aggregates were stored still need their sessions averaged
+        averages = await store.sessions.average_scores_by_group({
+            str(group["_id"]): group.get("session_ids")
+            for group in groups if "average_scores" not in group
+        })
+
         for group in groups:
             group["session_group_id"] = str(group["_id"])
             del group["_id"]
-            
+
             # Add summary statistics
-            if group.get("session_ids"):
-                # Get all sessions in this group
-                session_objects = []
-                for session_id in group["session_ids"]:
-                    try:
-                        from bson.objectid import ObjectId
-                        session = db["sessions"].find_one({"_id": ObjectId(session_id)})
-                        if session:
-                            session_objects.append(session)
-                    except:
-                        continue
-                
-                # Calculate averages
-                if session_objects:
-                    total_scores = {"fluency": 0, "grammar": 0, "confidence": 0, "overall": 0}
-                    valid_sessions = 0
-                    
-                    for session in session_objects:
-                        if session.get("feedback") and session["feedback"].get("scores"):
-                            scores = session["feedback"]["scores"]
-                            total_scores["fluency"] += scores.get("fluency", 0)
-                            total_scores["grammar"] += scores.get("grammar", 0) 
-                            total_scores["confidence"] += scores.get("confidence", 0)
-                            total_scores["overall"] += scores.get("overall", 0)
-                            valid_sessions += 1
-                    
-                    if valid_sessions > 0:
-                        group["average_scores"] = {
-                            "fluency": round(total_scores["fluency"] / valid_sessions, 2),
-                            "grammar": round(total_scores["grammar"] / valid_sessions, 2),
-                            "confidence": round(total_scores["confidence"] / valid_sessions, 2),
-                            "overall": round(total_scores["overall"] / valid_sessions, 2)
-                        }
-                    else:
-                        group["average_scores"] = {"fluency": 0, "grammar": 0, "confidence": 0, "overall": 0}
-                else:
-                    group["average_scores"] = {"fluency": 0, "grammar": 0, "confidence": 0, "overall": 0}
+            if "average_scores" not in group and group.get("session_ids"):
+                group["average_scores"] = averages.get(
+                    group["session_group_id"],
+                    {"fluency": 0, "grammar": 0, "confidence": 0, "overall": 0}
+                )
         
         return groups
     except Exception as e:
         logger.error(f"Error fetching session groups: {e}")
         return JSONResponse(status_code=500, content={"error": "Failed to fetch session groups"})
 
+@app.get("/user_stats/{user_id}")
+async def get_user_stats(user_id: str):
+    """Get running score totals across all of a user's completed sessions"""
+    try:
+        user_stats = await store.user_stats.find(user_id) or {}
+        score_sums = user_stats.get("score_sums", {})
+        score_count = user_stats.get("score_count", 0)
+        return {
+            "user_id": user_id,
+            "group_count": user_stats.get("group_count", 0),
+            "question_count": user_stats.get("question_count", 0),
+            "score_count": score_count,
+            "score_sums": score_sums,
+            "average_scores": average_from_sums(score_sums, score_count)
+        }
+    except Exception as e:
+        logger.error(f"Error fetching user stats: {e}")
+        return JSONResponse(status_code=500, content={"error": "Failed to fetch user stats"})
+
 @app.get("/session_group/{session_group_id}")
 async def get_session_group_details(session_group_id: str):
     """Get detailed view of a specific session group"""
     try:
-        from bson.objectid import ObjectId
-        group = db["session_groups"].find_one({"_id": ObjectId(session_group_id)})
+        group = await store.session_groups.find_by_id(session_group_id)
         
         if not group:
             return JSONResponse(status_code=404, content={"error": "Session group not found"})
@@ -800,7 +1594,7 @@ async def get_session_group_details(session_group_id: str):
         sessions = []
         for session_id in group.get("session_ids", []):
             try:
-                session = db["sessions"].find_one({"_id": ObjectId(session_id)})
+                session = await store.sessions.find_by_id(session_id)
                 if session:
                     session["session_id"] = str(session["_id"])
                     del session["_id"]
@@ -814,6 +1608,41 @@ async def get_session_group_details(session_group_id: str):
         logger.error(f"Error fetching session group details: {e}")
         return JSONResponse(status_code=500, content={"error": "Failed to fetch session group details"})
 
+@app.post("/session_group/{session_group_id}/analyze")
+async def retry_session_group_analysis(session_group_id: str):
+    """Retry the group's deferred analyses that failed, then refresh its score aggregates"""
+    try:
+        group = await store.session_groups.find_by_id(session_group_id)
+        if not group:
+            return JSONResponse(status_code=404, content={"error": "Session group not found"})
+
+        session_ids = group.get("session_ids") or []
+        pending = await store.sessions.find_pending_analysis(session_ids)
+        if not pending:
+            return {"status": "success", "analysis": None, "average_scores": group.get("average_scores")}
+
+        analysis_report = await analyze_pending_sessions(pending)
+        progress_summaries.delete(group["user_id"])
+        score_sums, scored_count = await store.sessions.score_sums(session_ids)
+        await store.session_groups.set_scores(session_group_id, score_sums, scored_count)
+        if "score_sums" in group:
+            # The group's earlier scores are already in the user's running totals; add only the new ones
+            previous = group["score_sums"]
+            await store.user_stats.add_scores(
+                group["user_id"],
+                {metric: score_sums[metric] - previous.get(metric, 0) for metric in score_sums},
+                scored_count - group.get("score_count", 0),
+            )
+        logger.info(f"Retried {len(pending)} deferred answers in group {session_group_id}: {analysis_report}")
+        return {
+            "status": "success",
+            "analysis": analysis_report,
+            "average_scores": average_from_sums(score_sums, scored_count),
+        }
+    except Exception as e:
+        logger.error(f"Error retrying session group analysis: {e}")
+        return JSONResponse(status_code=500, content={"error": "Failed to analyze session group"})
+
 @app.put("/session_group/{session_group_id}/name")
 async def update_session_name(session_group_id: str, request: Request):
     """Update session group name"""
@@ -824,13 +1653,9 @@ async def update_session_name(session_group_id: str, request: Request):
         if not new_name:
             return JSONResponse(status_code=400, content={"error": "Session name is required"})
         
-        from bson.objectid import ObjectId
-        result = db["session_groups"].update_one(
-            {"_id": ObjectId(session_group_id)},
-            {"$set": {"session_name": new_name}}
-        )
+        modified_count = await store.session_groups.rename(session_group_id, new_name)
         
-        if result.modified_count > 0:
+        if modified_count > 0:
             return JSONResponse(content={"status": "success", "session_name": new_name})
         else:
             return JSONResponse(status_code=404, content={"error": "Session group not found"})
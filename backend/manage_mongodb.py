@@ -5,13 +5,22 @@ This script helps you:
 1. Check current database and collections
 2. Clean up dummy/test data
 3. Initialize proper schema for your project
+4. Reconcile the app's declared indexes and check hot query plans
+
+Usage:
+    python manage_mongodb.py            # interactive
+    python manage_mongodb.py indexes    # create/rebuild declared indexes
+    python manage_mongodb.py explain    # explain() hot queries; exits 1 on a COLLSCAN
 """
 
 import os
+import sys
 from pymongo import MongoClient
 from dotenv import load_dotenv
 from datetime import datetime
 
+from indexes import explain_hot_queries, reconcile_indexes_sync
+
 # Load environment variables
 load_dotenv()
 
@@ -94,29 +103,46 @@ def initialize_schema(db):
     print("🏗️  INITIALIZING PREPTALK SCHEMA")
     print("="*50)
     
-    # Create users collection with sample structure
-    users_collection = db["users"]
-    print("📁 Creating 'users' collection...")
+    # Collections are created on first write; the indexes are declared in indexes.py
+    sync_indexes(db)
     
-    # Create interviews collection with sample structure  
-    interviews_collection = db["interviews"]
-    print("📁 Creating 'interviews' collection...")
+    print("✅ Schema initialized successfully!")
+
+def sync_indexes(db):
+    """Create missing and rebuild changed indexes, reporting undeclared ones"""
+    print("\n🗂️  Reconciling indexes...")
+    summary = reconcile_indexes_sync(db)
+    for name in summary["created"]:
+        print(f"   ✅ Created index '{name}'")
+    for name in summary["rebuilt"]:
+        print(f"   🔁 Rebuilt index '{name}' (options changed)")
+    for name in summary["failed"]:
+        print(f"   ⚠️  Could not build index '{name}' (see log)")
+    print(f"   {summary['unchanged']} index(es) already up to date")
+    for name in summary["extra"]:
+        print(f"   ℹ️  Undeclared index '{name}' left in place")
+    return summary
+
+def explain_queries(db):
+    """Run explain() on the hot queries; returns False if any scans a whole collection"""
+    print("\n" + "="*50)
+    print("🔍 QUERY PLANS")
+    print("="*50)
     
-    # Create indexes for better performance
-    try:
-        # Index on username for faster user lookups
-        users_collection.create_index("username", unique=True)
-        print("   ✅ Created unique index on 'username'")
-        
-        # Index on user_id and timestamp for interviews
-        interviews_collection.create_index("user_id")
-        interviews_collection.create_index("timestamp")
-        print("   ✅ Created indexes on 'user_id' and 'timestamp'")
-        
-    except Exception as e:
-        print(f"   ⚠️  Index creation note: {e}")
+    healthy = True
+    for result in explain_hot_queries(db):
+        plan = " <- ".join(result["stages"]) or "?"
+        if result["collscan"]:
+            healthy = False
+            print(f"   ❌ {result['name']} ({result['collection']}): COLLSCAN  [{plan}]")
+        elif result["in_memory_sort"]:
+            print(f"   ⚠️  {result['name']} ({result['collection']}): in-memory SORT  [{plan}]")
+        else:
+            print(f"   ✅ {result['name']} ({result['collection']}): [{plan}]")
     
-    print("✅ Schema initialized successfully!")
+    if not healthy:
+        print("\n❌ Some hot queries scan a whole collection; run 'python manage_mongodb.py indexes'")
+    return healthy
 
 def main():
     """Main function"""
@@ -126,7 +152,21 @@ def main():
     # Connect to MongoDB
     client, db = connect_to_mongodb()
     if not client:
-        return
+        sys.exit(1)
+    
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "indexes":
+        summary = sync_indexes(db)
+        client.close()
+        sys.exit(1 if summary["failed"] else 0)
+    if command == "explain":
+        healthy = explain_queries(db)
+        client.close()
+        sys.exit(0 if healthy else 1)
+    if command:
+        print(f"❌ Unknown command '{command}' (expected 'indexes' or 'explain')")
+        client.close()
+        sys.exit(2)
     
     # Show current status
     collections = show_database_status(client, db)
@@ -0,0 +1,216 @@
+"""
+Latency instrumentation for PrepTalk.
+
+Histograms are kept per request stage (upload read, transcription, LLM
+call, parsing, Mongo insert) and per external dependency (Groq by model,
+AssemblyAI by operation, MongoDB by collection and command) and exposed in
+the Prometheus text format by ``render_metrics``. Timings recorded while a
+request is being handled are also collected into a per-request context
+variable so the middleware can return them in a ``Server-Timing`` header.
+
+MongoDB is timed twice: the pymongo command listener feeds the per-command
+histograms, but its events fire on the driver's threads and can't be tied
+to a request reliably, so the request's ``mongo`` timing comes from the
+``timed_methods`` wrapper around the awaited repository calls instead.
+"""
+
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name -> total seconds for the request being handled, or None outside a request
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+# Name of the timing a timed() call is already adding to, so nested calls count once
+_timing_in_progress = contextvars.ContextVar("timing_in_progress", default=None)
+_registry = []
+_lock = threading.Lock()  # Mongo events arrive on driver threads
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        _registry.append(self)
+
+    def observe(self, seconds: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = _format_labels(self.labelnames, key)
+            for bound, bucket_count in zip(self.buckets, counts):
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+            bucket_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with _lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+HTTP_SECONDS = Histogram("preptalk_http_request_duration_seconds", "HTTP request latency",
+                         ("method", "route", "status"))
+STAGE_SECONDS = Histogram("preptalk_stage_duration_seconds", "Latency of request processing stages", ("stage",))
+DEPENDENCY_SECONDS = Histogram("preptalk_dependency_duration_seconds", "Latency of calls to external dependencies",
+                               ("dependency", "operation"))
+DEPENDENCY_ERRORS = Counter("preptalk_dependency_errors_total", "Failed calls to external dependencies",
+                            ("dependency", "operation"))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Per-request timings (Server-Timing) ---
+def start_request_timings() -> dict:
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def _record_timing(name: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def server_timing_header(timings: dict, total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block of request processing, e.g. ``with stage("llm"):``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, stage=name)
+        _record_timing(name, seconds)
+
+
+def observe_dependency(dependency: str, operation: str, seconds: float, ok: bool = True,
+                       request_timing: bool = True):
+    DEPENDENCY_SECONDS.observe(seconds, dependency=dependency, operation=operation)
+    if not ok:
+        DEPENDENCY_ERRORS.inc(dependency=dependency, operation=operation)
+    if request_timing:
+        _record_timing(dependency, seconds)
+
+
+def timed(name: str):
+    """Decorator adding a coroutine's awaited time to the request's ``name`` timing"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if _timing_in_progress.get() == name:
+                return await fn(*args, **kwargs)
+            token = _timing_in_progress.set(name)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _timing_in_progress.reset(token)
+                _record_timing(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def timed_methods(name: str):
+    """Class decorator applying ``timed(name)`` to every coroutine method"""
+    def decorate(cls):
+        for attr, value in list(vars(cls).items()):
+            if inspect.iscoroutinefunction(value):
+                setattr(cls, attr, timed(name)(value))
+        return cls
+    return decorate
+
+
+# --- MongoDB ---
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo command listener recording latency per collection and command.
+
+    Only the histograms; the events fire on driver threads, so the request's
+    Server-Timing entry comes from ``timed_methods``.
+    """
+
+    def __init__(self):
+        self._started = {}  # (connection id, request id) -> (collection, command)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._started[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def _finish(self, event, ok: bool):
+        collection, command = self._started.pop((event.connection_id, event.request_id), ("", event.command_name))
+        operation = f"{collection}.{command}" if collection else command
+        observe_dependency("mongo", operation, event.duration_micros / 1e6, ok, request_timing=False)
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
@@ -0,0 +1,191 @@
+"""
+Per-request Groq model routing for PrepTalk.
+
+Each LLM task (question generation, answer feedback, batch feedback,
+coaching) has a policy: its usual model and a latency budget. ``choose``
+picks the model for one request from the prompt size, that budget and the
+live p95 of each model, measured over its recent completions (queue wait
+included). When the fast model is tried first, the smart model is only
+called if the fast reply fails schema validation or the caller's confidence
+check; a call that failed outright (timeout, open breaker) is not escalated,
+since the smart model sits behind the same API. Every decision and its
+outcome is counted, so the budgets can be tuned against the escalation
+rate in /stats.
+
+MODEL_ROUTER_MODE=static keeps each task on its usual model with no
+escalation, as before the router existed.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from llm_client import GROQ_MODEL_FAST, GROQ_MODEL_SMART
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+MODEL_ROUTER_MODE = os.getenv("MODEL_ROUTER_MODE", "adaptive")  # adaptive or static
+# Longer prompts go straight to the smart model; the 8B model loses track of long contexts
+MODEL_ROUTER_FAST_MAX_PROMPT_TOKENS = int(os.getenv("MODEL_ROUTER_FAST_MAX_PROMPT_TOKENS", "3000"))
+MODEL_ROUTER_LATENCY_WINDOW = int(os.getenv("MODEL_ROUTER_LATENCY_WINDOW", "200"))  # completions kept per model
+MODEL_ROUTER_MIN_SAMPLES = int(os.getenv("MODEL_ROUTER_MIN_SAMPLES", "20"))  # before a p95 is trusted
+MODEL_ROUTER_RECENT = 50  # decisions kept for /stats
+
+LLM_ROUTES = Counter("preptalk_llm_routes_total", "Model routing decisions by outcome",
+                     ("task", "model", "reason", "outcome"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class RoutePolicy:
+    model: str              # the task's usual model
+    budget_ms: float        # latency the task should stay within
+    fast_first: bool = False  # try the fast model and escalate on a bad reply
+
+
+@dataclass
+class Route:
+    task: str
+    model: str
+    reason: str
+    prompt_tokens: int
+    escalate_to: str = None  # model to retry with if the reply is rejected
+
+
+DEFAULT_POLICIES = {
+    "questions": RoutePolicy(GROQ_MODEL_FAST, float(os.getenv("MODEL_ROUTER_QUESTIONS_BUDGET_MS", "4000"))),
+    "feedback": RoutePolicy(GROQ_MODEL_SMART, float(os.getenv("MODEL_ROUTER_FEEDBACK_BUDGET_MS", "8000")),
+                            fast_first=os.getenv("MODEL_ROUTER_FEEDBACK_FAST_FIRST", "0") == "1"),
+    "batch_feedback": RoutePolicy(GROQ_MODEL_SMART, float(os.getenv("MODEL_ROUTER_BATCH_BUDGET_MS", "30000"))),
+    "coaching": RoutePolicy(GROQ_MODEL_FAST, float(os.getenv("MODEL_ROUTER_COACHING_BUDGET_MS", "8000"))),
+}
+
+
+class ModelRouter:
+    def __init__(self, policies: dict = None, mode: str = MODEL_ROUTER_MODE,
+                 fast_max_prompt_tokens: int = MODEL_ROUTER_FAST_MAX_PROMPT_TOKENS,
+                 window: int = MODEL_ROUTER_LATENCY_WINDOW, min_samples: int = MODEL_ROUTER_MIN_SAMPLES):
+        self.policies = dict(policies or DEFAULT_POLICIES)
+        self.mode = mode
+        self.fast_max_prompt_tokens = fast_max_prompt_tokens
+        self.min_samples = min_samples
+        self._latencies = {model: deque(maxlen=window) for model in (GROQ_MODEL_FAST, GROQ_MODEL_SMART)}
+        self._outcomes = {}  # (task, model, reason) -> {outcome: count}
+        self._totals = {}    # task -> [requests, total seconds, over budget]
+        self._recent = deque(maxlen=MODEL_ROUTER_RECENT)
+
+    def observe(self, model: str, seconds: float):
+        """Record one completed Groq call; cached replies should not be observed"""
+        self._latencies.setdefault(model, deque(maxlen=MODEL_ROUTER_LATENCY_WINDOW)).append(seconds)
+
+    def p95(self, model: str):
+        """p95 latency in ms over the model's recent calls, or None until there are enough"""
+        samples = self._latencies.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return float(np.percentile(samples, 95)) * 1000
+
+    def choose(self, task: str, prompt: str) -> Route:
+        policy = self.policies[task]
+        tokens = estimate_tokens(prompt)
+        if self.mode == "static":
+            return Route(task, policy.model, "static", tokens)
+        if tokens > self.fast_max_prompt_tokens:
+            return Route(task, GROQ_MODEL_SMART, "long_prompt", tokens)
+
+        fast_p95, smart_p95 = self.p95(GROQ_MODEL_FAST), self.p95(GROQ_MODEL_SMART)
+        fast_is_faster = fast_p95 is None or smart_p95 is None or fast_p95 < smart_p95
+        if policy.model == GROQ_MODEL_SMART:
+            if policy.fast_first and fast_is_faster:
+                return Route(task, GROQ_MODEL_FAST, "fast_first", tokens, escalate_to=GROQ_MODEL_SMART)
+            if smart_p95 is not None and smart_p95 > policy.budget_ms and fast_is_faster:
+                return Route(task, GROQ_MODEL_FAST, "smart_over_budget", tokens, escalate_to=GROQ_MODEL_SMART)
+            return Route(task, GROQ_MODEL_SMART, "default", tokens)
+        if fast_p95 is not None and fast_p95 > policy.budget_ms and not fast_is_faster:
+            return Route(task, GROQ_MODEL_SMART, "fast_over_budget", tokens)
+        return Route(task, GROQ_MODEL_FAST, "default", tokens, escalate_to=GROQ_MODEL_SMART)
+
+    async def run(self, task: str, prompt: str, attempt, check=None, failed=None):
+        """Route one request and escalate a rejected fast reply.
+
+        ``attempt(model, reask)`` must return ``(validated model or None, raw reply)``;
+        ``reask`` is False when an escalation is available, which replaces the re-ask.
+        ``check(result)`` is the optional confidence check, and ``failed(raw)`` tells
+        a call that got no reply at all from one that got a bad reply. Returns ``(result, raw)``.
+        """
+        route = self.choose(task, prompt)
+        start = time.perf_counter()
+        model = route.model
+        result, raw = await attempt(model, route.escalate_to is None)
+        outcome = "ok"
+        if result is None and failed is not None and failed(raw):
+            # No reply at all: the smart model is behind the same API, so escalating only doubles the wait
+            outcome = "call_failed"
+        elif route.escalate_to:
+            if result is None:
+                outcome = "escalated_invalid"
+            elif check is not None and not check(result):
+                outcome = "escalated_low_confidence"
+            if outcome != "ok":
+                logger.info(f"Escalating {task} from {model} to {route.escalate_to} ({outcome})")
+                model = route.escalate_to
+                result, raw = await attempt(model, True)
+        if result is None and outcome != "call_failed":
+            outcome = "failed" if outcome == "ok" else f"{outcome}_failed"
+        self._record(route, outcome, model, time.perf_counter() - start)
+        return result, raw
+
+    def _record(self, route: Route, outcome: str, final_model: str, seconds: float):
+        LLM_ROUTES.inc(task=route.task, model=route.model, reason=route.reason, outcome=outcome)
+        counts = self._outcomes.setdefault((route.task, route.model, route.reason), {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+        totals = self._totals.setdefault(route.task, [0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += seconds
+        if seconds * 1000 > self.policies[route.task].budget_ms:
+            totals[2] += 1
+        self._recent.append({
+            "at": datetime.utcnow().isoformat(),
+            "task": route.task,
+            "model": route.model,
+            "reason": route.reason,
+            "prompt_tokens": route.prompt_tokens,
+            "outcome": outcome,
+            "final_model": final_model,
+            "ms": round(seconds * 1000, 1),
+        })
+
+    def stats(self) -> dict:
+        def p95_rounded(model):
+            value = self.p95(model)
+            return round(value, 1) if value is not None else None
+
+        return {
+            "mode": self.mode,
+            "p95_ms": {model: p95_rounded(model) for model in self._latencies},
+            "samples": {model: len(samples) for model, samples in self._latencies.items()},
+            "tasks": {
+                task: {
+                    "budget_ms": self.policies[task].budget_ms,
+                    "requests": requests,
+                    "avg_ms": round(seconds / requests * 1000, 1) if requests else 0,
+                    "over_budget": over_budget,
+                }
+                for task, (requests, seconds, over_budget) in self._totals.items()
+            },
+            "decisions": [
+                {"task": task, "model": model, "reason": reason, "outcomes": dict(counts)}
+                for (task, model, reason), counts in self._outcomes.items()
+            ],
+            "recent": list(self._recent),
+        }
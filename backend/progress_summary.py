@@ -0,0 +1,159 @@
+"""
+Server-side progress analytics for PrepTalk.
+
+``summarize_progress`` turns the compact rows returned by
+SessionRepository.progress_rows (date, category, scores, filler words;
+oldest first) into the numbers the progress and dashboard pages chart:
+per-metric and per-category averages, trailing moving averages, improvement
+slopes, filler-word totals and daily/weekly buckets. Everything is computed
+on NumPy arrays, with missing scores carried as NaN so they drop out of
+averages instead of counting as zero.
+"""
+
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from database import SCORE_METRICS
+
+DEFAULT_WINDOW = 5
+MAX_WINDOW = 50
+MAX_SERIES_POINTS = 60   # moving-average points returned per metric
+MAX_DAILY_BUCKETS = 90
+MAX_WEEKLY_BUCKETS = 52
+TOP_FILLER_WORDS = 10
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _rounded(values) -> list:
+    """JSON-friendly list: NaN becomes None"""
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+def _by_metric(values) -> dict:
+    return dict(zip(SCORE_METRICS, _rounded(values)))
+
+
+def _nanmean(matrix: np.ndarray) -> np.ndarray:
+    counts = (~np.isnan(matrix)).sum(axis=0)
+    sums = np.nansum(matrix, axis=0)
+    return np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+
+def moving_average(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over the last ``window`` sessions per column, skipping NaN"""
+    valid = ~np.isnan(matrix)
+    zero_row = np.zeros((1, matrix.shape[1]))
+    sums = np.vstack([zero_row, np.cumsum(np.where(valid, matrix, 0.0), axis=0)])
+    counts = np.vstack([zero_row, np.cumsum(valid, axis=0)])
+    end = np.arange(1, len(matrix) + 1)
+    start = np.maximum(end - window, 0)
+    window_sums = sums[end] - sums[start]
+    window_counts = counts[end] - counts[start]
+    return np.divide(window_sums, window_counts, out=np.full(window_sums.shape, np.nan), where=window_counts > 0)
+
+
+def slopes(matrix: np.ndarray) -> np.ndarray:
+    """Least-squares slope per column against session index (score points per session)"""
+    valid = ~np.isnan(matrix)
+    filled = np.where(valid, matrix, 0.0)
+    x = np.arange(len(matrix), dtype=float)[:, None]
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = (x * valid).sum(axis=0) / n
+        mean_y = filled.sum(axis=0) / n
+        dx = np.where(valid, x - mean_x, 0.0)
+        covariance = (dx * (filled - mean_y)).sum(axis=0)
+        variance = (dx ** 2).sum(axis=0)
+        result = covariance / variance
+    result[(n < 2) | (variance == 0)] = np.nan
+    return result
+
+
+def filler_word_counts(rows: list) -> Counter:
+    """Occurrences of each filler word, from the local speech metrics.
+
+    Sessions saved before those existed only list which words appeared, so
+    each listed word counts once for them.
+    """
+    words = Counter()
+    for row in rows:
+        by_word = row.get("filler_by_word")
+        if isinstance(by_word, dict):
+            for word, count in by_word.items():
+                count = _number(count)
+                if count > 0:
+                    words[str(word).lower().strip()] += int(count)
+        else:
+            words.update(str(word).lower().strip()
+                         for word in (row.get("filler_words") or []) if isinstance(word, str) and word.strip())
+    return words
+
+
+def buckets(days: np.ndarray, matrix: np.ndarray, fillers: np.ndarray, limit: int) -> list:
+    """Session counts, metric averages and filler totals per calendar bucket, newest ``limit`` kept"""
+    keys, inverse = np.unique(days, return_inverse=True)
+    valid = ~np.isnan(matrix)
+    sums = np.zeros((len(keys), matrix.shape[1]))
+    counts = np.zeros((len(keys), matrix.shape[1]))
+    np.add.at(sums, inverse, np.where(valid, matrix, 0.0))
+    np.add.at(counts, inverse, valid)
+    averages = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+    sessions = np.bincount(inverse, minlength=len(keys))
+    filler_totals = np.bincount(inverse, weights=fillers, minlength=len(keys))
+    return [
+        {"start": str(key), "sessions": int(count), "averages": _by_metric(row), "filler_words": int(fillers_in)}
+        for key, count, row, fillers_in in zip(keys, sessions, averages, filler_totals)
+    ][-limit:]
+
+
+def summarize_progress(rows: list, window: int = DEFAULT_WINDOW) -> dict:
+    """Aggregate a user's sessions (oldest first) into the progress summary payload"""
+    rows = [row for row in rows if isinstance(row.get("date"), datetime)]
+    summary = {"sessions": len(rows), "window": window, "generated_at": datetime.utcnow().isoformat()}
+    if not rows:
+        empty = _by_metric([np.nan] * len(SCORE_METRICS))
+        return {**summary, "averages": empty, "categories": {},
+                "moving_average": {metric: [] for metric in SCORE_METRICS},
+                "slopes": {"all": empty, "recent": empty},
+                "filler_words": {"total": 0, "per_session": 0, "top": []}, "daily": [], "weekly": []}
+
+    scores = np.array([[_number((row.get("scores") or {}).get(metric)) for metric in SCORE_METRICS]
+                       for row in rows], dtype=float)
+    fillers = np.nan_to_num(np.array([_number(row.get("filler_count")) for row in rows], dtype=float))
+    categories = np.array([row.get("category") or "unknown" for row in rows])
+    days = np.array([row["date"] for row in rows], dtype="datetime64[D]")
+    # 1970-01-01 was a Thursday, so (days + 3) % 7 is the weekday with Monday = 0
+    weeks = days - (days.astype(np.int64) + 3) % 7
+
+    per_category = {}
+    for category in np.unique(categories):
+        mask = categories == category
+        per_category[str(category)] = {"sessions": int(mask.sum()), "averages": _by_metric(_nanmean(scores[mask]))}
+
+    trailing = moving_average(scores, window)[-MAX_SERIES_POINTS:]
+    words = filler_word_counts(rows)
+
+    return {
+        **summary,
+        "first_session": rows[0]["date"].isoformat(),
+        "last_session": rows[-1]["date"].isoformat(),
+        "averages": _by_metric(_nanmean(scores)),
+        "categories": per_category,
+        "moving_average": {metric: _rounded(trailing[:, i]) for i, metric in enumerate(SCORE_METRICS)},
+        "slopes": {"all": _by_metric(slopes(scores)), "recent": _by_metric(slopes(scores[-window:]))},
+        "filler_words": {
+            "total": int(fillers.sum()),
+            "per_session": round(float(fillers.mean()), 2),
+            "top": words.most_common(TOP_FILLER_WORDS),
+        },
+        "daily": buckets(days, scores, fillers, MAX_DAILY_BUCKETS),
+        "weekly": buckets(weeks, scores, fillers, MAX_WEEKLY_BUCKETS),
+    }
@@ -0,0 +1,196 @@
+"""
+In-process pool of pre-generated interview questions.
+
+Questions are kept per (category, job_domain, difficulty) key and served
+straight from memory. A background task tops each key up in batches
+through the LLM, dropping duplicates; entries expire after a TTL and the
+least recently used keys are evicted once the pool holds too many.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", "10"))      # questions kept per key
+QUESTION_POOL_BATCH = int(os.getenv("QUESTION_POOL_BATCH", "5"))         # questions per LLM call
+QUESTION_POOL_TTL = int(os.getenv("QUESTION_POOL_TTL", "3600"))          # seconds
+QUESTION_POOL_MAX_KEYS = int(os.getenv("QUESTION_POOL_MAX_KEYS", "100"))
+QUESTION_POOL_MAX_PENDING = int(os.getenv("QUESTION_POOL_MAX_PENDING", "100"))  # queued refill requests
+QUESTION_POOL_RECENT = 50  # recently served questions remembered per key for de-duplication
+QUESTION_POOL_SWEEP_INTERVAL = 60  # seconds between top-up passes over known keys
+
+
+def _normalize(question: str) -> str:
+    return " ".join(question.lower().split()).rstrip("?.! ")
+
+
+class QuestionPool:
+    def __init__(self, generate, target: int = QUESTION_POOL_TARGET, batch_size: int = QUESTION_POOL_BATCH,
+                 ttl: int = QUESTION_POOL_TTL, max_keys: int = QUESTION_POOL_MAX_KEYS,
+                 max_pending: int = QUESTION_POOL_MAX_PENDING):
+        """``generate(category, count, job_domain, difficulty)`` must raise on failure"""
+        self._generate = generate
+        self.target = target
+        self.batch_size = batch_size
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries = OrderedDict()   # key -> deque of (question, created_at), LRU ordered
+        self._recent = {}               # key -> deque of normalized recently served questions
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._pending = set()
+        self._worker = None
+        self._sweeper = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_failures = 0
+        self.refills_dropped = 0
+        self.duplicates_dropped = 0
+        self.expired = 0
+        self.evicted_keys = 0
+        self.refill_latency_total = 0.0
+        self.refill_latency_max = 0.0
+
+    # --- Serving ---
+    def take(self, key: tuple, count: int = 1) -> list:
+        """Pop up to ``count`` fresh questions for ``key`` and schedule a top-up"""
+        entries = self._touch(key)
+        self._expire(key, entries)
+        questions = []
+        while entries and len(questions) < count:
+            question, _ = entries.popleft()
+            questions.append(question)
+            self._recent[key].append(_normalize(question))
+        if questions:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if len(entries) < self.target:
+            self.request_refill(key)
+        return questions
+
+    def size(self, key: tuple) -> int:
+        return len(self._entries.get(key, ()))
+
+    def _touch(self, key: tuple) -> deque:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self._entries[key] = deque()
+        self._recent[key] = deque(maxlen=QUESTION_POOL_RECENT)
+        while len(self._entries) > self.max_keys:
+            evicted, _ = self._entries.popitem(last=False)
+            self._recent.pop(evicted, None)
+            self.evicted_keys += 1
+        return self._entries[key]
+
+    def _expire(self, key: tuple, entries: deque):
+        cutoff = time.monotonic() - self.ttl
+        while entries and entries[0][1] < cutoff:
+            entries.popleft()
+            self.expired += 1
+
+    # --- Refilling ---
+    def request_refill(self, key: tuple):
+        if key in self._pending:
+            return
+        if self._queue.full():
+            # The worker is behind; the key is asked for again on its next miss or sweep
+            self.refills_dropped += 1
+            return
+        self._pending.add(key)
+        self._queue.put_nowait(key)
+
+    async def refill(self, key: tuple):
+        """Generate batches for ``key`` until it reaches the target size"""
+        category, job_domain, difficulty = key
+        entries = self._touch(key)
+        self._expire(key, entries)
+        attempts = 0
+        while len(entries) < self.target and attempts < 3:
+            attempts += 1
+            start = time.perf_counter()
+            try:
+                questions = await self._generate(category, self.batch_size, job_domain, difficulty)
+            except Exception as e:
+                self.refill_failures += 1
+                logger.warning(f"Question pool refill failed for {key}: {e}")
+                return
+            latency = time.perf_counter() - start
+            self.refills += 1
+            self.refill_latency_total += latency
+            self.refill_latency_max = max(self.refill_latency_max, latency)
+            # Other keys may have evicted this one while the batch was generated
+            entries = self._touch(key)
+            self._add(key, entries, questions)
+
+    def _add(self, key: tuple, entries: deque, questions: list):
+        seen = {_normalize(question) for question, _ in entries}
+        seen.update(self._recent[key])
+        now = time.monotonic()
+        for question in questions:
+            if not isinstance(question, str) or not question.strip():
+                continue
+            normalized = _normalize(question)
+            if normalized in seen:
+                self.duplicates_dropped += 1
+                continue
+            seen.add(normalized)
+            entries.append((question.strip(), now))
+
+    async def _run_refills(self):
+        while True:
+            key = await self._queue.get()
+            try:
+                await self.refill(key)
+            except Exception as e:
+                logger.error(f"Question pool refill for {key} crashed: {e}")
+            finally:
+                self._pending.discard(key)
+
+    async def _sweep(self):
+        """Periodically top up every known key so entries lost to the TTL get replaced"""
+        while True:
+            await asyncio.sleep(QUESTION_POOL_SWEEP_INTERVAL)
+            for key in list(self._entries):
+                self._expire(key, self._entries[key])
+                if len(self._entries[key]) < self.target:
+                    self.request_refill(key)
+
+    # --- Lifecycle ---
+    def start(self, warm_keys=()):
+        for key in warm_keys:
+            self.request_refill(key)
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run_refills())
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        for task in (self._worker, self._sweeper):
+            if task:
+                task.cancel()
+        self._worker = self._sweeper = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "keys": len(self._entries),
+            "questions": sum(len(entries) for entries in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "refills": self.refills,
+            "refill_failures": self.refill_failures,
+            "pending_refills": len(self._pending),
+            "refills_dropped": self.refills_dropped,
+            "duplicates_dropped": self.duplicates_dropped,
+            "expired": self.expired,
+            "evicted_keys": self.evicted_keys,
+            "avg_refill_latency_ms": round(self.refill_latency_total / self.refills * 1000, 2) if self.refills else 0,
+            "max_refill_latency_ms": round(self.refill_latency_max * 1000, 2),
+        }
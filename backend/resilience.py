@@ -0,0 +1,304 @@
+"""
+Failure handling for the external AI services (Groq, AssemblyAI).
+
+- ``CircuitBreaker``: one per dependency. When at least BREAKER_FAILURE_RATE
+  of the last BREAKER_WINDOW calls failed, or the last
+  BREAKER_CONSECUTIVE_FAILURES in a row did, the breaker opens and calls fail
+  at once with CircuitOpen, so callers go straight to their fallbacks
+  instead of waiting out a timeout. After BREAKER_RESET_SECONDS a single
+  probe call is let through; if it succeeds the breaker closes again.
+- Deadlines: a per-request deadline in a context variable, set by the HTTP
+  middleware and by the job worker. Each external call takes its timeout
+  from what is left, so transcription, analysis and the session insert share
+  one budget instead of each getting a full timeout.
+- ``Hedger``: once a call has run past the observed p95 for its key, an
+  identical second call is started and whichever succeeds first is used.
+  HEDGE_MAX_RATIO caps the extra load.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))            # recent calls considered
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))       # before the failure rate counts
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+# A sudden outage trips the breaker even while the window still holds earlier successes
+BREAKER_CONSECUTIVE_FAILURES = int(os.getenv("BREAKER_CONSECUTIVE_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# A timeout shorter than this was set by the request deadline, not the dependency's usual limit,
+# so it says nothing about the dependency's health
+BREAKER_MIN_TIMEOUT = float(os.getenv("BREAKER_MIN_TIMEOUT", "5"))
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))   # hedged calls per call, at most
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))   # never hedge sooner than this, seconds
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))  # completions needed before hedging
+HEDGE_WINDOW = 200
+
+BREAKER_TRANSITIONS = Counter("preptalk_breaker_transitions_total", "Circuit breaker state changes",
+                              ("dependency", "state"))
+BREAKER_REJECTIONS = Counter("preptalk_breaker_rejections_total", "Calls failed fast by an open circuit breaker",
+                             ("dependency",))
+DEADLINE_EXCEEDED = Counter("preptalk_deadline_exceeded_total", "Calls skipped because the request deadline passed",
+                            ("operation",))
+HEDGED_CALLS = Counter("preptalk_hedged_calls_total", "Hedged calls by which attempt won",
+                       ("dependency", "winner"))
+
+# Absolute time.monotonic() deadline for the request or job being handled, or None
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class CircuitOpen(Exception):
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+# --- Deadlines ---
+@contextmanager
+def deadline(seconds: float):
+    """Run the block within ``seconds``; a nested deadline can only shorten the outer one"""
+    current = _deadline.get()
+    at = time.monotonic() + seconds
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(default: float = None):
+    """Seconds left before the current deadline (negative once passed), or ``default`` without one"""
+    at = _deadline.get()
+    return default if at is None else at - time.monotonic()
+
+
+def timeout_for(limit: float, operation: str) -> float:
+    """Timeout for one call: ``limit`` or what is left of the deadline, whichever is smaller.
+
+    Raises DeadlineExceeded when nothing is left.
+    """
+    left = remaining()
+    if left is None:
+        return limit
+    if left <= 0:
+        DEADLINE_EXCEEDED.inc(operation=operation)
+        raise DeadlineExceeded(f"Request deadline passed before {operation}")
+    return min(limit, left)
+
+
+# --- Circuit breakers ---
+def is_timeout(exc: BaseException) -> bool:
+    # asyncio.wait_for, httpx and the Groq SDK each have their own timeout exception
+    return isinstance(exc, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in type(exc).__name__
+
+
+def is_dependency_failure(exc: BaseException) -> bool:
+    """Server errors, throttling, timeouts and connection errors count; client errors do not"""
+    if isinstance(exc, (DeadlineExceeded, CircuitOpen, asyncio.CancelledError, GeneratorExit)):
+        return False
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status in (408, 429)
+    return True
+
+
+class CircuitBreaker:
+    def __init__(self, dependency: str, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_rate: float = BREAKER_FAILURE_RATE, consecutive_failures: int = BREAKER_CONSECUTIVE_FAILURES,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.dependency = dependency
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.consecutive_failures = consecutive_failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._opened_at = 0.0
+        self._probing = False
+        self._failure_streak = 0
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Open and not yet due for a probe"""
+        return self.state == "open" and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def before_call(self):
+        """Raise CircuitOpen unless the call may go ahead"""
+        if self.state == "open":
+            wait = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if wait > 0:
+                self._reject(wait)
+            self._transition("half_open")
+        if self.state == "half_open":
+            if self._probing:
+                self._reject(self.reset_seconds)
+            self._probing = True
+
+    def _reject(self, retry_after: float):
+        self.rejected += 1
+        BREAKER_REJECTIONS.inc(dependency=self.dependency)
+        raise CircuitOpen(self.dependency, retry_after)
+
+    def record_success(self):
+        if self.state == "half_open":
+            self._probing = False
+            self._outcomes.clear()
+            self._transition("closed")
+        self._outcomes.append(True)
+        self._failure_streak = 0
+
+    def record_error(self, exc: BaseException, timeout: float = None):
+        """Count a failed call, unless the failure was ours (deadline, cancellation, bad request)"""
+        cut_short = timeout is not None and timeout < BREAKER_MIN_TIMEOUT and is_timeout(exc)
+        if cut_short or not is_dependency_failure(exc):
+            if self.state == "half_open":
+                self._probing = False
+            return
+        if self.state == "half_open":
+            self._probing = False
+            self._open()
+            return
+        self._outcomes.append(False)
+        self._failure_streak += 1
+        failures = self._outcomes.count(False)
+        failing = len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate
+        if self.state == "closed" and (failing or self._failure_streak >= self.consecutive_failures):
+            self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self.opened += 1
+        self._transition("open")
+        logger.warning(f"Circuit for {self.dependency} opened; failing fast for {self.reset_seconds:.0f}s")
+
+    def _transition(self, state: str):
+        self.state = state
+        BREAKER_TRANSITIONS.inc(dependency=self.dependency, state=state)
+
+    async def call(self, make_call, timeout: float = None):
+        """Await ``make_call()`` through the breaker; ``timeout`` is the one the call was given"""
+        self.before_call()
+        try:
+            result = await make_call()
+        except BaseException as e:
+            self.record_error(e, timeout)
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": "open" if self.is_open else self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._outcomes.count(False),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+# --- Hedged requests ---
+def _consume(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()
+
+
+class Hedger:
+    def __init__(self, dependency: str, enabled: bool = False, max_ratio: float = HEDGE_MAX_RATIO,
+                 min_delay: float = HEDGE_MIN_DELAY, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.dependency = dependency
+        self.enabled = enabled
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = {}  # key -> recent successful call durations
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self, key: str):
+        """Seconds to wait before hedging a call for ``key``, or None while there is no p95 yet"""
+        samples = self._latencies.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return max(float(np.percentile(samples, 95)), self.min_delay)
+
+    async def run(self, key: str, make_call, spare=None):
+        """Await ``make_call()``, starting a second identical call once the first passes the p95.
+
+        ``spare()``, if given, is asked before hedging whether there is capacity for another call.
+        """
+        self.calls += 1
+        start = time.monotonic()
+        delay = self.delay(key) if self.enabled else None
+        if delay is None:
+            result = await make_call()
+            self._observe(key, start)
+            return result
+
+        first = asyncio.ensure_future(make_call())
+        pending = {first}
+        hedged = False
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and self.hedged < self.max_ratio * self.calls and (spare is None or spare()) \
+                    and remaining(delay) > 0:
+                hedged = True
+                self.hedged += 1
+                pending.add(asyncio.ensure_future(make_call()))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if hedged:
+                            winner = "first" if task is first else "hedge"
+                            self.hedge_wins += winner == "hedge"
+                            HEDGED_CALLS.inc(dependency=self.dependency, winner=winner)
+                        self._observe(key, start)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_consume)
+
+    def _observe(self, key: str, start: float):
+        self._latencies.setdefault(key, deque(maxlen=HEDGE_WINDOW)).append(time.monotonic() - start)
+
+    def stats(self) -> dict:
+        def rounded(key):
+            value = self.delay(key)
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_after_ms": {key: rounded(key) for key in self._latencies},
+        }
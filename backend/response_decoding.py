@@ -0,0 +1,274 @@
+"""
+Shared decoding of LLM responses into validated structures.
+
+Every caller that expects JSON from the model goes through ``decode``:
+a single pass finds the first balanced JSON value in the reply (skipping
+prose and markdown fences), light repairs handle trailing commas and
+truncated output, and the result is validated against a pydantic schema.
+``decode_with_retry`` re-asks the model with the validation error when
+decoding fails, within a bounded retry budget.
+"""
+
+import json
+import logging
+import os
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Re-asks allowed after a reply fails to decode
+LLM_DECODE_RETRIES = int(os.getenv("LLM_DECODE_RETRIES", "1"))
+
+
+# --- Schemas ---
+class Scores(BaseModel):
+    fluency: float = Field(ge=0, le=10)
+    grammar: float = Field(ge=0, le=10)
+    confidence: float = Field(ge=0, le=10)
+    overall: float = Field(ge=0, le=10)
+
+
+class FillerWords(BaseModel):
+    count: int = 0
+    words: List[str] = []
+
+
+class Analysis(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    strengths: List[str] = []
+    improvements: List[str] = []
+    fillerWords: FillerWords = FillerWords()
+    sentiment: str = ""
+    tone: str = ""
+
+
+class InterviewFeedback(BaseModel):
+    """Feedback for one answer, as requested by build_analysis_prompt"""
+    model_config = ConfigDict(extra="allow")
+
+    scores: Scores
+    analysis: Analysis = Analysis()
+    tips: List[str] = []
+
+
+class BatchFeedback(BaseModel):
+    """Feedback for several answers in one reply; items are validated one by one with validate_items"""
+    answers: List[dict] = Field(min_length=1)
+
+    @classmethod
+    def coerce(cls, value):
+        if isinstance(value, list):
+            return {"answers": value}
+        return value
+
+
+class QuestionFeedback(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[object] = None
+    conceptual_correctness: Optional[object] = None
+    confidence: Optional[object] = None
+    details: Optional[object] = None
+
+
+class CoachingFeedback(BaseModel):
+    """Whole-transcript coaching feedback, as requested by build_prompt"""
+    model_config = ConfigDict(extra="allow")
+
+    questions: List[QuestionFeedback] = []
+    overall_feedback: str
+    strong_points: List[str] = []
+    weak_points: List[str] = []
+    suggestions: List[str] = []
+
+
+class QuestionList(BaseModel):
+    questions: List[str] = Field(min_length=1)
+
+    @classmethod
+    def coerce(cls, value):
+        """Accept ["q", ...], [{"question": "q"}, ...] or {"questions": [...]}"""
+        if isinstance(value, dict):
+            value = value.get("questions", value)
+        if isinstance(value, list):
+            value = [item.get("question") if isinstance(item, dict) else item for item in value]
+        return {"questions": value}
+
+
+class DecodeError(ValueError):
+    pass
+
+
+class LLMCallFailed(DecodeError):
+    """The reply is call_groq_llm's error placeholder; re-asking would not help"""
+
+
+# --- Extraction ---
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+def _scan(text: str, pos: int = 0):
+    """Return (start, candidate) for the first balanced JSON object or array at or after ``pos``.
+
+    One left-to-right scan that tracks strings and escapes. If the reply is
+    truncated, the open strings and containers are closed so the prefix
+    can still be parsed.
+    """
+    start = -1
+    stack = []
+    in_string = False
+    escape = False
+    for i in range(pos, len(text)):
+        ch = text[i]
+        if start < 0:
+            if ch in "{[":
+                start = i
+                stack.append("}" if ch == "{" else "]")
+            continue
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack and stack[-1] == ch:
+                stack.pop()
+            if not stack:
+                return start, text[start:i + 1]
+    if start < 0:
+        raise DecodeError("No JSON object or array found")
+    # Truncated reply: close whatever is still open
+    tail = text[start:]
+    if in_string:
+        tail += '"'
+    tail = tail.rstrip().rstrip(",:")
+    return start, tail + "".join(reversed(stack))
+
+
+def _parse(candidate: str):
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    # Trailing commas are the most common defect that survives extraction
+    return json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+
+
+def load_json(text: str, max_candidates: int = 3):
+    """Extract and parse JSON from a raw model reply, repairing common defects.
+
+    If the first bracketed span is not JSON (e.g. "Questions [behavioral]:"),
+    scanning resumes after it, up to ``max_candidates`` spans.
+    """
+    # JSON-mode replies are usually already a bare object; skip the scan for them
+    if text.lstrip()[:1] in ("{", "["):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass
+    pos = 0
+    error = None
+    for _ in range(max_candidates):
+        try:
+            start, candidate = _scan(text, pos)
+        except DecodeError:
+            break
+        try:
+            return _parse(candidate)
+        except json.JSONDecodeError as e:
+            error = e
+            pos = start + 1
+    if error is None:
+        raise DecodeError("No JSON object or array found")
+    raise DecodeError(f"Invalid JSON: {error}")
+
+
+def decode(text: str, schema):
+    """Parse ``text`` and validate it against ``schema``; raises DecodeError"""
+    if not text:
+        raise DecodeError("Empty response")
+    with stage("parse"):
+        data = load_json(text)
+        if isinstance(data, dict) and data.get("fallback") and "error" in data:
+            raise LLMCallFailed(f"LLM call failed: {data['error']}")
+        if hasattr(schema, "coerce"):
+            data = schema.coerce(data)
+        try:
+            return schema.model_validate(data)
+        except ValidationError as e:
+            raise DecodeError(f"Schema validation failed: {e.error_count()} error(s): {e.errors()[0]['msg']}") from e
+
+
+def validate_items(items: list, schema, key: str = "id") -> dict:
+    """Validate each item on its own, so one bad entry does not discard a whole batch.
+
+    Returns ``{int(item[key]): model}`` for the items that pass; models often
+    return the ids as strings ("1"), which count the same as 1.
+    """
+    valid = {}
+    for item in items:
+        try:
+            valid[int(str(item[key]).strip())] = schema.model_validate(item)
+        except (KeyError, TypeError, ValueError, ValidationError) as e:
+            logger.warning(f"Dropping invalid {schema.__name__} item: {e}")
+    return valid
+
+
+# Per-schema outcome counters, reported by /stats
+_stats = {}
+
+
+def decoding_stats() -> dict:
+    return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def _count(schema, outcome: str):
+    counts = _stats.setdefault(schema.__name__, {"decoded": 0, "reasks": 0, "failed": 0})
+    counts[outcome] += 1
+
+
+def reask_prompt(prompt: str, error: str) -> str:
+    return (
+        f"{prompt}\n\nYour previous reply could not be used ({error}). "
+        "Reply again with ONLY the JSON, no markdown or commentary."
+    )
+
+
+async def decode_with_retry(call, prompt: str, schema, retries: int = LLM_DECODE_RETRIES):
+    """Call the LLM and decode its reply, re-asking up to ``retries`` times.
+
+    ``call(prompt)`` must return the raw reply text. Returns
+    ``(validated model or None, last raw reply, attempts used)``.
+    """
+    raw = ""
+    current_prompt = prompt
+    for attempt in range(retries + 1):
+        raw = await call(current_prompt)
+        try:
+            result = decode(raw, schema)
+        except LLMCallFailed as e:
+            logger.warning(f"Not re-asking for {schema.__name__}: {e}")
+            _count(schema, "failed")
+            return None, raw, attempt + 1
+        except DecodeError as e:
+            logger.warning(f"Decoding {schema.__name__} failed on attempt {attempt + 1}: {e}")
+            current_prompt = reask_prompt(prompt, str(e))
+            if attempt < retries:
+                _count(schema, "reasks")
+            continue
+        _count(schema, "decoded")
+        return result, raw, attempt + 1
+    _count(schema, "failed")
+    return None, raw, retries + 1
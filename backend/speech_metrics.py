@@ -0,0 +1,151 @@
+"""
+Deterministic speech metrics for an answer.
+
+Computed from the transcript text and, when the provider returns them,
+word timestamps: filler words, speaking rate, pauses, lexical diversity and
+sentence lengths. The counts are exact, unlike the LLM's, and take well
+under a millisecond for a typical answer, so the analysis prompt passes
+them to the model as a compact summary instead of asking it to count.
+"""
+
+import re
+
+import numpy as np
+
+FILLER_WORDS = ("um", "umm", "uh", "uhm", "er", "erm", "ah", "hmm", "like", "basically", "actually", "literally")
+FILLER_PHRASES = ("you know", "i mean", "kind of", "sort of")
+# "like" after these is the verb ("I like", "would like"), not a filler
+LIKE_VERB_PRECEDERS = ("i", "you", "we", "they", "would", "really", "don't", "didn't", "to")
+PAUSE_MS = 500          # gaps between words at least this long count as pauses
+LONG_PAUSE_MS = 2000
+MATTR_WINDOW = 50       # moving-average type-token ratio window, in words
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+|[.!?]+")
+
+
+def tokenize(text: str) -> tuple:
+    """Word ids, the vocabulary (word -> id) and each word's sentence number"""
+    vocabulary = {}
+    ids = []
+    sentence_ids = []
+    sentence = 0
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token[0] in ".!?":
+            sentence += 1
+            continue
+        ids.append(vocabulary.setdefault(token, len(vocabulary)))
+        sentence_ids.append(sentence)
+    return np.array(ids, dtype=np.int64), vocabulary, np.array(sentence_ids, dtype=np.int64)
+
+
+def _ids_of(vocabulary: dict, words) -> np.ndarray:
+    return np.array([vocabulary[word] for word in words if word in vocabulary], dtype=np.int64)
+
+
+def filler_words(ids: np.ndarray, vocabulary: dict) -> dict:
+    """Exact counts of filler words and phrases, most frequent first"""
+    if not len(ids):
+        return {"count": 0, "words": [], "by_word": {}}
+    is_filler = np.isin(ids, _ids_of(vocabulary, FILLER_WORDS))
+    if "like" in vocabulary:
+        previous = np.concatenate([[-1], ids[:-1]])
+        is_filler &= ~((ids == vocabulary["like"]) & np.isin(previous, _ids_of(vocabulary, LIKE_VERB_PRECEDERS)))
+    counts = {}
+    single = np.bincount(ids[is_filler], minlength=len(vocabulary))
+    words = list(vocabulary)
+    for word_id in np.flatnonzero(single):
+        counts[words[word_id]] = int(single[word_id])
+    # Two-word phrases as pair codes: first id * vocabulary size + second id
+    size = len(vocabulary)
+    pairs = ids[:-1] * size + ids[1:]
+    for phrase in FILLER_PHRASES:
+        first, second = phrase.split()
+        if first in vocabulary and second in vocabulary:
+            found = int((pairs == vocabulary[first] * size + vocabulary[second]).sum())
+            if found:
+                counts[phrase] = found
+    by_word = dict(sorted(counts.items(), key=lambda item: -item[1]))
+    return {"count": sum(by_word.values()), "words": list(by_word), "by_word": by_word}
+
+
+def pause_stats(words: list) -> dict:
+    """Gaps between consecutive timestamped words (times in ms)"""
+    if len(words) < 2:
+        return {"count": 0, "long_count": 0, "total_s": 0.0, "mean_s": 0.0, "max_s": 0.0}
+    times = np.array([(word.get("start", 0), word.get("end", 0)) for word in words], dtype=float)
+    gaps = times[1:, 0] - times[:-1, 1]
+    pauses = gaps[gaps >= PAUSE_MS]
+    return {
+        "count": int(len(pauses)),
+        "long_count": int((pauses >= LONG_PAUSE_MS).sum()),
+        "total_s": round(float(pauses.sum()) / 1000, 2),
+        "mean_s": round(float(pauses.mean()) / 1000, 2) if len(pauses) else 0.0,
+        "max_s": round(float(pauses.max()) / 1000, 2) if len(pauses) else 0.0,
+    }
+
+
+def lexical_diversity(ids: np.ndarray, vocabulary: dict) -> dict:
+    """Type-token ratio, plus its moving average over MATTR_WINDOW words (less sensitive to length)"""
+    if not len(ids):
+        return {"unique_words": 0, "ttr": 0.0, "mattr": 0.0}
+    ttr = len(vocabulary) / len(ids)
+    if len(ids) <= MATTR_WINDOW:
+        mattr = ttr
+    else:
+        windows = np.sort(np.lib.stride_tricks.sliding_window_view(ids, MATTR_WINDOW), axis=1)
+        distinct = 1 + (np.diff(windows, axis=1) != 0).sum(axis=1)
+        mattr = float(distinct.mean()) / MATTR_WINDOW
+    return {"unique_words": len(vocabulary), "ttr": round(ttr, 3), "mattr": round(mattr, 3)}
+
+
+def sentence_lengths(sentence_ids: np.ndarray) -> dict:
+    """Words per sentence, from each word's sentence number"""
+    lengths = np.bincount(sentence_ids) if len(sentence_ids) else np.zeros(0, dtype=np.int64)
+    lengths = lengths[lengths > 0]
+    if not len(lengths):
+        return {"count": 0, "mean": 0.0, "median": 0.0, "max": 0, "std": 0.0}
+    return {
+        "count": int(len(lengths)),
+        "mean": round(float(lengths.mean()), 1),
+        "median": float(np.median(lengths)),
+        "max": int(lengths.max()),
+        "std": round(float(lengths.std()), 1),
+    }
+
+
+def speech_metrics(text: str, words: list = None, audio_duration: float = 0.0) -> dict:
+    """All metrics for one answer; ``words`` are the provider's timestamped words, if any"""
+    ids, vocabulary, sentence_ids = tokenize(text or "")
+    words = [word for word in (words or []) if isinstance(word, dict)]
+    if len(words) >= 2:
+        duration = (words[-1].get("end", 0) - words[0].get("start", 0)) / 1000
+    else:
+        duration = audio_duration or 0.0
+    return {
+        "timestamps": len(words) >= 2,
+        "word_count": int(len(ids)),
+        "duration_s": round(duration, 2),
+        "wpm": round(len(ids) / duration * 60, 1) if duration > 0 else None,
+        "fillerWords": filler_words(ids, vocabulary),
+        "pauses": pause_stats(words),
+        "lexical_diversity": lexical_diversity(ids, vocabulary),
+        "sentences": sentence_lengths(sentence_ids),
+    }
+
+
+def prompt_summary(metrics: dict) -> str:
+    """One compact line of the metrics for the analysis prompt"""
+    if not metrics:
+        return "not available"
+    fillers = metrics["fillerWords"]
+    filler_text = ", ".join(f"{word} x{count}" for word, count in list(fillers["by_word"].items())[:5])
+    pauses = metrics["pauses"]
+    parts = [
+        f"{metrics['word_count']} words",
+        f"{metrics['wpm']} wpm" if metrics["wpm"] else None,
+        f"{fillers['count']} fillers" + (f" ({filler_text})" if filler_text else ""),
+        f"{pauses['count']} pauses over {PAUSE_MS} ms (longest {pauses['max_s']}s)" if metrics["timestamps"] else None,
+        f"lexical diversity {metrics['lexical_diversity']['mattr']}",
+        f"avg sentence {metrics['sentences']['mean']} words (max {metrics['sentences']['max']})",
+    ]
+    return "; ".join(part for part in parts if part)
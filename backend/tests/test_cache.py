@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import TieredCache, TTLCache, prompt_cache_key
+
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    entries = TTLCache(max_entries=10, ttl=60)
+    entries.set("a", 1)
+    clock.advance(59)
+    assert entries.get("a") == 1
+    clock.advance(2)
+    assert entries.get("a") is None
+    assert len(entries) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    entries = TTLCache(max_entries=2, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+    entries.set("c", 3)
+    assert entries.get("b") is None
+    assert (entries.get("a"), entries.get("c")) == (1, 3)
+    assert entries.evictions == 1
+
+
+def test_set_refreshes_the_expiry(clock):
+    entries = TTLCache(max_entries=10, ttl=60)
+    entries.set("a", 1)
+    clock.advance(50)
+    entries.set("a", 2)
+    clock.advance(50)
+    assert entries.get("a") == 2
+
+
+def test_prompt_cache_key_ignores_whitespace_only():
+    key = prompt_cache_key("Rate  this\nanswer", "llama", 0.3)
+    assert key == prompt_cache_key("Rate this answer", "llama", 0.3)
+    assert key != prompt_cache_key("Rate this answer", "llama", 0.3, prompt_version="2")
+    assert key != prompt_cache_key("Rate this answer", "llama", 0.7)
+
+
+class DictTier:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value):
+        self.values[key] = value
+
+
+def test_tiered_cache_promotes_persistent_hits():
+    persistent = DictTier()
+    persistent.values["k"] = "v"
+    tiered = TieredCache("llm", TTLCache(max_entries=10, ttl=60), persistent)
+
+    async def run():
+        assert await tiered.get("k") == "v"
+        assert await tiered.get("k") == "v"
+        assert await tiered.get("missing") is None
+
+    asyncio.run(run())
+    assert (tiered.persistent_hits, tiered.memory_hits, tiered.misses) == (1, 1, 1)
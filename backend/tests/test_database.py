@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+from database import connect_store
+
+
+def scored(fluency, overall=None, **fields):
+    scores = {"fluency": fluency, "grammar": 8, "confidence": 6}
+    if overall is not None:
+        scores["overall"] = overall
+    return {"user_id": "u", "feedback": {"scores": scores}, **fields}
+
+
+def test_average_scores_follow_group_membership():
+    store = connect_store("mongomock://")
+
+    async def run():
+        shared = await store.sessions.insert(scored(6, 6, session_group_id="g1"))
+        untagged = await store.sessions.insert(scored(8))
+        unscored = await store.sessions.insert({"user_id": "u", "feedback": None})
+        return await store.sessions.average_scores_by_group({
+            "g1": [shared, untagged, unscored],
+            "g2": [shared],
+            "g3": [unscored],
+            "g4": [],
+        })
+
+    averages = asyncio.run(run())
+    assert averages == {
+        "g1": {"fluency": 7.0, "grammar": 8.0, "confidence": 6.0, "overall": 3.0},
+        "g2": {"fluency": 6.0, "grammar": 8.0, "confidence": 6.0, "overall": 6.0},
+    }
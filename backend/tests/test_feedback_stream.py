@@ -0,0 +1,52 @@
+from feedback_stream import FEEDBACK_FIELDS, IncrementalJSONParser, validated_fields
+
+REPLY = (
+    'Here is the feedback:\n```json\n'
+    '{"scores": {"fluency": 7, "grammar": 8, "confidence": 6, "overall": 7}, '
+    '"analysis": {"strengths": ["Clear \\"STAR\\" structure", "Good pace"], "improvements": ["Fewer fillers"]}, '
+    '"tips": ["Quantify the impact, e.g. {50%}"]}\n```'
+)
+
+
+def feed_tokens(parser, text, size):
+    completed = []
+    for i in range(0, len(text), size):
+        completed += parser.feed(text[i:i + size])
+    return completed
+
+
+def test_members_are_reported_once_complete():
+    parser = IncrementalJSONParser()
+    completed = parser.feed('{"scores": {"fluency": 7, "grammar": 8')
+    assert completed == [(("scores", "fluency"), 7)]
+    completed = parser.feed(', "confidence": 6, "overall": 7}, "tips": [')
+    assert completed == [
+        (("scores", "grammar"), 8),
+        (("scores", "confidence"), 6),
+        (("scores", "overall"), 7),
+        (("scores",), {"fluency": 7, "grammar": 8, "confidence": 6, "overall": 7}),
+    ]
+
+
+def test_token_boundaries_do_not_change_the_result():
+    expected = feed_tokens(IncrementalJSONParser(), REPLY, len(REPLY))
+    for size in (1, 2, 3, 7):
+        assert feed_tokens(IncrementalJSONParser(), REPLY, size) == expected
+    paths = [path for path, _ in expected]
+    assert ("analysis", "strengths") in paths
+    assert dict(expected)[("tips",)] == ["Quantify the impact, e.g. {50%}"]
+
+
+def test_text_after_the_document_is_ignored():
+    parser = IncrementalJSONParser()
+    parser.feed('{"tips": ["a"]} {"tips": ["b"]}')
+    assert parser.finished
+    assert parser.feed('{"scores": 1}') == []
+
+
+def test_validated_fields_keeps_known_valid_fields():
+    completed = feed_tokens(IncrementalJSONParser(), REPLY, 5)
+    completed.append((("tips",), "not a list"))
+    fields = dict(validated_fields(completed, FEEDBACK_FIELDS))
+    assert set(fields) == {("scores",), ("analysis", "strengths"), ("analysis", "improvements"), ("tips",)}
+    assert fields[("analysis", "strengths")][0] == 'Clear "STAR" structure'
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+
+from database import connect_store
+from jobs import JobQueue
+
+
+def test_a_job_is_run_by_one_queue_only():
+    store = connect_store("mongomock://")
+    runs = []
+
+    async def handler(job):
+        runs.append(job["_id"])
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def run():
+        first = JobQueue(handler, lambda: store.jobs, workers=1)
+        second = JobQueue(handler, lambda: store.jobs, workers=1)
+        job_id = await first.submit({"question": "Why us?"})
+        # The second process finds the same job in the collection at startup
+        await second.start()
+        await first.start()
+        for _ in range(50):
+            job = await first.get(job_id)
+            if job["status"] == "done":
+                break
+            await asyncio.sleep(0.01)
+        await first.stop()
+        await second.stop()
+        return job, first.skipped + second.skipped
+
+    job, skipped = asyncio.run(run())
+    assert job["status"] == "done" and job["result"] == {"ok": True}
+    assert len(runs) == 1 and skipped == 1
+
+
+def test_only_expired_leases_are_recovered():
+    store = connect_store("mongomock://")
+    now = datetime.utcnow()
+
+    async def run():
+        for job_id, lease in (("orphaned", now - timedelta(seconds=5)), ("live", now + timedelta(seconds=60)),
+                              ("legacy", None)):
+            job = {"_id": job_id, "status": "running", "priority": 1, "created_at": now, "params": {}}
+            if lease:
+                job["lease_until"] = lease
+            await store.jobs.insert(job)
+        await store.jobs.insert({"_id": "finished", "status": "done", "priority": 1, "created_at": now})
+        recoverable = [job["_id"] for job in await store.jobs.list_recoverable()]
+        claimed = await store.jobs.claim("live", "other-process", 60)
+        return recoverable, claimed
+
+    recoverable, claimed = asyncio.run(run())
+    assert sorted(recoverable) == ["legacy", "orphaned"]
+    assert claimed is None
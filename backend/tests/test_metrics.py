@@ -0,0 +1,35 @@
+import asyncio
+
+from metrics import server_timing_header, start_request_timings, timed, timed_methods
+
+
+@timed_methods("mongo")
+class Repository:
+    async def find(self):
+        await asyncio.sleep(0.01)
+        return "doc"
+
+    async def find_twice(self):
+        # A repository method calling another must not be counted twice
+        await self.find()
+        return await self.find()
+
+
+def test_timed_methods_add_to_the_request_timings():
+    async def handle():
+        timings = start_request_timings()
+        assert await Repository().find_twice() == "doc"
+        return timings
+
+    timings = asyncio.run(handle())
+    assert list(timings) == ["mongo"]
+    assert 0.02 <= timings["mongo"] < 0.5
+    assert server_timing_header(timings, 1.0).startswith("mongo;dur=")
+
+
+def test_timed_outside_a_request_is_a_no_op():
+    @timed("llm")
+    async def call():
+        return 42
+
+    assert asyncio.run(call()) == 42
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+import question_pool
+from question_pool import QuestionPool
+
+KEY = ("hr", "", "Easy")
+
+
+class Generator:
+    def __init__(self, batches=None):
+        self.batches = list(batches or [])
+        self.calls = []
+
+    async def __call__(self, category, count, job_domain, difficulty):
+        self.calls.append((category, job_domain, difficulty))
+        await asyncio.sleep(0)
+        if self.batches:
+            batch = self.batches.pop(0)
+            return batch
+        return [f"{category} question {len(self.calls)}.{i}?" for i in range(count)]
+
+
+def test_take_serves_pool_and_schedules_refill():
+    generate = Generator([["Why us?", "Why now?", "Why this role?"]])
+    pool = QuestionPool(generate, target=3, batch_size=3)
+
+    async def run():
+        assert pool.take(KEY) == []
+        assert pool.stats()["pending_refills"] == 1
+        await pool.refill(KEY)
+        return pool.take(KEY, 2)
+
+    assert asyncio.run(run()) == ["Why us?", "Why now?"]
+    assert (pool.hits, pool.misses) == (1, 1)
+
+
+def test_duplicates_and_recently_served_questions_are_dropped():
+    generate = Generator([["Why us?", "why us", " "], ["Why us?", "Why now?"]])
+    pool = QuestionPool(generate, target=1, batch_size=3)
+
+    async def run():
+        await pool.refill(KEY)
+        assert pool.take(KEY) == ["Why us?"]
+        await pool.refill(KEY)
+        return pool.take(KEY)
+
+    assert asyncio.run(run()) == ["Why now?"]
+    assert pool.duplicates_dropped == 2
+
+
+def test_questions_expire_after_the_ttl(clock, monkeypatch):
+    monkeypatch.setattr(question_pool.time, "monotonic", clock)
+    pool = QuestionPool(Generator([["Why us?"]]), target=1, ttl=60)
+    asyncio.run(pool.refill(KEY))
+    clock.advance(61)
+    assert pool.take(KEY) == []
+    assert pool.expired == 1
+
+
+def test_least_recently_used_key_is_evicted():
+    pool = QuestionPool(Generator(), target=1, max_keys=2)
+    for key in (("hr", "", "Easy"), ("technical", "", "Easy"), ("hr", "", "Easy"), ("behavioral", "", "Easy")):
+        pool.take(key)
+    assert pool.size(("technical", "", "Easy")) == 0
+    assert pool.stats()["keys"] == 2 and pool.evicted_keys == 1
+
+
+def test_key_evicted_during_a_refill_keeps_its_batch():
+    pool = QuestionPool(None, target=1, max_keys=1)
+
+    async def generate(category, count, job_domain, difficulty):
+        # Another request touches a different key while this batch is generated
+        pool.take(("technical", "", "Easy"))
+        return ["Why us?"]
+
+    pool._generate = generate
+    asyncio.run(pool.refill(KEY))
+    assert pool.size(KEY) == 1
+
+
+def test_refill_worker_survives_failures_and_bounds_its_queue():
+    # None makes the refill itself raise, past the generator's error handling
+    generate = Generator([None])
+    pool = QuestionPool(generate, target=1, batch_size=1, max_pending=2)
+    keys = [("hr", "", "Easy"), ("technical", "", "Easy"), ("behavioral", "", "Easy")]
+
+    async def run():
+        for key in keys:
+            pool.request_refill(key)
+        pool.start()
+        for _ in range(20):
+            await asyncio.sleep(0)
+        pool.request_refill(keys[2])
+        for _ in range(20):
+            await asyncio.sleep(0)
+        worker_alive = not pool._worker.done()
+        await pool.stop()
+        return worker_alive
+
+    assert asyncio.run(run())
+    assert pool.refills_dropped == 1
+    assert [pool.size(key) for key in keys] == [0, 1, 1]
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpen, DeadlineExceeded, deadline, remaining, timeout_for
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture
+def breaker(clock, monkeypatch):
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return CircuitBreaker("groq", window=10, min_calls=4, failure_rate=0.5, consecutive_failures=3, reset_seconds=30)
+
+
+def fail(breaker, exc, timeout=None):
+    breaker.before_call()
+    breaker.record_error(exc, timeout)
+
+
+def test_breaker_opens_on_consecutive_failures_and_fails_fast(breaker):
+    for _ in range(3):
+        fail(breaker, ServerError())
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == pytest.approx(30)
+    assert breaker.rejected == 1
+
+
+def test_breaker_opens_on_failure_rate(breaker):
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_success()
+    fail(breaker, ServerError())
+    assert breaker.state == "closed"
+    fail(breaker, ServerError())
+    assert breaker.state == "open"
+
+
+def test_client_errors_and_short_timeouts_do_not_count(breaker):
+    for _ in range(5):
+        fail(breaker, BadRequest())
+        fail(breaker, asyncio.TimeoutError(), timeout=1.0)
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_failures"] == 0
+
+
+def test_half_open_probe_closes_or_reopens(breaker, clock):
+    for _ in range(3):
+        fail(breaker, ServerError())
+    clock.advance(31)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record_error(ServerError())
+    assert breaker.state == "open" and breaker.opened == 2
+
+    clock.advance(31)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["recent_calls"] == 1
+
+
+def test_call_records_the_outcome(breaker):
+    async def boom():
+        raise ServerError()
+
+    async def ok():
+        return "reply"
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(ServerError):
+                await breaker.call(boom, timeout=30)
+        with pytest.raises(CircuitOpen):
+            await breaker.call(ok, timeout=30)
+
+    asyncio.run(run())
+
+
+def test_nested_deadline_only_shortens(clock, monkeypatch):
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    assert remaining() is None
+    assert timeout_for(30, "llm") == 30
+    with deadline(10):
+        with deadline(60):
+            assert remaining() == pytest.approx(10)
+        with deadline(4):
+            assert timeout_for(30, "llm") == pytest.approx(4)
+        assert remaining() == pytest.approx(10)
+    assert remaining() is None
+
+
+def test_timeout_for_raises_once_the_deadline_passed(clock, monkeypatch):
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    with deadline(5):
+        clock.advance(6)
+        with pytest.raises(DeadlineExceeded):
+            timeout_for(30, "llm")
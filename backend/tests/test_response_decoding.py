@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+
+from response_decoding import (DecodeError, InterviewFeedback, QuestionList, decode, decode_with_retry, load_json,
+                               validate_items)
+
+FEEDBACK = {
+    "scores": {"fluency": 7, "grammar": 8, "confidence": 6, "overall": 7},
+    "analysis": {"strengths": ["Clear structure"], "improvements": ["Fewer fillers"]},
+    "tips": ["Quantify the impact"],
+}
+
+
+def test_validate_items_accepts_string_ids():
+    items = [{"id": "1", **FEEDBACK}, {"id": 2, **FEEDBACK}, {"id": " 3 ", **FEEDBACK}]
+    assert sorted(validate_items(items, InterviewFeedback)) == [1, 2, 3]
+
+
+def test_validate_items_drops_bad_ids_and_items():
+    items = [{"id": "first", **FEEDBACK}, {**FEEDBACK}, {"id": "2", "scores": {}}, {"id": "4", **FEEDBACK}]
+    assert list(validate_items(items, InterviewFeedback)) == [4]
+
+
+def test_load_json_skips_prose_and_fences():
+    reply = 'Sure! Questions [behavioral]:\n```json\n{"questions": ["Why us?"]}\n```'
+    assert load_json(reply) == {"questions": ["Why us?"]}
+
+
+def test_load_json_repairs_trailing_commas_and_truncation():
+    assert load_json('{"tips": ["a", "b",],}') == {"tips": ["a", "b"]}
+    assert load_json('{"tips": ["a", "unfinished') == {"tips": ["a", "unfinished"]}
+
+
+def test_load_json_without_json_raises():
+    with pytest.raises(DecodeError):
+        load_json("I cannot help with that.")
+
+
+def test_decode_coerces_question_objects():
+    reply = json.dumps([{"question": "Why us?"}, {"question": "Why now?"}])
+    assert decode(reply, QuestionList).questions == ["Why us?", "Why now?"]
+
+
+def test_decode_rejects_schema_mismatch():
+    with pytest.raises(DecodeError, match="Schema validation failed"):
+        decode('{"scores": {"fluency": 7}}', InterviewFeedback)
+
+
+def test_decode_with_retry_reasks_with_the_error():
+    replies = ["not json", json.dumps(FEEDBACK)]
+    prompts = []
+
+    async def call(prompt):
+        prompts.append(prompt)
+        return replies[len(prompts) - 1]
+
+    result, raw, attempts = asyncio.run(decode_with_retry(call, "Rate this answer", InterviewFeedback, retries=1))
+    assert attempts == 2
+    assert result.scores.overall == 7
+    assert prompts[0] == "Rate this answer"
+    assert prompts[1].startswith("Rate this answer") and "could not be used" in prompts[1]
+
+
+def test_decode_with_retry_does_not_reask_after_a_failed_call():
+    calls = []
+
+    async def call(prompt):
+        calls.append(prompt)
+        return json.dumps({"error": "Groq unavailable", "fallback": True})
+
+    result, _, attempts = asyncio.run(decode_with_retry(call, "Rate this answer", InterviewFeedback, retries=2))
+    assert result is None
+    assert attempts == 1 and len(calls) == 1
+
+
+def test_decode_with_retry_gives_up_after_the_retries():
+    async def call(prompt):
+        return "still not json"
+
+    result, raw, attempts = asyncio.run(decode_with_retry(call, "Rate this answer", InterviewFeedback, retries=2))
+    assert (result, raw, attempts) == (None, "still not json", 3)
@@ -0,0 +1,355 @@
+"""
+Transcription providers for PrepTalk.
+
+Every provider takes the audio as bytes or an async iterator of chunks and
+returns a Transcript. Three are available:
+
+- ``assemblyai``: the hosted API (upload, then poll or webhook)
+- ``local``: faster-whisper on CPU in a process pool, so short answers skip
+  the upload and queue wait; needs the optional ``faster-whisper`` package
+- ``fake``: a deterministic transcript derived from the audio bytes, for
+  tests and load runs without network access; only registered when
+  TRANSCRIPTION_ENABLE_FAKE=1, since it would save made-up transcripts
+
+TRANSCRIPTION_PROVIDER picks the deployment default and requests may name
+another. ``auto`` sends uploads up to LOCAL_STT_MAX_BYTES to the local
+engine when it is installed and everything else to AssemblyAI, or
+everything to the local engine while AssemblyAI's circuit breaker is open.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from assemblyai_client import Transcript, TranscriptionError
+from metrics import observe_dependency
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_PROVIDER = os.getenv("TRANSCRIPTION_PROVIDER", "assemblyai")
+# Tests and benchmarks only: lets requests pick the fake provider
+TRANSCRIPTION_ENABLE_FAKE = os.getenv("TRANSCRIPTION_ENABLE_FAKE", "0") == "1"
+
+LOCAL_STT_MODEL = os.getenv("LOCAL_STT_MODEL", "base.en")
+LOCAL_STT_WORKERS = int(os.getenv("LOCAL_STT_WORKERS", "2"))
+LOCAL_STT_THREADS = int(os.getenv("LOCAL_STT_THREADS", "2"))  # CPU threads per worker process
+LOCAL_STT_COMPUTE_TYPE = os.getenv("LOCAL_STT_COMPUTE_TYPE", "int8")
+LOCAL_STT_MAX_BYTES = int(os.getenv("LOCAL_STT_MAX_BYTES", str(2 * 1024 * 1024)))  # "auto" routing cut-off
+LOCAL_STT_TIMEOUT = float(os.getenv("LOCAL_STT_TIMEOUT", "120"))
+LOCAL_STT_SPOOL_DIR = os.getenv("LOCAL_STT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "preptalk-stt"))
+
+
+async def _as_chunks(audio):
+    if isinstance(audio, (bytes, bytearray)):
+        yield bytes(audio)
+    else:
+        async for chunk in audio:
+            yield chunk
+
+
+class UnknownProvider(ValueError):
+    """The client asked for a provider name this server doesn't know"""
+
+
+class ProviderUnavailable(RuntimeError):
+    """The provider exists but can't be used here, e.g. no API key or engine not installed"""
+
+
+class ProviderStats:
+    def __init__(self):
+        self.transcripts = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.abandoned = 0  # timed out while the worker kept going
+
+    def as_dict(self) -> dict:
+        return {
+            "transcripts": self.transcripts,
+            "failures": self.failures,
+            "avg_latency_ms": round(self.total_latency / self.transcripts * 1000, 2) if self.transcripts else 0,
+        }
+
+
+class AssemblyAIProvider:
+    name = "assemblyai"
+
+    def __init__(self, client):
+        self.client = client
+
+    def available(self) -> bool:
+        return self.client.configured
+
+    def healthy(self) -> bool:
+        return not self.client.breaker.is_open
+
+    async def start(self):
+        pass
+
+    async def transcribe(self, audio) -> Transcript:
+        return await self.client.transcribe(audio)
+
+    def stats(self) -> dict:
+        return self.client.stats()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# --- Local engine (runs inside the worker processes) ---
+_worker_model = None
+
+
+def _load_model(model_name: str, compute_type: str, threads: int):
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=threads)
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _transcribe_file(path: str) -> dict:
+    segments, info = _worker_model.transcribe(path, beam_size=1, word_timestamps=True, vad_filter=True)
+    words = []
+    texts = []
+    for segment in segments:
+        texts.append(segment.text.strip())
+        for word in segment.words or []:
+            words.append({
+                "text": word.word.strip(),
+                "start": int(word.start * 1000),
+                "end": int(word.end * 1000),
+                "confidence": round(word.probability, 3),
+            })
+    return {"text": " ".join(texts), "words": words, "audio_duration": info.duration}
+
+
+class LocalWhisperProvider:
+    """faster-whisper in a pool of spawned processes, each holding one loaded model"""
+
+    name = "local"
+
+    def __init__(self, model: str = LOCAL_STT_MODEL, workers: int = LOCAL_STT_WORKERS,
+                 threads: int = LOCAL_STT_THREADS, compute_type: str = LOCAL_STT_COMPUTE_TYPE,
+                 timeout: float = LOCAL_STT_TIMEOUT, spool_dir: str = LOCAL_STT_SPOOL_DIR):
+        self.model = model
+        self.workers = workers
+        self.threads = threads
+        self.compute_type = compute_type
+        self.timeout = timeout
+        self.spool_dir = spool_dir
+        self._pool = None
+        self._starting = None
+        self.in_flight = 0
+        self.counters = ProviderStats()
+
+    def available(self) -> bool:
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    async def start(self):
+        """Spawn the workers and load the model in each, so the first request does not pay for it"""
+        if self._starting is None or (self._starting.done() and self._pool is None):
+            self._starting = asyncio.ensure_future(self._start())
+        await asyncio.shield(self._starting)
+
+    async def _start(self):
+        if not self.available():
+            raise TranscriptionError("Local transcription needs the faster-whisper package")
+        start = time.perf_counter()
+        # spawn, not fork: the parent runs an event loop and driver threads
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_model,
+            initargs=(self.model, self.compute_type, self.threads),
+        )
+        loop = asyncio.get_running_loop()
+        # Workers start lazily; one task each forces every process up and its model loaded
+        await asyncio.gather(*(loop.run_in_executor(pool, _warm_up) for _ in range(self.workers)))
+        self._pool = pool
+        logger.info(f"Local transcription ready: {self.workers} workers, model {self.model} "
+                    f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    async def _spool(self, audio) -> str:
+        """Write the upload to a file for the workers; the disk writes run off the event loop"""
+        await asyncio.to_thread(os.makedirs, self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.audio")
+        f = await asyncio.to_thread(open, path, "wb")
+        try:
+            async for chunk in _as_chunks(audio):
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return path
+
+    async def transcribe(self, audio) -> Transcript:
+        """Transcribe on the worker pool.
+
+        A timeout fails the request but cannot stop the worker process, so the
+        call stays in ``in_flight`` (and its spool file stays on disk) until the
+        worker actually finishes; ``in_flight`` is the number of busy workers.
+        """
+        await self.start()
+        path = await self._spool(audio)
+        start = time.perf_counter()
+        ok = False
+        self.in_flight += 1
+        work = asyncio.wrap_future(self._pool.submit(_transcribe_file, path))
+        work.add_done_callback(lambda _: self._release(path))
+        try:
+            # shield: a timeout abandons the result but leaves ``work`` to finish and release the worker
+            result = await asyncio.wait_for(asyncio.shield(work), self.timeout)
+            ok = True
+        except asyncio.TimeoutError:
+            self.counters.abandoned += 1
+            raise TranscriptionError(f"Local transcription took longer than {self.timeout}s")
+        finally:
+            seconds = time.perf_counter() - start
+            observe_dependency("local_stt", "transcribe", seconds, ok)
+            if ok:
+                self.counters.transcripts += 1
+                self.counters.total_latency += seconds
+            else:
+                self.counters.failures += 1
+        return Transcript(**result)
+
+    def _release(self, path: str):
+        self.in_flight -= 1
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            **self.counters.as_dict(),
+            "model": self.model,
+            "workers": self.workers,
+            "ready": self._pool is not None,
+            "in_flight": self.in_flight,
+            "abandoned": self.counters.abandoned,
+        }
+
+    async def aclose(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._starting = None
+
+
+# --- Fake engine ---
+FAKE_VOCABULARY = (
+    "I", "led", "a", "team", "that", "shipped", "the", "project", "on", "time", "and", "we", "learned",
+    "to", "communicate", "clearly", "with", "stakeholders", "so", "um", "like", "basically", "results",
+)
+FAKE_BYTES_PER_SECOND = 16000  # roughly a 128 kbit/s recording
+
+
+class FakeProvider:
+    """Same bytes in, same transcript out; word timings spaced evenly over the implied duration"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.counters = ProviderStats()
+
+    def available(self) -> bool:
+        return True
+
+    async def start(self):
+        pass
+
+    async def transcribe(self, audio) -> Transcript:
+        digest = hashlib.sha256()
+        size = 0
+        async for chunk in _as_chunks(audio):
+            digest.update(chunk)
+            size += len(chunk)
+        seed = digest.digest()
+        duration = max(size / FAKE_BYTES_PER_SECOND, 1.0)
+        count = min(max(int(duration * 2.5), 5), 400)
+        spacing = duration * 1000 / count
+        words = [
+            {
+                "text": FAKE_VOCABULARY[seed[i % len(seed)] % len(FAKE_VOCABULARY)],
+                "start": int(i * spacing),
+                "end": int(i * spacing + spacing * 0.8),
+                "confidence": 0.9,
+            }
+            for i in range(count)
+        ]
+        self.counters.transcripts += 1
+        return Transcript(text=" ".join(word["text"] for word in words), words=words, audio_duration=duration)
+
+    def stats(self) -> dict:
+        return self.counters.as_dict()
+
+    async def aclose(self):
+        pass
+
+
+class TranscriptionService:
+    """Picks a provider per request, falling back to the deployment default"""
+
+    def __init__(self, providers: list, default: str = TRANSCRIPTION_PROVIDER,
+                 local_max_bytes: int = LOCAL_STT_MAX_BYTES):
+        self.providers = {provider.name: provider for provider in providers}
+        if default != "auto" and default not in self.providers:
+            raise ValueError(f"Unknown TRANSCRIPTION_PROVIDER '{default}'")
+        self.default = default
+        self.local_max_bytes = local_max_bytes
+        self.selections = {}
+
+    def names(self) -> list:
+        return ["auto", *self.providers]
+
+    def select(self, name: str = None, size: int = None):
+        """The provider for a request.
+
+        Raises UnknownProvider for a name the client asked for that isn't
+        registered, and ProviderUnavailable when the chosen provider (including
+        a misconfigured default) can't serve requests on this server.
+        """
+        requested = name
+        name = name or self.default
+        if name == "auto":
+            local = self.providers.get("local")
+            assemblyai = self.providers.get("assemblyai")
+            small = size is not None and size <= self.local_max_bytes
+            assemblyai_down = assemblyai is None or not assemblyai.available() or not assemblyai.healthy()
+            use_local = local is not None and local.available() and (small or assemblyai_down)
+            name = "local" if use_local else "assemblyai"
+        provider = self.providers.get(name)
+        if provider is None:
+            if requested:
+                raise UnknownProvider(f"Unknown transcription provider '{name}' (expected one of {', '.join(self.names())})")
+            raise ProviderUnavailable(f"Configured transcription provider '{name}' is not registered")
+        if not provider.available():
+            raise ProviderUnavailable(f"Transcription provider '{name}' is not available on this server")
+        self.selections[name] = self.selections.get(name, 0) + 1
+        return provider
+
+    async def start(self):
+        """Preload the local engine when the deployment routes to it by default"""
+        local = self.providers.get("local")
+        if local is not None and self.default in ("local", "auto") and local.available():
+            await local.start()
+
+    def stats(self) -> dict:
+        return {
+            "default": self.default,
+            "selections": self.selections,
+            **{name: provider.stats() for name, provider in self.providers.items() if name != "assemblyai"},
+        }
+
+    async def aclose(self):
+        for provider in self.providers.values():
+            await provider.aclose()